@@ -0,0 +1,84 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Per-clip benchmarks: processing a whole recorded clip at once, and streaming
+it frame by frame for comparison.
+"""
+
+from harness import benchmark, fake_array
+from skeleton import AffineSkeleton, ExpressionSkeleton, Skeleton
+from virtual_landmark.filters import KalmanFilter, OneEuroFilter
+
+FRAMES = 300  # 10 seconds at 30 fps
+
+
+@benchmark("clip", items=FRAMES)
+def evaluate_clip():
+    clip = fake_array(FRAMES, 33)
+    return lambda: Skeleton.evaluate_clip(clip)
+
+
+@benchmark("clip", items=FRAMES)
+def evaluate_clip_expressions():
+    clip = fake_array(FRAMES, 33)
+    return lambda: ExpressionSkeleton.evaluate_clip(clip)
+
+
+@benchmark("clip", items=FRAMES)
+def evaluate_clip_affine():
+    clip = fake_array(FRAMES, 33)
+    return lambda: AffineSkeleton.evaluate_clip(clip)
+
+
+@benchmark("clip", items=FRAMES)
+def update_per_frame():
+    clip = fake_array(FRAMES, 33)
+    pose = Skeleton(clip[0], storage="numpy")
+
+    def run():
+        for frame in clip:
+            pose.update(frame)
+
+    return run
+
+
+@benchmark("clip", items=FRAMES)
+def compute_angles():
+    clip = Skeleton.evaluate_clip(fake_array(FRAMES, 33))
+    return lambda: Skeleton.compute_angles(clip)
+
+
+@benchmark("clip", items=FRAMES)
+def one_euro_filter():
+    clip = Skeleton.evaluate_clip(fake_array(FRAMES, 33))
+    smooth = OneEuroFilter(beta=0.05)
+
+    def run():
+        for frame in clip:
+            smooth(frame)
+
+    return run
+
+
+@benchmark("clip", items=FRAMES)
+def kalman_filter():
+    clip = Skeleton.evaluate_clip(fake_array(FRAMES, 33))
+    smooth = KalmanFilter()
+
+    def run():
+        for frame in clip:
+            smooth(frame)
+
+    return run
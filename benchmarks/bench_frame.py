@@ -0,0 +1,223 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Per-frame benchmarks: the cost of processing one pose of one image.
+"""
+
+import numpy as np
+
+from harness import benchmark, fake_array, fake_landmarks
+from skeleton import AffineSkeleton, ExpressionSkeleton, Skeleton
+from virtual_landmark import Connections, LandmarkRenderer, calculus, get_extended_pose_landmarks_style
+from virtual_landmark.abstract_landmark import AbstractLandmark
+
+
+@benchmark("frame")
+def construct_protobuf():
+    landmarks = fake_landmarks()
+    return lambda: Skeleton(landmarks)
+
+
+@benchmark("frame")
+def construct_numpy():
+    landmarks = fake_landmarks()
+    return lambda: Skeleton(landmarks, storage="numpy")
+
+
+@benchmark("frame")
+def update_protobuf():
+    landmarks = fake_landmarks()
+    pose = Skeleton(landmarks)
+    return lambda: pose.update(landmarks)
+
+
+@benchmark("frame")
+def update_numpy():
+    landmarks = fake_array(33)
+    pose = Skeleton(landmarks, storage="numpy")
+    return lambda: pose.update(landmarks)
+
+
+@benchmark("frame")
+def update_numpy_expressions():
+    """
+    The same landmarks declared as expressions, evaluated as one matrix product.
+    """
+    landmarks = fake_array(33)
+    pose = ExpressionSkeleton(landmarks, storage="numpy")
+    return lambda: pose.update(landmarks)
+
+
+@benchmark("frame")
+def update_numpy_affine():
+    """
+    The linear methods declared with `affine=True`, folded into one matrix
+    product; the projection still runs as a method.
+    """
+    landmarks = fake_array(33)
+    pose = AffineSkeleton(landmarks, storage="numpy")
+    return lambda: pose.update(landmarks)
+
+
+@benchmark("frame")
+def update_numpy_with_world():
+    """
+    Normalized and world landmarks evaluated together, in one pass.
+    """
+    landmarks = fake_array(33)
+    world = fake_array(33, seed=1)
+    pose = Skeleton(landmarks, storage="numpy", world_landmarks=world)
+    return lambda: pose.update(landmarks, world)
+
+
+@benchmark("frame")
+def update_lazy_single_landmark():
+    landmarks = fake_array(33)
+    pose = Skeleton(landmarks, storage="numpy", lazy=True)
+    neck = pose.virtual_landmark.NECK
+    return lambda: pose.update(landmarks)[neck]
+
+
+@benchmark("frame")
+def update_occluded_skipped():
+    """
+    A pose whose lower body is occluded, with `visibility_threshold` set:
+    the landmarks derived from hidden inputs are not computed.
+    """
+    landmarks = fake_array(33)
+    landmarks[..., 3] = 1.0
+    landmarks[23:, 3] = 0.1
+    pose = Skeleton(landmarks, storage="numpy")
+    pose.visibility_threshold = 0.5
+    return lambda: pose.update(landmarks)
+
+
+class _Plain(AbstractLandmark):
+    pass
+
+
+@benchmark("frame", items=10, unit="points")
+def add_landmark():
+    """
+    Ten `_add_landmark` calls on a fresh instance (including its construction).
+    """
+    landmarks = fake_landmarks()
+    names = [f"EXTRA_{i}" for i in range(10)]
+
+    def run():
+        obj = _Plain(landmarks)
+        for name in names:
+            obj._add_landmark(name, (0.5, 0.5, 0.5))
+
+    return run
+
+
+@benchmark("frame")
+def connections():
+    pose = Skeleton(fake_landmarks())
+    return lambda: Connections(pose).ALL_CONNECTIONS
+
+
+@benchmark("frame")
+def drawing_style():
+    pose = Skeleton(fake_array(33), storage="numpy")
+    return lambda: get_extended_pose_landmarks_style(pose)
+
+
+@benchmark("frame")
+def as_landmark_list_numpy():
+    landmarks = fake_array(33)
+    pose = Skeleton(landmarks, storage="numpy")
+
+    def run():
+        pose.update(landmarks)
+        return pose.as_landmark_list()
+
+    return run
+
+
+@benchmark("frame")
+def angles():
+    pose = Skeleton(fake_array(33), storage="numpy")
+    return lambda: pose.angles()
+
+
+def _register_calculus():
+    a, b, c = fake_landmarks(3)
+    rows = fake_array(3)
+    clip = fake_array(3, 300, seed=1)
+    arguments = {
+        "middle": (a, b),
+        "projection": (a, b, c),
+        "centroid": (a, b, c),
+        "mirror": (a, b),
+        "weighted_average": (a, b, 0.3, 0.7),
+        "extend": (a, b, 0.5),
+        "normalize": (a, b),
+        "interpolate": (a, b, 0.25),
+        "bisector": (a, b, c),
+        "rotate": (a, b, c, np.pi / 4),
+        "angle": (a, b, c),
+    }
+
+    for name, args in arguments.items():
+        fn = getattr(calculus, name)
+        array_args = tuple(rows[i] if i < 3 and hasattr(arg, "x") else arg for i, arg in enumerate(args))
+        batch_args = tuple(clip[i] if i < 3 and hasattr(arg, "x") else arg for i, arg in enumerate(args))
+
+        # Single points (messages and array rows) take the scalar path;
+        # batches of 300 points go through `vectorized`.
+        benchmark("calculus", unit="calls", name=name)(lambda fn=fn, args=args: lambda: fn(*args))
+        benchmark("calculus", unit="calls", name=f"{name}[array]")(
+            lambda fn=fn, args=array_args: lambda: fn(*args)
+        )
+        benchmark("calculus", items=300, unit="points", name=f"{name}[batch]")(
+            lambda fn=fn, args=batch_args: lambda: fn(*args)
+        )
+
+
+_register_calculus()
+
+
+@benchmark("frame")
+def render_mediapipe_1080p():
+    from mediapipe.python.solutions import drawing_utils as mp_drawing
+
+    landmarks = fake_array(33)
+    pose = Skeleton(landmarks, storage="numpy")
+    connections = Connections(pose).ALL_CONNECTIONS
+    image = np.zeros((1080, 1920, 3), dtype=np.uint8)
+
+    def run():
+        pose.update(landmarks)
+        mp_drawing.draw_landmarks(
+            image, pose.as_landmark_list(), connections, get_extended_pose_landmarks_style(pose)
+        )
+
+    return run
+
+
+@benchmark("frame")
+def render_vectorized_1080p():
+    landmarks = fake_array(33)
+    pose = Skeleton(landmarks, storage="numpy")
+    renderer = LandmarkRenderer()
+    image = np.zeros((1080, 1920, 3), dtype=np.uint8)
+
+    def run():
+        pose.update(landmarks)
+        renderer.draw(image, pose)
+
+    return run
@@ -0,0 +1,54 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Multi-person benchmarks: several poses detected in the same image.
+"""
+
+from harness import benchmark, fake_array
+from skeleton import Skeleton
+from virtual_landmark.multi_pose import MultiPose
+
+PEOPLE = 10
+
+
+@benchmark("people", items=PEOPLE, unit="people")
+def multi_pose_update():
+    poses = fake_array(PEOPLE, 33)
+    people = MultiPose(Skeleton, poses)
+    return lambda: people.update(poses)
+
+
+@benchmark("people", items=PEOPLE, unit="people")
+def one_instance_per_person():
+    poses = fake_array(PEOPLE, 33)
+    return lambda: [Skeleton(pose, storage="numpy") for pose in poses]
+
+
+@benchmark("people", items=PEOPLE, unit="people")
+def multi_pose_drawing_data():
+    poses = fake_array(PEOPLE, 33)
+    people = MultiPose(Skeleton, poses)
+
+    def run():
+        people.update(poses)
+        return people.as_landmark_lists(), people.styles()
+
+    return run
+
+
+@benchmark("people", items=PEOPLE, unit="people")
+def multi_pose_angles():
+    people = MultiPose(Skeleton, fake_array(PEOPLE, 33))
+    return lambda: people.angles()
@@ -0,0 +1,183 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Minimal benchmark harness, based on `timeit` and `tracemalloc` only.
+
+A benchmark is a setup function registered with `@benchmark`; it prepares its
+inputs and returns the zero-argument callable to measure. Each callable is
+timed (best of several repeats, after an automatic calibration) and then run
+under `tracemalloc` to record the memory it allocates.
+"""
+
+import gc
+import timeit
+import tracemalloc
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+_REGISTRY = []
+
+
+class Benchmark(NamedTuple):
+    group: str
+    name: str
+    setup: Callable
+    items: int
+    unit: str
+
+
+class Result(NamedTuple):
+    """
+    Attributes:
+        group (str): Scenario of the benchmark (e.g. "frame", "clip").
+        name (str): Name of the benchmark.
+        time_us (float): Best time per call, in microseconds.
+        throughput (float): Items (frames, people...) processed per second.
+        unit (str): What an item is.
+        peak_kib (float): Peak memory allocated during one call, in KiB.
+        retained (float): Bytes still allocated after a call, averaged over
+            several calls; close to 0 for code that does not leak or grow.
+    """
+
+    group: str
+    name: str
+    time_us: float
+    throughput: float
+    unit: str
+    peak_kib: float
+    retained: float
+
+    @property
+    def key(self) -> str:
+        return f"{self.group}/{self.name}"
+
+
+def benchmark(group: str, items: int = 1, unit: str = "frames", name: str = None):
+    """
+    Registers a benchmark setup function.
+
+    Args:
+        group (str): Scenario of the benchmark.
+        items (int): Number of items processed by one call of the measured callable.
+        unit (str): What an item is, for the throughput column.
+        name (str, optional): Name of the benchmark. Defaults to the function name.
+    """
+
+    def wrapper(fn):
+        _REGISTRY.append(Benchmark(group, name or fn.__name__, fn, items, unit))
+        return fn
+
+    return wrapper
+
+
+def registered() -> list:
+    """
+    Returns the registered benchmarks, in registration order.
+    """
+    return list(_REGISTRY)
+
+
+def fake_landmarks(n: int = 33):
+    """
+    Returns synthetic MediaPipe landmarks, like the `fake_landmarks` test fixture.
+    """
+    from mediapipe.framework.formats import landmark_pb2
+
+    return [
+        landmark_pb2.NormalizedLandmark(x=i / 10, y=i / 10, z=i / 10, visibility=1.0)
+        for i in range(n)
+    ]
+
+
+def fake_array(*shape, seed: int = 0) -> np.ndarray:
+    """
+    Returns random landmarks of shape `(*shape, 4)` in the unit cube.
+    """
+    rng = np.random.default_rng(seed)
+    return rng.random(shape + (4,), dtype=np.float32)
+
+
+def measure(bench: Benchmark, min_time: float = 0.2, repeat: int = 5) -> Result:
+    """
+    Runs one benchmark.
+
+    Args:
+        bench (Benchmark): The benchmark.
+        min_time (float): Minimum duration of each timing repeat, in seconds.
+        repeat (int): Number of timing repeats; the best one is kept.
+
+    Returns:
+        Result: The measurements.
+    """
+    fn = bench.setup()
+    fn()  # warm up caches
+
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        if timer.timeit(number) >= min_time or number >= 1_000_000:
+            break
+        number *= 2
+
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+
+    calls = 8
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        gc.collect()
+        before, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+
+        gc.collect()
+        start, _ = tracemalloc.get_traced_memory()
+        for _ in range(calls):
+            fn()
+        gc.collect()
+        end, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return Result(
+        group=bench.group,
+        name=bench.name,
+        time_us=best * 1e6,
+        throughput=bench.items / best,
+        unit=bench.unit,
+        peak_kib=max(0, peak - before) / 1024,
+        retained=max(0, end - start) / calls,
+    )
+
+
+def format_header() -> str:
+    """
+    Returns the header of the results table.
+    """
+    header = f"{'benchmark':<40} {'time/call':>12} {'throughput':>22} {'peak':>10} {'retained':>10}"
+    return header + "\n" + "-" * len(header)
+
+
+def format_row(r: Result) -> str:
+    """
+    Formats one result as a row of the results table.
+    """
+    return (
+        f"{r.key:<40} {r.time_us:>10.1f}us {r.throughput:>13,.0f} {r.unit + '/s':<8}"
+        f" {r.peak_kib:>7.1f}KiB {r.retained:>9.0f}B"
+    )
@@ -0,0 +1,106 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Runs the benchmark suite.
+
+Examples:
+    python benchmarks/run.py                        # all benchmarks
+    python benchmarks/run.py -k frame/ -k clip/     # only some of them
+    python benchmarks/run.py --json baseline.json   # save the results
+    python benchmarks/run.py --compare baseline.json --tolerance 1.2
+
+With `--compare`, the exit status is 1 if a benchmark is slower than the
+baseline by more than the tolerance factor.
+"""
+
+import argparse
+import json
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path[:0] = [str(HERE), str(HERE.parent / "src")]
+
+import harness  # noqa: E402
+
+MODULES = ("bench_frame", "bench_clip", "bench_multi_person")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark the virtual landmark hot paths.")
+    parser.add_argument(
+        "-k", dest="patterns", action="append", default=[],
+        help="only run benchmarks whose group/name contains this text (may be repeated)",
+    )
+    parser.add_argument("--quick", action="store_true", help="shorter, less precise runs")
+    parser.add_argument("--json", type=Path, help="write the results to a JSON file")
+    parser.add_argument("--compare", type=Path, help="JSON results to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=1.25,
+        help="slowdown factor reported as a regression (default: 1.25)",
+    )
+    return parser
+
+
+def compare(results, baseline: dict, tolerance: float) -> list:
+    """
+    Returns the lines describing the regressions against a baseline.
+    """
+    regressions = []
+    for result in results:
+        before = baseline.get(result.key)
+        if before is None:
+            continue
+        ratio = result.time_us / before["time_us"]
+        if ratio > tolerance:
+            regressions.append(
+                f"{result.key}: {before['time_us']:.1f}us -> {result.time_us:.1f}us ({ratio:.2f}x)"
+            )
+    return regressions
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+
+    for module in MODULES:
+        __import__(module)
+
+    benchmarks = [
+        b for b in harness.registered()
+        if not args.patterns or any(p in f"{b.group}/{b.name}" for p in args.patterns)
+    ]
+
+    min_time, repeat = (0.05, 3) if args.quick else (0.2, 5)
+    results = []
+    print(harness.format_header())
+    for bench in benchmarks:
+        results.append(harness.measure(bench, min_time=min_time, repeat=repeat))
+        print(harness.format_row(results[-1]), flush=True)
+
+    if args.json:
+        args.json.write_text(json.dumps({r.key: r._asdict() for r in results}, indent=2))
+
+    if args.compare:
+        regressions = compare(results, json.loads(args.compare.read_text()), args.tolerance)
+        if regressions:
+            print("\nRegressions:\n" + "\n".join(regressions))
+            return 1
+        print("\nNo regressions.")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Landmark classes shared by the benchmarks: a dozen virtual landmarks with
+dependencies between them, and a few joint angles. `ExpressionSkeleton`
+declares the same landmarks as expressions, and `AffineSkeleton` keeps the
+methods but declares the linear ones with `affine=True`.
+"""
+
+from virtual_landmark import VirtualLandmark, angle, landmark, calculus as calc
+from virtual_landmark import expression as ex
+
+
+@angle("LEFT_ELBOW", "LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST")
+@angle("RIGHT_ELBOW", "RIGHT_SHOULDER", "RIGHT_ELBOW", "RIGHT_WRIST")
+@angle("LEFT_KNEE", "LEFT_HIP", "LEFT_KNEE", "LEFT_ANKLE")
+@angle("RIGHT_KNEE", "RIGHT_HIP", "RIGHT_KNEE", "RIGHT_ANKLE")
+@angle("TRUNK", "NECK", "MIDDLE_HIP", "MIDDLE_KNEE", dims=2)
+class Skeleton(VirtualLandmark):
+    @landmark("MIDDLE_SHOULDER", connection=["LEFT_SHOULDER", "RIGHT_SHOULDER"])
+    def middle_shoulder(self):
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.LEFT_SHOULDER], self[vl.RIGHT_SHOULDER])
+
+    @landmark("MIDDLE_HIP", connection=["LEFT_HIP", "RIGHT_HIP"])
+    def middle_hip(self):
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.LEFT_HIP], self[vl.RIGHT_HIP])
+
+    @landmark("MIDDLE_KNEE")
+    def middle_knee(self):
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.LEFT_KNEE], self[vl.RIGHT_KNEE])
+
+    @landmark("NECK", connection=["MIDDLE_SHOULDER", "NOSE"])
+    def neck(self):
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.NOSE], self[vl.MIDDLE_SHOULDER])
+
+    @landmark("THORAX", connection=["NECK", "MIDDLE_HIP"])
+    def thorax(self):
+        vl = self.virtual_landmark
+        return calc.interpolate(self[vl.MIDDLE_SHOULDER], self[vl.MIDDLE_HIP], 0.3)
+
+    @landmark("CENTER_OF_MASS")
+    def center_of_mass(self):
+        vl = self.virtual_landmark
+        return calc.centroid(self[vl.THORAX], self[vl.MIDDLE_HIP], self[vl.MIDDLE_SHOULDER])
+
+    @landmark("LEFT_HIP_PROJECTION")
+    def left_hip_projection(self):
+        vl = self.virtual_landmark
+        return calc.projection(self[vl.LEFT_HIP], self[vl.LEFT_KNEE], self[vl.LEFT_SHOULDER])
+
+    @landmark("HEAD_TOP")
+    def head_top(self):
+        vl = self.virtual_landmark
+        return calc.extend(self[vl.NECK], self[vl.NOSE], 0.5)
+
+    @landmark("MIRRORED_WRIST")
+    def mirrored_wrist(self):
+        vl = self.virtual_landmark
+        return calc.mirror(self[vl.LEFT_WRIST], self[vl.MIDDLE_HIP])
+
+    @landmark("PELVIS")
+    def pelvis(self):
+        vl = self.virtual_landmark
+        return calc.weighted_average(self[vl.MIDDLE_HIP], self[vl.THORAX], 0.8, 0.2)
+
+
+class ExpressionSkeleton(VirtualLandmark):
+    middle_shoulder = landmark(
+        "MIDDLE_SHOULDER",
+        connection=["LEFT_SHOULDER", "RIGHT_SHOULDER"],
+        expr=ex.middle("LEFT_SHOULDER", "RIGHT_SHOULDER"),
+    )
+    middle_hip = landmark(
+        "MIDDLE_HIP", connection=["LEFT_HIP", "RIGHT_HIP"], expr=ex.middle("LEFT_HIP", "RIGHT_HIP")
+    )
+    middle_knee = landmark("MIDDLE_KNEE", expr=ex.middle("LEFT_KNEE", "RIGHT_KNEE"))
+    neck = landmark(
+        "NECK", connection=["MIDDLE_SHOULDER", "NOSE"], expr=ex.middle("NOSE", "MIDDLE_SHOULDER")
+    )
+    thorax = landmark(
+        "THORAX",
+        connection=["NECK", "MIDDLE_HIP"],
+        expr=ex.interpolate("MIDDLE_SHOULDER", "MIDDLE_HIP", 0.3),
+    )
+    center_of_mass = landmark(
+        "CENTER_OF_MASS", expr=ex.centroid("THORAX", "MIDDLE_HIP", "MIDDLE_SHOULDER")
+    )
+    left_hip_projection = landmark(
+        "LEFT_HIP_PROJECTION", expr=ex.projection("LEFT_HIP", "LEFT_KNEE", "LEFT_SHOULDER")
+    )
+    head_top = landmark("HEAD_TOP", expr=ex.extend("NECK", "NOSE", 0.5))
+    mirrored_wrist = landmark("MIRRORED_WRIST", expr=ex.mirror("LEFT_WRIST", "MIDDLE_HIP"))
+    pelvis = landmark("PELVIS", expr=ex.weighted_average("MIDDLE_HIP", "THORAX", 0.8, 0.2))
+
+
+class AffineSkeleton(VirtualLandmark):
+    @landmark("MIDDLE_SHOULDER", connection=["LEFT_SHOULDER", "RIGHT_SHOULDER"], affine=True)
+    def middle_shoulder(self):
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.LEFT_SHOULDER], self[vl.RIGHT_SHOULDER])
+
+    @landmark("MIDDLE_HIP", connection=["LEFT_HIP", "RIGHT_HIP"], affine=True)
+    def middle_hip(self):
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.LEFT_HIP], self[vl.RIGHT_HIP])
+
+    @landmark("MIDDLE_KNEE", affine=True)
+    def middle_knee(self):
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.LEFT_KNEE], self[vl.RIGHT_KNEE])
+
+    @landmark("NECK", connection=["MIDDLE_SHOULDER", "NOSE"], affine=True)
+    def neck(self):
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.NOSE], self[vl.MIDDLE_SHOULDER])
+
+    @landmark("THORAX", connection=["NECK", "MIDDLE_HIP"], affine=True)
+    def thorax(self):
+        vl = self.virtual_landmark
+        return calc.interpolate(self[vl.MIDDLE_SHOULDER], self[vl.MIDDLE_HIP], 0.3)
+
+    @landmark("CENTER_OF_MASS", affine=True)
+    def center_of_mass(self):
+        vl = self.virtual_landmark
+        return calc.centroid(self[vl.THORAX], self[vl.MIDDLE_HIP], self[vl.MIDDLE_SHOULDER])
+
+    @landmark("LEFT_HIP_PROJECTION")
+    def left_hip_projection(self):
+        vl = self.virtual_landmark
+        return calc.projection(self[vl.LEFT_HIP], self[vl.LEFT_KNEE], self[vl.LEFT_SHOULDER])
+
+    @landmark("HEAD_TOP", affine=True)
+    def head_top(self):
+        vl = self.virtual_landmark
+        return calc.extend(self[vl.NECK], self[vl.NOSE], 0.5)
+
+    @landmark("MIRRORED_WRIST", affine=True)
+    def mirrored_wrist(self):
+        vl = self.virtual_landmark
+        return calc.mirror(self[vl.LEFT_WRIST], self[vl.MIDDLE_HIP])
+
+    @landmark("PELVIS", affine=True)
+    def pelvis(self):
+        vl = self.virtual_landmark
+        return calc.weighted_average(self[vl.MIDDLE_HIP], self[vl.THORAX], 0.8, 0.2)
@@ -0,0 +1,111 @@
+# Copyright 2024 cvpose
+# Licensed under the Apache License, Version 2.0
+
+import os
+import cv2
+import mediapipe as mp
+from virtual_landmark import VirtualLandmark, landmark, calculus as calc
+from virtual_landmark import Connections, get_extended_pose_landmarks_style
+from virtual_landmark.pipeline import Pipeline, Stage
+
+# ==========================
+# CUSTOM LANDMARK CLASS
+# ==========================
+
+class HelloWorld(VirtualLandmark):
+
+    @landmark("MIDDLE_SHOULDER", connection=["RIGHT_SHOULDER", "LEFT_SHOULDER", "NECK"])
+    def _middle_shoulder(self):
+        return calc.middle(
+            self[self.virtual_landmark.RIGHT_SHOULDER],
+            self[self.virtual_landmark.LEFT_SHOULDER],
+        )
+
+    @landmark("NECK", connection=["MIDDLE_SHOULDER", "NOSE"])
+    def _neck(self):
+        return calc.middle(
+            self[self.virtual_landmark.NOSE],
+            self[self.virtual_landmark.MIDDLE_SHOULDER],
+        )
+
+# ==========================
+# PIPELINE STAGES
+# ==========================
+
+def read_frames(cap):
+    while cap.isOpened():
+        success, frame = cap.read()
+        if not success:
+            break
+        yield frame
+
+
+class Inference:
+    """One MediaPipe Pose per worker thread."""
+
+    def __init__(self):
+        self.pose = mp.solutions.pose.Pose(
+            static_image_mode=False,
+            model_complexity=2,
+            enable_segmentation=False,
+            min_detection_confidence=0.5,
+            min_tracking_confidence=0.5,
+        )
+
+    def __call__(self, frame):
+        results = self.pose.process(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        return frame, results.pose_landmarks
+
+    def close(self):
+        self.pose.close()
+
+
+def build_landmarks(item):
+    frame, pose_landmarks = item
+    if pose_landmarks is None:
+        return frame, None
+    return frame, HelloWorld(pose_landmarks.landmark, storage="numpy")
+
+
+def render(item):
+    frame, landmarks = item
+    if landmarks is not None:
+        mp.solutions.drawing_utils.draw_landmarks(
+            image=frame,
+            landmark_list=landmarks.as_landmark_list(),
+            connections=Connections(landmarks).ALL_CONNECTIONS,
+            landmark_drawing_spec=get_extended_pose_landmarks_style(landmarks),
+            connection_drawing_spec=mp.solutions.drawing_utils.DrawingSpec(
+                color=(255, 255, 255), thickness=2
+            ),
+        )
+    return frame
+
+# ==========================
+# MAIN EXECUTION (VIDEO FILE)
+# ==========================
+
+def main():
+    video_path = os.path.join("examples", "videos", "video-1.mp4")
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"Video not found at: {video_path}")
+
+    cap = cv2.VideoCapture(video_path)
+
+    # Capture, inference, landmarks and rendering run concurrently.
+    # A single inference worker keeps MediaPipe's tracking state consistent.
+    pipeline = Pipeline(
+        read_frames(cap),
+        [Stage(factory=Inference, name="inference"), build_landmarks, render],
+    )
+
+    for frame in pipeline:
+        cv2.imshow("Pose Estimation - Pipeline", frame)
+        if cv2.waitKey(1) & 0xFF == ord('q'):
+            break
+
+    cap.release()
+    cv2.destroyAllWindows()
+
+if __name__ == "__main__":
+    main()
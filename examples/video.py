@@ -5,7 +5,7 @@ import os
 import cv2
 import mediapipe as mp
 from virtual_landmark import VirtualLandmark, landmark, calculus as calc
-from virtual_landmark import Connections, get_extended_pose_landmarks_style
+from virtual_landmark import LandmarkRenderer
 
 # ==========================
 # CUSTOM LANDMARK CLASS
@@ -78,6 +78,13 @@ def main():
         min_tracking_confidence=0.5,
     ) as pose:
 
+        landmarks = None
+        # Desenha direto do array de landmarks, sem montar um
+        # NormalizedLandmarkList para o drawing_utils do MediaPipe
+        renderer = LandmarkRenderer(
+            connection_drawing_spec=mp_drawing.DrawingSpec(color=(255, 255, 255), thickness=2)
+        )
+
         while cap.isOpened():
             success, frame = cap.read()
             if not success:
@@ -90,21 +97,14 @@ def main():
             results = pose.process(image_rgb)
 
             if results.pose_landmarks:
-                # Cria landmarks virtuais
-                landmarks = HelloWorld(results.pose_landmarks.landmark)
-                connections = Connections(landmarks)
-                style = get_extended_pose_landmarks_style(landmarks)
+                # Cria landmarks virtuais uma vez e reaproveita nos próximos frames
+                if landmarks is None:
+                    landmarks = HelloWorld(results.pose_landmarks.landmark, storage="numpy")
+                else:
+                    landmarks.update(results.pose_landmarks.landmark)
 
                 # Desenha no frame
-                mp_drawing.draw_landmarks(
-                    image=frame,
-                    landmark_list=landmarks.as_landmark_list(),
-                    connections=connections.ALL_CONNECTIONS,
-                    landmark_drawing_spec=style,
-                    connection_drawing_spec=mp_drawing.DrawingSpec(
-                        color=(255, 255, 255), thickness=2
-                    ),
-                )
+                renderer.draw(frame, landmarks)
 
             # Mostra o frame processado
             cv2.imshow("Pose Estimation - Video", frame)
@@ -4,7 +4,7 @@
 import cv2
 import mediapipe as mp
 from virtual_landmark import VirtualLandmark, landmark, calculus as calc
-from virtual_landmark import Connections, get_extended_pose_landmarks_style
+from virtual_landmark import LandmarkRenderer
 
 # ==========================
 # CUSTOM LANDMARK CLASS
@@ -52,6 +52,13 @@ def main():
         min_tracking_confidence=0.5,
     ) as pose:
 
+        landmarks = None
+        # Draws straight from the landmark array, without building a
+        # NormalizedLandmarkList for MediaPipe's drawing utilities
+        renderer = LandmarkRenderer(
+            connection_drawing_spec=mp_drawing.DrawingSpec(color=(255, 255, 255), thickness=2)
+        )
+
         while cap.isOpened():
             success, frame = cap.read()
             if not success:
@@ -65,21 +72,14 @@ def main():
             results = pose.process(image_rgb)
 
             if results.pose_landmarks:
-                # Build extended landmarks
-                landmarks = HelloWorld(results.pose_landmarks.landmark)
-                connections = Connections(landmarks)
-                landmark_style = get_extended_pose_landmarks_style(landmarks)
+                # Build extended landmarks once, then reuse them for every frame
+                if landmarks is None:
+                    landmarks = HelloWorld(results.pose_landmarks.landmark, storage="numpy")
+                else:
+                    landmarks.update(results.pose_landmarks.landmark)
 
                 # Draw landmarks on frame
-                mp_drawing.draw_landmarks(
-                    image=frame,
-                    landmark_list=landmarks.as_landmark_list(),
-                    connections=connections.ALL_CONNECTIONS,
-                    landmark_drawing_spec=landmark_style,
-                    connection_drawing_spec=mp_drawing.DrawingSpec(
-                        color=(255, 255, 255), thickness=2
-                    ),
-                )
+                renderer.draw(frame, landmarks)
 
             # Show result
             cv2.imshow("Real-Time Pose Estimation", frame)
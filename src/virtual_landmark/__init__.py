@@ -1,14 +1,28 @@
-from .drawing_utils import Connections, get_extended_pose_landmarks_style
 from .virtual_pose_landmark import VirtualPoseLandmark
 from .virtual_landmark import VirtualLandmark
-from .decorator import landmark
+from .decorator import angle, landmark
 from . import calculus
+from . import vectorized
 
 __ALL__ = [
     "get_extended_pose_landmarks_style",
     "VirtualPoseLandmark",
     "VirtualLandmark",
     "Connections",
+    "LandmarkRenderer",
     "calculus",
+    "vectorized",
     "landmark",
+    "angle",
 ]
+
+
+def __getattr__(name):
+    # Drawing needs OpenCV and MediaPipe, which are only imported when used
+    if name in ("Connections", "LandmarkRenderer", "get_extended_pose_landmarks_style"):
+        from . import drawing_utils
+
+        value = getattr(drawing_utils, name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -14,11 +14,56 @@
 
 import abc
 import numpy as np
-import mediapipe as mp
-from mediapipe.framework.formats import landmark_pb2
 
 from .virtual_pose_landmark import VirtualPoseLandmark
 
+PROTOBUF = "protobuf"
+NUMPY = "numpy"
+STORAGES = (PROTOBUF, NUMPY)
+
+
+def _landmark_pb2():
+    """
+    Returns MediaPipe's landmark message module. It is imported on first use,
+    so code working on arrays only never loads MediaPipe.
+    """
+    from mediapipe.framework.formats import landmark_pb2
+
+    return landmark_pb2
+
+
+def landmarks_to_array(landmarks) -> np.ndarray:
+    """
+    Converts landmarks to a `(N, 4)` float32 array of (x, y, z, visibility).
+
+    Args:
+        landmarks (Union[Sequence[NormalizedLandmark], np.ndarray]): MediaPipe
+            landmarks (protobuf messages, or the landmarks of the Tasks API,
+            whose visibility may be None), or an array of shape `(..., N, 3)`
+            or `(..., N, 4)`. Missing visibility values default to 1.0.
+
+    Returns:
+        np.ndarray: A new `(..., N, 4)` float32 array.
+
+    Raises:
+        ValueError: If an array input does not have 3 or 4 columns.
+    """
+    if isinstance(landmarks, np.ndarray):
+        if landmarks.ndim < 2 or landmarks.shape[-1] not in (3, 4):
+            raise ValueError("landmarks array must have shape (..., N, 3) or (..., N, 4)")
+
+        array = np.ones(landmarks.shape[:-1] + (4,), dtype=np.float32)
+        array[..., : landmarks.shape[-1]] = landmarks
+        return array
+
+    return np.array(
+        [
+            (lm.x, lm.y, lm.z, 1.0 if lm.visibility is None else lm.visibility)
+            for lm in landmarks
+        ],
+        dtype=np.float32,
+    ).reshape(-1, 4)
+
 
 class AbstractLandmark(abc.ABC):
     """
@@ -30,31 +75,113 @@ class AbstractLandmark(abc.ABC):
     `NormalizedLandmarkList`. It is designed to be extended by subclasses
     that compute and register additional landmarks dynamically.
 
+    Landmarks can be stored in one of two ways, selected by `storage`:
+
+    - `"protobuf"` (default): a `NormalizedLandmarkList`; indexing returns
+      `NormalizedLandmark` messages.
+    - `"numpy"`: a preallocated `(N, 4)` float32 array of (x, y, z, visibility);
+      indexing returns array rows and the `NormalizedLandmarkList` is only
+      built when `as_landmark_list()` is called.
+
+    The `"numpy"` storage also accepts stacked landmark sets, such as a
+    `(T, N, 4)` clip. Indexing then returns `(T, 4)` arrays, one row per
+    frame, so the same code computes landmarks for all frames at once.
+
+    With `"numpy"` storage, MediaPipe's world landmarks (`pose_world_landmarks`,
+    metric coordinates in meters centered on the hips) can be held next to
+    the normalized ones, in a `(2, N, 4)` array: indexing returns `(2, 4)`
+    arrays whose first row is normalized and second row is metric, so virtual
+    landmarks are computed in both coordinate spaces at once. `as_array()`
+    and `as_landmark_list()` return the normalized landmarks, and
+    `as_world_array()` and `as_world_landmark_list()` the metric ones.
+
     Attributes:
         landmark_list (NormalizedLandmarkList): Combined list of original and added landmarks.
     """
 
-    def __init__(self, landmarks):
+    def __init__(self, landmarks, storage: str = PROTOBUF, reserve: int = 0, world_landmarks=None):
         """
         Initializes the class with a copy of the original MediaPipe landmarks.
 
         Args:
             landmarks (List[NormalizedLandmark]): List of landmarks from MediaPipe's pose estimation.
-        """
-        self._landmark_list = landmark_pb2.NormalizedLandmarkList()
-        self._landmark_list.landmark.extend(landmarks)
+                With `"numpy"` storage, a `(..., N, 3)` or `(..., N, 4)` array is accepted as well.
+            storage (str): Either `"protobuf"` or `"numpy"`. Defaults to `"protobuf"`.
+            reserve (int): Number of virtual landmarks to preallocate room for
+                with `"numpy"` storage. Defaults to 0.
+            world_landmarks (List[Landmark], optional): The world landmarks of
+                the same pose (or an array of the same shape as `landmarks`).
+                Requires `"numpy"` storage.
 
-        self._virtual_landmark = VirtualPoseLandmark()
+        Raises:
+            ValueError: If the storage is unknown, or world landmarks are given
+                with `"protobuf"` storage or do not match the landmarks.
+        """
+        if storage not in STORAGES:
+            raise ValueError(f"storage must be one of {STORAGES}, got {storage!r}")
+        if world_landmarks is not None and storage != NUMPY:
+            raise ValueError("world landmarks require storage='numpy'")
+
+        self._storage = storage
+        self._world = world_landmarks is not None
+        self._world_list = None
+        self._world_synced = False
+
+        if storage == NUMPY:
+            base = landmarks_to_array(landmarks)
+            if self._world:
+                base = np.stack([base, self._world_array(world_landmarks, base.shape)], axis=-3)
+            self._size = base.shape[-2]
+            self._array = np.empty(
+                base.shape[:-2] + (self._size + reserve, 4), dtype=np.float32
+            )
+            self._array[..., : self._size, :] = base
+            self._landmark_list = None
+            self._synced = False
+        else:
+            self._landmark_list = _landmark_pb2().NormalizedLandmarkList()
+            self._landmark_list.landmark.extend(landmarks)
+
+        self._base_size = len(self)
+
+        self._virtual_landmark = self._create_registry()
 
         self._connections = set()
 
-    def _add_landmark(self, name: str, point):
+    @staticmethod
+    def _world_array(world_landmarks, shape) -> np.ndarray:
+        """
+        Converts world landmarks to an array, checking it matches the normalized ones.
+        """
+        world = landmarks_to_array(world_landmarks)
+        if world.shape != shape:
+            raise ValueError(
+                f"world landmarks must match the landmarks, got {world.shape} and {shape}"
+            )
+        return world
+
+    def _create_registry(self) -> VirtualPoseLandmark:
+        """
+        Returns the name/index registry of the instance.
+
+        Subclasses whose landmarks are known in advance can override it to
+        return a shared, frozen registry instead of building one per instance.
+
+        Returns:
+            VirtualPoseLandmark: A new registry with the built-in landmarks.
+        """
+        return VirtualPoseLandmark()
+
+    def _add_landmark(self, name: str, point, visibility=1.0):
         """
         Adds a new virtual landmark to the landmark list.
 
         Args:
             point (Union[tuple, list, np.ndarray]): A normalized 3D point (x, y, z), 
-                where each value is typically between 0 and 1.
+                where each value is typically between 0 and 1. With stacked
+                `"numpy"` storage, a `(..., 3)` array with one point per set.
+            visibility (Union[float, np.ndarray]): Visibility of the landmark,
+                or a `(...,)` array with one value per set. Defaults to 1.0.
 
         Returns:
             int: Index of the newly added landmark in the full landmark list.
@@ -62,20 +189,165 @@ class AbstractLandmark(abc.ABC):
         Raises:
             ValueError: If the input point is not a 3D coordinate.
         """
-        if not isinstance(point, (list, tuple, np.ndarray)) or len(point) < 3:
+        if (
+            not isinstance(point, (list, tuple, np.ndarray))
+            or np.ndim(point) == 0
+            or np.shape(point)[-1] < 3
+        ):
             raise ValueError("point must be a 3D tuple/list/np.ndarray")
 
-        lm = landmark_pb2.NormalizedLandmark()
-        lm.x, lm.y, lm.z = float(point[0]), float(point[1]), float(point[2])
-        lm.visibility = 1.0
-        self._landmark_list.landmark.append(lm)
+        if self._storage == NUMPY:
+            idx = self._size
+            if idx == self._array.shape[-2]:
+                grown = np.empty(
+                    self._array.shape[:-2] + (max(2 * idx, 1), 4), dtype=np.float32
+                )
+                grown[..., :idx, :] = self._array
+                self._array = grown
 
-        idx = len(self._landmark_list.landmark) - 1
+            self._size += 1
+        else:
+            self._landmark_list.landmark.add()
+            idx = len(self._landmark_list.landmark) - 1
 
-        self._virtual_landmark[name] = idx
+        self._set_landmark(idx, point, visibility)
+        if dict.get(self._virtual_landmark, name) != idx:
+            self._virtual_landmark[name] = idx
 
         return idx
 
+    def _set_landmark(self, idx: int, point, visibility=1.0):
+        """
+        Overwrites the coordinates of an existing landmark in place.
+
+        Args:
+            idx (int): Index of the landmark.
+            point (Union[tuple, list, np.ndarray]): The new 3D point (x, y, z).
+            visibility (Union[float, np.ndarray]): The new visibility. Defaults to 1.0.
+        """
+        if self._storage == NUMPY:
+            self._array[..., idx, :3] = np.asarray(point)[..., :3]
+            self._array[..., idx, 3] = visibility
+            self._synced = self._world_synced = False
+        else:
+            lm = self._landmark_list.landmark[idx]
+            lm.x, lm.y, lm.z = float(point[0]), float(point[1]), float(point[2])
+            lm.visibility = float(visibility)
+
+    def _visibility_column(self, size: int) -> np.ndarray:
+        """
+        Returns the visibility of every landmark as one array.
+
+        Args:
+            size (int): Minimum number of columns, including room for
+                landmarks that are not added yet (filled with 1.0).
+
+        Returns:
+            np.ndarray: A `(..., M)` array with `M >= size`. With `"numpy"`
+                storage it is a view of the internal buffer, so the visibility
+                written by `_set_landmark` shows up in it; with `"protobuf"`
+                storage it is a new array.
+        """
+        if self._storage == NUMPY and self._array.shape[-2] >= size:
+            return self._array[..., 3]
+
+        column = np.ones(max(size, len(self)), dtype=np.float32)
+        if self._storage == NUMPY:
+            column = np.ones(self._array.shape[:-2] + column.shape, dtype=np.float32)
+            column[..., : self._size] = self._array[..., : self._size, 3]
+        else:
+            column[: len(self)] = [lm.visibility for lm in self._landmark_list.landmark]
+        return column
+
+    def _coordinates(self, positions, index: np.ndarray = None) -> np.ndarray:
+        """
+        Reads the (x, y, z) coordinates of several landmarks.
+
+        Args:
+            positions (Sequence[int]): Indices of the landmarks.
+            index (np.ndarray, optional): The same indices as an array, used
+                with `"numpy"` storage to avoid a conversion.
+
+        Returns:
+            np.ndarray: A `(..., M, 3)` array.
+        """
+        if self._storage == NUMPY:
+            return self._array[..., positions if index is None else index, :3]
+
+        messages = self._landmark_list.landmark
+        return np.array([(m.x, m.y, m.z) for m in (messages[i] for i in positions)]).reshape(-1, 3)
+
+    def _visibility(self, positions, index: np.ndarray = None):
+        """
+        Reads the visibility of several landmarks.
+
+        Args:
+            positions (Sequence[int]): Indices of the landmarks.
+            index (np.ndarray, optional): The same indices as an array, used
+                with `"numpy"` storage to avoid a conversion.
+
+        Returns:
+            Union[List[float], np.ndarray]: A list of values with `"protobuf"`
+                storage, or a `(..., M)` array with `"numpy"` storage.
+        """
+        if self._storage == NUMPY:
+            return self._array[..., positions if index is None else index, 3]
+
+        messages = self._landmark_list.landmark
+        return [messages[i].visibility for i in positions]
+
+    def _reset_landmarks(self, landmarks, world_landmarks=None):
+        """
+        Overwrites the original (non-virtual) landmarks in place, reusing the
+        existing buffers.
+
+        Args:
+            landmarks (List[NormalizedLandmark]): New landmarks, as many as the
+                instance was created with. With `"numpy"` storage, an array of
+                the same shape as the original landmarks is accepted as well.
+            world_landmarks (List[Landmark], optional): New world landmarks.
+                Required if, and only if, the instance holds world landmarks.
+
+        Raises:
+            ValueError: If the number of landmarks differs, an array does not
+                have the shape of the original landmarks (with 3 or 4 columns),
+                or world landmarks are missing or unexpected.
+        """
+        base = self._base_size
+
+        if (world_landmarks is not None) != self._world:
+            raise ValueError(
+                "world landmarks are required" if self._world else "the instance has no world landmarks"
+            )
+
+        if self._storage == NUMPY:
+            if self._world:
+                normalized = landmarks_to_array(landmarks)
+                world = self._world_array(world_landmarks, normalized.shape)
+                landmarks = np.stack([normalized, world], axis=-3)
+            elif not isinstance(landmarks, np.ndarray):
+                landmarks = landmarks_to_array(landmarks)
+            elif landmarks.ndim < 2 or landmarks.shape[-1] not in (3, 4):
+                raise ValueError("landmarks array must have shape (..., N, 3) or (..., N, 4)")
+            if landmarks.shape[-2] != base:
+                raise ValueError(f"expected {base} landmarks, got {landmarks.shape[-2]}")
+            if landmarks.shape[:-2] != self._array.shape[:-2]:
+                raise ValueError(
+                    f"expected landmark sets of shape {self._array.shape[:-2]}, got {landmarks.shape[:-2]}"
+                )
+
+            columns = landmarks.shape[-1]
+            self._array[..., :base, :columns] = landmarks
+            if columns == 3:
+                self._array[..., :base, 3] = 1.0
+            self._synced = self._world_synced = False
+        else:
+            if len(landmarks) != base:
+                raise ValueError(f"expected {base} landmarks, got {len(landmarks)}")
+
+            for dst, src in zip(self._landmark_list.landmark, landmarks):
+                dst.CopyFrom(src)
+
     def _add_connection(self, name: str, targets: list):
         """
         Adds connections between a landmark and a list of other landmarks.
@@ -93,11 +365,114 @@ class AbstractLandmark(abc.ABC):
         """
         Returns the complete landmark list in the MediaPipe format.
 
+        With `"numpy"` storage the list is materialized on demand and reused
+        (updated in place) by later calls.
+
         Returns:
             NormalizedLandmarkList: Combined list of original and custom landmarks.
+
+        Raises:
+            ValueError: If the instance holds stacked landmark sets.
         """
+        if self._storage == NUMPY and self._array.ndim > 2 + self._world:
+            raise ValueError("as_landmark_list() requires a single landmark set")
+
+        if self._storage == NUMPY and not self._synced:
+            if self._landmark_list is None:
+                self._landmark_list = _landmark_pb2().NormalizedLandmarkList()
+            self._fill_list(self._landmark_list, self.as_array())
+            self._synced = True
+
         return self._landmark_list
 
+    def as_world_landmark_list(self):
+        """
+        Returns the complete world landmark list in the MediaPipe format.
+
+        The list is materialized on demand and reused (updated in place) by
+        later calls.
+
+        Returns:
+            LandmarkList: Original and custom landmarks, in meters.
+
+        Raises:
+            ValueError: If the instance has no world landmarks, or holds
+                stacked landmark sets.
+        """
+        world = self.as_world_array()
+        if world.ndim > 2:
+            raise ValueError("as_world_landmark_list() requires a single landmark set")
+
+        if not self._world_synced:
+            if self._world_list is None:
+                self._world_list = _landmark_pb2().LandmarkList()
+            self._fill_list(self._world_list, world)
+            self._world_synced = True
+
+        return self._world_list
+
+    @staticmethod
+    def _fill_list(landmark_list, array: np.ndarray):
+        """
+        Overwrites a MediaPipe landmark list with the rows of a `(N, 4)` array.
+        """
+        messages = landmark_list.landmark
+        while len(messages) < len(array):
+            messages.add()
+        del messages[len(array) :]
+
+        for lm, (x, y, z, visibility) in zip(messages, array.tolist()):
+            lm.x, lm.y, lm.z, lm.visibility = x, y, z, visibility
+
+    def as_array(self) -> np.ndarray:
+        """
+        Returns the complete landmark set as a `(N, 4)` float32 array.
+
+        With `"numpy"` storage this is a view of the internal buffer (of shape
+        `(..., N, 4)` for stacked landmark sets); with `"protobuf"` storage a
+        new array is built. With world landmarks, only the normalized ones are
+        returned.
+
+        Returns:
+            np.ndarray: Rows of (x, y, z, visibility), original and custom landmarks.
+        """
+        if self._storage == NUMPY:
+            if self._world:
+                return self._array[..., 0, : self._size, :]
+            return self._array[..., : self._size, :]
+
+        return landmarks_to_array(self._landmark_list.landmark)
+
+    def as_world_array(self) -> np.ndarray:
+        """
+        Returns the complete world landmark set as a `(N, 4)` float32 array view.
+
+        Returns:
+            np.ndarray: Rows of (x, y, z, visibility) in meters, original and
+                custom landmarks (`(..., N, 4)` for stacked landmark sets).
+
+        Raises:
+            ValueError: If the instance has no world landmarks.
+        """
+        if not self._world:
+            raise ValueError("the instance has no world landmarks")
+
+        return self._array[..., 1, : self._size, :]
+
+    @property
+    def storage(self) -> str:
+        """
+        Returns the storage mode, either `"protobuf"` or `"numpy"`.
+        """
+        return self._storage
+
+    @property
+    def has_world(self) -> bool:
+        """
+        Returns whether the instance holds world landmarks.
+        """
+        return self._world
+
     def __getitem__(self, idx):
         """
         Access a landmark by index.
@@ -106,8 +481,14 @@ class AbstractLandmark(abc.ABC):
             idx (int): Index of the landmark.
 
         Returns:
-            NormalizedLandmark: Landmark at the given index.
+            Union[NormalizedLandmark, np.ndarray]: Landmark at the given index, as
+                a message with `"protobuf"` storage or a `(..., 4)` array with `"numpy"` storage.
         """
+        if self._storage == NUMPY:
+            if isinstance(idx, int) and 0 <= idx < self._size:
+                return self._array[..., idx, :]
+            return self._array[..., : self._size, :][..., idx, :]
+
         return self._landmark_list.landmark[idx]
 
     def __len__(self):
@@ -117,6 +498,9 @@ class AbstractLandmark(abc.ABC):
         Returns:
             int: Count of all landmarks (original + custom).
         """
+        if self._storage == NUMPY:
+            return self._size
+
         return len(self._landmark_list.landmark)
 
     def __iter__(self):
@@ -126,6 +510,9 @@ class AbstractLandmark(abc.ABC):
         Returns:
             Iterator[NormalizedLandmark]: An iterator over all landmarks.
         """
+        if self._storage == NUMPY:
+            return iter(np.moveaxis(self._array[..., : self._size, :], -2, 0))
+
         return iter(self._landmark_list.landmark)
     
     def __contains__(self, index: int) -> bool:
@@ -0,0 +1,310 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+asyncio integration.
+
+MediaPipe inference and the evaluation of virtual landmarks are blocking
+calls: in an asyncio service, e.g. one receiving frames over websockets, they
+would stall the event loop and every other client with it. A shared
+`LandmarkExecutor` runs them on a thread pool with bounded concurrency, and
+an `AsyncPoseSession` processes the frames of one stream in order:
+
+    >>> executor = LandmarkExecutor(max_workers=4)
+    >>> async def handle(websocket):
+    ...     async with AsyncPoseSession(HelloWorld, executor) as session:
+    ...         async for pose in session.stream(receive_frames(websocket)):
+    ...             if pose is not None:
+    ...                 await websocket.send(pose.as_array().tobytes())
+
+Sessions only wait for each other when the executor is saturated, so a slow
+client does not hold back the others.
+"""
+
+import asyncio
+import collections
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+from .abstract_landmark import NUMPY
+from .detector import PoseDetector
+from .virtual_landmark import VirtualLandmark
+
+
+class LandmarkExecutor:
+    """
+    Runs blocking calls for coroutines on a shared thread pool.
+
+    At most `max_pending` calls are submitted to the pool at any time; further
+    callers wait (without blocking the event loop) until a call finishes,
+    which bounds the memory held by queued frames.
+
+    Args:
+        max_workers (int, optional): Number of threads. Defaults to the number
+            of CPUs, up to 4.
+        max_pending (int, optional): Maximum number of calls submitted at once,
+            running or queued. Defaults to twice `max_workers`.
+
+    Raises:
+        ValueError: If `max_workers` or `max_pending` is lower than 1.
+    """
+
+    def __init__(self, max_workers: int = None, max_pending: int = None):
+        if max_workers is None:
+            max_workers = min(4, os.cpu_count() or 1)
+        if max_pending is None:
+            max_pending = 2 * max_workers
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        if max_pending < 1:
+            raise ValueError("max_pending must be at least 1.")
+
+        self._pool = ThreadPoolExecutor(max_workers, thread_name_prefix="virtual-landmark")
+        self._slots = asyncio.Semaphore(max_pending)
+        self._closed = False
+
+    async def run(self, fn: Callable, *args):
+        """
+        Calls `fn(*args)` in a worker thread.
+
+        If the caller is cancelled while the call is running, the call still
+        holds its slot until it returns.
+
+        Returns:
+            The value returned by `fn`.
+
+        Raises:
+            RuntimeError: If the executor is closed.
+            Exception: Any exception raised by `fn`.
+        """
+        if self._closed:
+            raise RuntimeError("The executor is closed.")
+
+        await self._slots.acquire()
+        try:
+            future = self._pool.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        loop = asyncio.get_running_loop()
+
+        def release(_):
+            try:
+                loop.call_soon_threadsafe(self._slots.release)
+            except RuntimeError:  # the loop is closed
+                pass
+
+        future.add_done_callback(release)
+        return await asyncio.wrap_future(future)
+
+    def close(self):
+        """
+        Stops accepting calls and waits for the submitted ones to finish.
+        """
+        self._closed = True
+        self._pool.shutdown(wait=True)
+
+    async def aclose(self):
+        """
+        Same as `close()`, without blocking the event loop.
+        """
+        self._closed = True
+        await asyncio.get_running_loop().run_in_executor(None, self._pool.shutdown)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+
+class AsyncPoseSession:
+    """
+    Processes the frames of one stream (e.g. one client) in order.
+
+    Each session owns a detector, created in a worker thread on the first
+    frame. Detection is stateful (MediaPipe tracks the pose from frame to
+    frame), so the frames of a session are detected one at a time, in the
+    order `process_frame()` was called. The virtual landmarks of a frame are
+    evaluated while the next frame is detected.
+
+    Args:
+        landmark_class (type): The `VirtualLandmark` subclass to evaluate.
+        executor (LandmarkExecutor, optional): The executor shared by the
+            sessions. Defaults to a private single-thread executor, closed
+            with the session.
+        detector (Callable, optional): Zero-argument callable creating the
+            detector: a callable mapping a frame to a landmark array, or None
+            when nobody is detected. If it has a `close()` method, it is
+            called when the session is closed. Defaults to `PoseDetector`
+            (MediaPipe `Pose` on BGR frames). With None, frames are landmarks
+            already (arrays or landmark lists) and only their evaluation is
+            offloaded.
+        storage (str): Storage of the landmark instances. Defaults to `"numpy"`.
+        lazy (bool): Whether the instances compute their virtual landmarks on
+            demand. Defaults to False.
+
+    Raises:
+        TypeError: If `landmark_class` is not a `VirtualLandmark` subclass.
+    """
+
+    def __init__(
+        self,
+        landmark_class: type,
+        executor: LandmarkExecutor = None,
+        detector: Callable = PoseDetector,
+        storage: str = NUMPY,
+        lazy: bool = False,
+    ):
+        if not (isinstance(landmark_class, type) and issubclass(landmark_class, VirtualLandmark)):
+            raise TypeError("landmark_class must be a VirtualLandmark subclass")
+
+        self._class = landmark_class
+        self._own_executor = executor is None
+        self._executor = LandmarkExecutor(max_workers=1) if executor is None else executor
+        self._factory = detector
+        self._detector = None
+        self._storage = storage
+        self._lazy = lazy
+        self._order = asyncio.Lock()  # wakes waiters first-in, first-out
+        self._closed = False
+
+    def _detect(self, frame):
+        if self._detector is None:
+            self._detector = self._factory()
+        return self._detector(frame)
+
+    def _evaluate(self, landmarks):
+        return self._class(landmarks, storage=self._storage, lazy=self._lazy)
+
+    async def _detect_in_order(self, frame):
+        async with self._order:
+            detection = asyncio.ensure_future(self._executor.run(self._detect, frame))
+            try:
+                return await asyncio.shield(detection)
+            except asyncio.CancelledError:
+                # The detector keeps running in its worker thread: hold the
+                # lock until it returns, so the next frame (or aclose) does
+                # not use the detector concurrently.
+                while not detection.done():
+                    try:
+                        await asyncio.wait((detection,))
+                    except asyncio.CancelledError:
+                        pass
+                if not detection.cancelled():
+                    detection.exception()  # nobody is left to receive it
+                raise
+
+    async def process_frame(self, frame):
+        """
+        Detects the pose of a frame and evaluates its virtual landmarks.
+
+        Args:
+            frame: An image for the detector, or landmarks if the session has
+                no detector.
+
+        Returns:
+            Optional[VirtualLandmark]: A new instance holding the landmarks of
+                the frame, or None if no pose was detected.
+
+        Raises:
+            RuntimeError: If the session is closed.
+            Exception: Any exception raised by the detector or a landmark method.
+        """
+        if self._closed:
+            raise RuntimeError("The session is closed.")
+
+        landmarks = frame
+        if self._factory is not None:
+            landmarks = await self._detect_in_order(frame)
+            if landmarks is None:
+                return None
+
+        return await self._executor.run(self._evaluate, landmarks)
+
+    async def stream(self, frames, prefetch: int = 2):
+        """
+        Processes a stream of frames, yielding the results in order.
+
+        Up to `prefetch` frames are processed concurrently, so detecting a
+        frame overlaps with receiving the next one and with evaluating the
+        previous one.
+
+        Args:
+            frames (Union[Iterable, AsyncIterable]): The frames.
+            prefetch (int): Maximum number of frames in flight. Defaults to 2.
+
+        Yields:
+            Optional[VirtualLandmark]: The result of each frame, see `process_frame()`.
+
+        Raises:
+            ValueError: If `prefetch` is lower than 1.
+        """
+        if prefetch < 1:
+            raise ValueError("prefetch must be at least 1.")
+
+        pending = collections.deque()
+        try:
+            if hasattr(frames, "__aiter__"):
+                async for frame in frames:
+                    pending.append(asyncio.ensure_future(self.process_frame(frame)))
+                    if len(pending) >= prefetch:
+                        yield await pending.popleft()
+            else:
+                for frame in frames:
+                    pending.append(asyncio.ensure_future(self.process_frame(frame)))
+                    if len(pending) >= prefetch:
+                        yield await pending.popleft()
+
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+
+    async def aclose(self):
+        """
+        Waits for the frame being detected, then closes the detector and the
+        private executor, if any.
+        """
+        if self._closed:
+            return
+        self._closed = True
+
+        async with self._order:
+            close = getattr(self._detector, "close", None)
+            if callable(close):
+                await self._executor.run(close)
+            self._detector = None
+
+        if self._own_executor:
+            await self._executor.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.aclose()
+
+    def __repr__(self):
+        return f"<AsyncPoseSession class={self._class.__name__} storage={self._storage}>"
@@ -0,0 +1,291 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Command-line tool to extract landmarks from a directory of videos.
+
+Videos are distributed over a pool of processes, each one running its own
+MediaPipe `Pose`. For every video the raw landmarks are collected into a
+`(T, 33, 4)` array, the virtual landmarks of an optional `VirtualLandmark`
+subclass are computed for the whole clip at once, and the result is saved
+next to the frame timestamps in a `.npz` file or a `.vlm` recording (see
+`virtual_landmark.recording`).
+
+Outputs are written atomically, so an interrupted run can be resumed: videos
+whose output already exists are skipped.
+
+Example:
+    python -m virtual_landmark.batch videos/ landmarks/ \\
+        --landmarks my_package.skeleton:HelloWorld --workers 8
+"""
+
+import argparse
+import fnmatch
+import importlib
+import multiprocessing
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from .detector import PoseDetector
+from .recording import EXTENSION, RecordingWriter
+
+NUM_LANDMARKS = 33
+DEFAULT_PATTERNS = ("*.mp4", "*.avi", "*.mov", "*.mkv")
+
+# Per-process state, set by _init_worker
+_worker = {}
+
+
+def load_class(spec: str) -> type:
+    """
+    Imports a class from a `"module:ClassName"` specification.
+
+    Args:
+        spec (str): Module path and class name, separated by a colon.
+
+    Returns:
+        type: The imported class.
+
+    Raises:
+        ValueError: If the specification is malformed or the class does not exist.
+    """
+    module_name, _, class_name = spec.partition(":")
+    if not module_name or not class_name:
+        raise ValueError(f"Expected 'module:ClassName', got {spec!r}")
+
+    module = importlib.import_module(module_name)
+    try:
+        return getattr(module, class_name)
+    except AttributeError:
+        raise ValueError(f"Module {module_name!r} has no class {class_name!r}") from None
+
+
+def find_videos(input_dir, patterns=DEFAULT_PATTERNS) -> list:
+    """
+    Lists the videos of a directory tree, sorted by path.
+
+    Args:
+        input_dir (Union[str, Path]): Directory to search recursively.
+        patterns (Iterable[str]): Filename patterns of the videos.
+
+    Returns:
+        List[Path]: The matching files.
+    """
+    return sorted(
+        path
+        for path in Path(input_dir).rglob("*")
+        if path.is_file() and any(fnmatch.fnmatch(path.name.lower(), p) for p in patterns)
+    )
+
+
+def output_path(video, input_dir, output_dir, extension: str = ".npz") -> Path:
+    """
+    Returns the output file of a video, mirroring the input directory tree.
+    """
+    relative = Path(video).relative_to(input_dir)
+    return Path(output_dir) / relative.with_suffix(extension)
+
+
+def read_landmarks(video, detect):
+    """
+    Runs a detector on every frame of a video.
+
+    Args:
+        video (Union[str, Path]): Path of the video.
+        detect (Callable[[np.ndarray], Optional[np.ndarray]]): Takes a BGR
+            frame and returns a `(33, 4)` landmark array, or None when no pose
+            is found.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: A `(T, 33, 4)` float32 array, with NaN
+            rows for frames without a pose, and the `(T,)` frame timestamps
+            in seconds.
+
+    Raises:
+        IOError: If the video cannot be opened.
+    """
+    import cv2
+
+    cap = cv2.VideoCapture(str(video))
+    if not cap.isOpened():
+        raise IOError(f"Cannot open video {video}")
+
+    frames, timestamps = [], []
+    missing = np.full((NUM_LANDMARKS, 4), np.nan, dtype=np.float32)
+    try:
+        while True:
+            success, frame = cap.read()
+            if not success:
+                break
+            timestamps.append(cap.get(cv2.CAP_PROP_POS_MSEC) / 1000.0)
+            landmarks = detect(frame)
+            frames.append(missing if landmarks is None else landmarks)
+    finally:
+        cap.release()
+
+    array = np.array(frames, dtype=np.float32).reshape(-1, NUM_LANDMARKS, 4)
+    return array, np.array(timestamps, dtype=np.float64)
+
+
+def process_video(video, destination, detect, landmark_class=None) -> int:
+    """
+    Extracts the landmarks of a video and saves them to a file.
+
+    With a `.vlm` destination the file is a landmark recording. Otherwise it is
+    a `.npz` file holding `landmarks` (`(T, N, 4)` float32), `timestamps`
+    (`(T,)` seconds) and `names` (the virtual landmark names, in index order
+    from 33). It is written to a temporary file first and renamed when complete.
+
+    Args:
+        video (Union[str, Path]): Path of the video.
+        destination (Union[str, Path]): Path of the output file.
+        detect (Callable): Frame detector, see `read_landmarks`.
+        landmark_class (type, optional): `VirtualLandmark` subclass whose
+            virtual landmarks are added to the output.
+
+    Returns:
+        int: Number of frames processed.
+    """
+    landmarks, timestamps = read_landmarks(video, detect)
+
+    if landmark_class is None:
+        from .virtual_landmark import VirtualLandmark as landmark_class
+    else:
+        landmarks = landmark_class.evaluate_clip(landmarks)  # (0, 33, 4) without frames
+
+    # Names of the landmarks actually saved, from index 33
+    registry = landmark_class._registry
+    names = [registry[idx] for idx in range(NUM_LANDMARKS, landmarks.shape[1])]
+
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    partial = destination.with_name(destination.name + ".partial")
+
+    if destination.suffix == EXTENSION:
+        metadata = {"video": str(video)}
+        with RecordingWriter.for_class(partial, landmark_class, metadata) as writer:
+            writer.extend(landmarks, timestamps)
+    else:
+        with open(partial, "wb") as f:
+            np.savez(f, landmarks=landmarks, timestamps=timestamps, names=np.array(names, dtype=str))
+
+    os.replace(partial, destination)
+
+    return len(landmarks)
+
+
+def _init_worker(spec, model_complexity):
+    _worker["class"] = load_class(spec) if spec else None
+    _worker["detector"] = PoseDetector(model_complexity)
+
+
+def _run(job):
+    video, destination = job
+    detector = _worker["detector"]
+    start = time.perf_counter()
+    try:
+        detector.reset()
+        frames = process_video(video, destination, detector, _worker["class"])
+    except Exception as error:
+        return video, None, f"{type(error).__name__}: {error}"
+    return video, frames, time.perf_counter() - start
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="virtual-landmark-batch",
+        description="Extract pose landmarks from a directory of videos.",
+    )
+    parser.add_argument("input_dir", type=Path, help="directory containing the videos")
+    parser.add_argument("output_dir", type=Path, help="directory for the landmark files")
+    parser.add_argument(
+        "--landmarks",
+        metavar="MODULE:CLASS",
+        help="VirtualLandmark subclass whose virtual landmarks are added",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="number of worker processes (default: number of CPUs)",
+    )
+    parser.add_argument(
+        "--pattern",
+        action="append",
+        dest="patterns",
+        help="video filename pattern, may be repeated (default: common video extensions)",
+    )
+    parser.add_argument(
+        "--model-complexity", type=int, default=1, choices=(0, 1, 2), help="MediaPipe model complexity"
+    )
+    parser.add_argument(
+        "--format",
+        choices=("npz", "vlm"),
+        default="npz",
+        help="output format: NumPy archive or landmark recording (default: npz)",
+    )
+    parser.add_argument(
+        "--overwrite", action="store_true", help="process videos whose output already exists"
+    )
+    return parser
+
+
+def main(argv=None) -> int:
+    """
+    Entry point of the command-line tool.
+
+    Returns:
+        int: Exit status, 1 if any video failed.
+    """
+    args = build_parser().parse_args(argv)
+
+    if args.landmarks:
+        load_class(args.landmarks)  # fail fast on a bad specification
+
+    videos = find_videos(args.input_dir, args.patterns or DEFAULT_PATTERNS)
+    jobs = []
+    for video in videos:
+        destination = output_path(video, args.input_dir, args.output_dir, f".{args.format}")
+        if args.overwrite or not destination.exists():
+            jobs.append((video, destination))
+
+    skipped = len(videos) - len(jobs)
+    print(f"{len(videos)} videos found, {skipped} already processed", file=sys.stderr)
+    if not jobs:
+        return 0
+
+    failures = 0
+    context = multiprocessing.get_context("spawn")
+    with context.Pool(
+        processes=max(1, min(args.workers, len(jobs))),
+        initializer=_init_worker,
+        initargs=(args.landmarks, args.model_complexity),
+    ) as pool:
+        for done, (video, frames, info) in enumerate(pool.imap_unordered(_run, jobs), start=1):
+            prefix = f"[{done}/{len(jobs)}] {video}"
+            if frames is None:
+                failures += 1
+                print(f"{prefix}: failed ({info})", file=sys.stderr)
+            else:
+                print(f"{prefix}: {frames} frames in {info:.1f}s", file=sys.stderr)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -12,12 +12,85 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from __future__ import annotations
+
+import math
+from typing import TYPE_CHECKING, Tuple, Union
+
 import numpy as np
-from mediapipe.framework.formats.landmark_pb2 import NormalizedLandmark
-from typing import Tuple
+
+if TYPE_CHECKING:
+    from mediapipe.framework.formats.landmark_pb2 import NormalizedLandmark
+
+from . import vectorized
+
+# A single point as an (x, y, z) tuple, or a batch of points as a `(..., 3)` array
+Point = Union[Tuple[float, float, float], np.ndarray]
+
+
+def _coords(p) -> np.ndarray:
+    """
+    Returns the (x, y, z) coordinates of a point as a NumPy array.
+
+    Accepts `NormalizedLandmark` messages as well as array rows (x, y, z[, visibility])
+    such as the ones returned by landmarks stored with `"numpy"` storage, and
+    tuples returned by the other functions of this module.
+    """
+    if isinstance(p, np.ndarray):
+        return p[..., :3]
+    if isinstance(p, (tuple, list)):
+        return np.asarray(p, dtype=float)[..., :3]
+    return np.array([p.x, p.y, p.z])
+
+
+def _pack(v: np.ndarray):
+    """
+    Returns single points as tuples, and batches of points (e.g. array rows
+    stacked over frames or people) as `(..., 3)` arrays.
+    """
+    return tuple(v) if v.ndim == 1 else v
 
 
-def middle(p1: NormalizedLandmark, p2: NormalizedLandmark) -> Tuple[float, float, float]:
+def _single(*points):
+    """
+    Returns the (x, y, z) coordinates of single points as tuples of floats, or
+    None if any of them is a batch of points.
+
+    Single points are computed with plain float arithmetic: for one point the
+    overhead of NumPy outweighs the computation itself. Batches are handed to
+    `vectorized`.
+    """
+    coords = []
+    for p in points:
+        if isinstance(p, np.ndarray):
+            if p.ndim != 1:
+                return None
+            coords.append(tuple(p[:3].tolist()))
+        elif isinstance(p, (tuple, list)):
+            if isinstance(p[0], (tuple, list, np.ndarray)):
+                return None
+            coords.append((float(p[0]), float(p[1]), float(p[2])))
+        else:
+            coords.append((p.x, p.y, p.z))
+    return coords
+
+
+def _is_scalar(*values) -> bool:
+    """
+    Returns whether all the parameters are scalars (and not per-point arrays).
+    """
+    return all(isinstance(v, (int, float, np.number)) for v in values)
+
+
+def _unit(x: float, y: float, z: float) -> Tuple[float, float, float]:
+    """
+    Scales a vector to unit length, leaving a zero-length vector untouched.
+    """
+    norm = math.sqrt(x * x + y * y + z * z)
+    return (x / norm, y / norm, z / norm) if norm != 0 else (x, y, z)
+
+
+def middle(p1: NormalizedLandmark, p2: NormalizedLandmark) -> Point:
     """
     Calculates the geometric midpoint between two landmarks.
 
@@ -28,49 +101,62 @@ def middle(p1: NormalizedLandmark, p2: NormalizedLandmark) -> Tuple[float, float
         p2 (NormalizedLandmark): Second landmark.
 
     Returns:
-        Tuple[float, float, float]: The midpoint (x, y, z).
+        Point: The midpoint (x, y, z).
     """
-    a = np.array([p1.x, p1.y, p1.z])
-    b = np.array([p2.x, p2.y, p2.z])
-    return tuple((a + b) / 2)
+    points = _single(p1, p2)
+    if points is None:
+        return _pack(vectorized.middle(_coords(p1), _coords(p2)))
+    (ax, ay, az), (bx, by, bz) = points
+    return ((ax + bx) / 2, (ay + by) / 2, (az + bz) / 2)
 
 
-def projection(p1: NormalizedLandmark, p2: NormalizedLandmark, target: NormalizedLandmark) -> Tuple[float, float, float]:
+def projection(p1: NormalizedLandmark, p2: NormalizedLandmark, target: NormalizedLandmark) -> Point:
     """
     Projects a point onto the line defined by two other landmarks.
 
+    A degenerate line (`p1 == p2`) projects onto `p1`, as in `vectorized`.
+
     Args:
         p1 (NormalizedLandmark): First point on the line.
         p2 (NormalizedLandmark): Second point on the line.
         target (NormalizedLandmark): The point to be projected.
 
     Returns:
-        Tuple[float, float, float]: Coordinates of the projected point.
+        Point: Coordinates of the projected point.
     """
-    a = np.array([p1.x, p1.y, p1.z])
-    b = np.array([p2.x, p2.y, p2.z])
-    p = np.array([target.x, target.y, target.z])
-    ab = b - a
-    ap = p - a
-    t = np.dot(ap, ab) / np.dot(ab, ab)
-    return tuple(a + t * ab)
+    points = _single(p1, p2, target)
+    if points is None:
+        return _pack(vectorized.projection(_coords(p1), _coords(p2), _coords(target)))
+    (ax, ay, az), (bx, by, bz), (px, py, pz) = points
+    abx, aby, abz = bx - ax, by - ay, bz - az
+    denom = abx * abx + aby * aby + abz * abz
+    t = ((px - ax) * abx + (py - ay) * aby + (pz - az) * abz) / denom if denom != 0 else 0.0
+    return (ax + t * abx, ay + t * aby, az + t * abz)
 
 
-def centroid(*points: NormalizedLandmark) -> Tuple[float, float, float]:
+def centroid(*points: NormalizedLandmark) -> Point:
     """
     Calculates the centroid (geometric center) of multiple landmarks.
 
     Args:
-        *points (NormalizedLandmark): Any number of landmarks.
+        *points (NormalizedLandmark): Any number of landmarks, at least one.
 
     Returns:
-        Tuple[float, float, float]: Coordinates of the centroid.
+        Point: Coordinates of the centroid.
+
+    Raises:
+        ValueError: If no point is given.
     """
-    coords = np.array([[p.x, p.y, p.z] for p in points])
-    return tuple(np.mean(coords, axis=0))
+    if not points:
+        raise ValueError("centroid() requires at least one point")
+    coords = _single(*points)
+    if coords is None:
+        return _pack(vectorized.centroid(*[_coords(p) for p in points]))
+    n = len(coords)
+    return tuple(sum(axis) / n for axis in zip(*coords))
 
 
-def mirror(p: NormalizedLandmark, axis_point: NormalizedLandmark) -> Tuple[float, float, float]:
+def mirror(p: NormalizedLandmark, axis_point: NormalizedLandmark) -> Point:
     """
     Reflects a landmark across a vertical axis defined by another point.
 
@@ -81,13 +167,16 @@ def mirror(p: NormalizedLandmark, axis_point: NormalizedLandmark) -> Tuple[float
         axis_point (NormalizedLandmark): Reference axis for the X reflection.
 
     Returns:
-        Tuple[float, float, float]: Reflected point.
+        Point: Reflected point.
     """
-    dx = axis_point.x - p.x
-    return (axis_point.x + dx, p.y, p.z)
+    points = _single(p, axis_point)
+    if points is None:
+        return _pack(vectorized.mirror(_coords(p), _coords(axis_point)))
+    (x, y, z), (axis_x, _, _) = points
+    return (axis_x + (axis_x - x), y, z)
 
 
-def weighted_average(p1: NormalizedLandmark, p2: NormalizedLandmark, w1=0.5, w2=0.5) -> Tuple[float, float, float]:
+def weighted_average(p1: NormalizedLandmark, p2: NormalizedLandmark, w1=0.5, w2=0.5) -> Point:
     """
     Computes a weighted average between two landmarks.
 
@@ -98,15 +187,18 @@ def weighted_average(p1: NormalizedLandmark, p2: NormalizedLandmark, w1=0.5, w2=
         w2 (float): Weight for p2.
 
     Returns:
-        Tuple[float, float, float]: Weighted average position.
+        Point: Weighted average position.
     """
+    points = _single(p1, p2) if _is_scalar(w1, w2) else None
+    if points is None:
+        return _pack(vectorized.weighted_average(_coords(p1), _coords(p2), w1, w2))
+    (ax, ay, az), (bx, by, bz) = points
     total = w1 + w2
-    a = np.array([p1.x, p1.y, p1.z]) * (w1 / total)
-    b = np.array([p2.x, p2.y, p2.z]) * (w2 / total)
-    return tuple(a + b)
+    w1, w2 = w1 / total, w2 / total
+    return (ax * w1 + bx * w2, ay * w1 + by * w2, az * w1 + bz * w2)
 
 
-def extend(p1: NormalizedLandmark, p2: NormalizedLandmark, factor=1.0) -> Tuple[float, float, float]:
+def extend(p1: NormalizedLandmark, p2: NormalizedLandmark, factor=1.0) -> Point:
     """
     Extends the vector from p1 to p2 beyond p2 by a given factor.
 
@@ -116,10 +208,13 @@ def extend(p1: NormalizedLandmark, p2: NormalizedLandmark, factor=1.0) -> Tuple[
         factor (float): How much to extend beyond p2 (default = 1.0 for full vector length).
 
     Returns:
-        Tuple[float, float, float]: New extended point.
+        Point: New extended point.
     """
-    v = np.array([p2.x, p2.y, p2.z]) - np.array([p1.x, p1.y, p1.z])
-    return tuple(np.array([p2.x, p2.y, p2.z]) + v * factor)
+    points = _single(p1, p2) if _is_scalar(factor) else None
+    if points is None:
+        return _pack(vectorized.extend(_coords(p1), _coords(p2), factor))
+    (ax, ay, az), (bx, by, bz) = points
+    return (bx + (bx - ax) * factor, by + (by - ay) * factor, bz + (bz - az) * factor)
 
 
 def normalize(p1: NormalizedLandmark, p2: NormalizedLandmark) -> np.ndarray:
@@ -133,12 +228,14 @@ def normalize(p1: NormalizedLandmark, p2: NormalizedLandmark) -> np.ndarray:
     Returns:
         np.ndarray: Unit vector (x, y, z).
     """
-    v = np.array([p2.x - p1.x, p2.y - p1.y, p2.z - p1.z])
-    norm = np.linalg.norm(v)
-    return v / norm if norm != 0 else v
+    points = _single(p1, p2)
+    if points is None:
+        return vectorized.normalize(_coords(p1), _coords(p2))
+    (ax, ay, az), (bx, by, bz) = points
+    return np.array(_unit(bx - ax, by - ay, bz - az))
 
 
-def interpolate(p1: NormalizedLandmark, p2: NormalizedLandmark, alpha=0.5) -> Tuple[float, float, float]:
+def interpolate(p1: NormalizedLandmark, p2: NormalizedLandmark, alpha=0.5) -> Point:
     """
     Interpolates between two landmarks with a blending factor.
 
@@ -148,14 +245,17 @@ def interpolate(p1: NormalizedLandmark, p2: NormalizedLandmark, alpha=0.5) -> Tu
         alpha (float): Interpolation factor (0.0 = p1, 1.0 = p2).
 
     Returns:
-        Tuple[float, float, float]: Interpolated point.
+        Point: Interpolated point.
     """
-    a = np.array([p1.x, p1.y, p1.z])
-    b = np.array([p2.x, p2.y, p2.z])
-    return tuple((1 - alpha) * a + alpha * b)
+    points = _single(p1, p2) if _is_scalar(alpha) else None
+    if points is None:
+        return _pack(vectorized.interpolate(_coords(p1), _coords(p2), alpha))
+    (ax, ay, az), (bx, by, bz) = points
+    beta = 1 - alpha
+    return (beta * ax + alpha * bx, beta * ay + alpha * by, beta * az + alpha * bz)
 
 
-def bisector(p1: NormalizedLandmark, pivot: NormalizedLandmark, p2: NormalizedLandmark) -> Tuple[float, float, float]:
+def bisector(p1: NormalizedLandmark, pivot: NormalizedLandmark, p2: NormalizedLandmark) -> Point:
     """
     Calculates the angle bisector vector between two limbs at a pivot joint.
 
@@ -167,16 +267,18 @@ def bisector(p1: NormalizedLandmark, pivot: NormalizedLandmark, p2: NormalizedLa
         p2 (NormalizedLandmark): Second point forming the angle.
 
     Returns:
-        Tuple[float, float, float]: Unit bisector vector.
+        Point: Unit bisector vector.
     """
-    v1 = normalize(pivot, p1)
-    v2 = normalize(pivot, p2)
-    bisect = v1 + v2
-    norm = np.linalg.norm(bisect)
-    return tuple(bisect / norm if norm != 0 else bisect)
+    points = _single(p1, pivot, p2)
+    if points is None:
+        return _pack(vectorized.bisector(_coords(p1), _coords(pivot), _coords(p2)))
+    (ax, ay, az), (cx, cy, cz), (bx, by, bz) = points
+    ux, uy, uz = _unit(ax - cx, ay - cy, az - cz)
+    vx, vy, vz = _unit(bx - cx, by - cy, bz - cz)
+    return _unit(ux + vx, uy + vy, uz + vz)
 
 
-def rotate(p: NormalizedLandmark, axis_p1: NormalizedLandmark, axis_p2: NormalizedLandmark, angle: float) -> Tuple[float, float, float]:
+def rotate(p: NormalizedLandmark, axis_p1: NormalizedLandmark, axis_p2: NormalizedLandmark, angle: float) -> Point:
     """
     Rotates a landmark around a 3D axis defined by two other landmarks.
 
@@ -189,17 +291,48 @@ def rotate(p: NormalizedLandmark, axis_p1: NormalizedLandmark, axis_p2: Normaliz
         angle (float): Rotation angle in radians.
 
     Returns:
-        Tuple[float, float, float]: Rotated point (x, y, z).
-    """
-    point = np.array([p.x, p.y, p.z])
-    a = np.array([axis_p1.x, axis_p1.y, axis_p1.z])
-    b = np.array([axis_p2.x, axis_p2.y, axis_p2.z])
-    k = b - a
-    k = k / np.linalg.norm(k)
-    v = point - a
-    cos_theta = np.cos(angle)
-    sin_theta = np.sin(angle)
-    v_rot = (v * cos_theta +
-             np.cross(k, v) * sin_theta +
-             k * (np.dot(k, v)) * (1 - cos_theta))
-    return tuple(v_rot + a)
\ No newline at end of file
+        Point: Rotated point (x, y, z).
+    """
+    points = _single(p, axis_p1, axis_p2) if _is_scalar(angle) else None
+    if points is None:
+        return _pack(vectorized.rotate(_coords(p), _coords(axis_p1), _coords(axis_p2), angle))
+    (px, py, pz), (ax, ay, az), (bx, by, bz) = points
+    kx, ky, kz = _unit(bx - ax, by - ay, bz - az)
+    vx, vy, vz = px - ax, py - ay, pz - az
+    cos_theta, sin_theta = math.cos(angle), math.sin(angle)
+    k_dot_v = (kx * vx + ky * vy + kz * vz) * (1 - cos_theta)
+    return (
+        ax + vx * cos_theta + (ky * vz - kz * vy) * sin_theta + kx * k_dot_v,
+        ay + vy * cos_theta + (kz * vx - kx * vz) * sin_theta + ky * k_dot_v,
+        az + vz * cos_theta + (kx * vy - ky * vx) * sin_theta + kz * k_dot_v,
+    )
+
+
+def angle(p1: NormalizedLandmark, pivot: NormalizedLandmark, p2: NormalizedLandmark, dims: int = 3) -> Union[float, np.ndarray]:
+    """
+    Calculates the angle formed at a joint, in radians.
+
+    Useful for measuring joint flexion (e.g. the elbow angle between the
+    shoulder, the elbow and the wrist).
+
+    Args:
+        p1 (NormalizedLandmark): First landmark forming the angle.
+        pivot (NormalizedLandmark): Vertex of the angle.
+        p2 (NormalizedLandmark): Second landmark forming the angle.
+        dims (int): 3 for the angle in space, 2 for the angle in the image plane (x, y).
+
+    Returns:
+        Union[float, np.ndarray]: The angle between 0 and pi, or the angles of
+            a batch of points.
+    """
+    points = _single(p1, pivot, p2) if _is_scalar(dims) else None
+    if points is None:
+        result = vectorized.angle(_coords(p1), _coords(pivot), _coords(p2), dims)
+        return float(result) if result.ndim == 0 else result
+    (ax, ay, az), (cx, cy, cz), (bx, by, bz) = points
+    ux, uy, uz = ax - cx, ay - cy, az - cz
+    vx, vy, vz = bx - cx, by - cy, bz - cz
+    if dims == 2:
+        uz = vz = 0.0
+    cross = math.sqrt((uy * vz - uz * vy) ** 2 + (uz * vx - ux * vz) ** 2 + (ux * vy - uy * vx) ** 2)
+    return math.atan2(cross, ux * vx + uy * vy + uz * vz)
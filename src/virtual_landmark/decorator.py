@@ -12,7 +12,14 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-def landmark(name: str, connection: list[str] = None):
+def landmark(
+    name: str,
+    connection: list[str] = None,
+    inputs: list[str] = None,
+    visibility="min",
+    expr=None,
+    affine: bool = False,
+):
     """
     Decorator to register a method as a virtual landmark generator with optional connections.
 
@@ -25,6 +32,35 @@ def landmark(name: str, connection: list[str] = None):
     virtual landmarks (e.g., connecting "NECK" to "LEFT_SHOULDER"), and are stored as
     unique, undirected pairs.
 
+    Landmarks may read other virtual landmarks. The names a method reads are its
+    inputs; they are inferred from the reads in the method body (e.g.
+    `self[self.virtual_landmark.NECK]`, or `self[vl["NECK"]]` with
+    `vl = self.virtual_landmark`) unless declared explicitly with the `inputs`
+    parameter. Methods using `self` in any other way, e.g. calling a helper
+    method that reads landmarks, must declare their inputs. Inputs decide the
+    evaluation order of the class, so a landmark is always computed after the
+    virtual landmarks it depends on.
+
+    The visibility of a virtual landmark is derived from the visibility of its
+    inputs (the built-in and virtual landmarks it reads) according to the
+    `visibility` rule, in the same pass that computes its coordinates. When the
+    class sets `visibility_threshold`, methods whose inputs are not visible
+    enough are skipped and their landmark is set to NaN.
+
+    Landmarks that are plain compositions of `middle`, `centroid`, `interpolate`,
+    `extend`, `weighted_average`, `mirror` and `projection` can be declared
+    without a method, with an expression from `virtual_landmark.expression`
+    assigned in the class body. The expressions of a class are compiled into
+    a few matrix products instead of being run one by one:
+
+        neck = landmark("NECK", expr=middle("LEFT_SHOULDER", "RIGHT_SHOULDER"))
+
+    Existing methods that only compute fixed affine combinations (`middle`,
+    `centroid`, `interpolate`, `extend`, `weighted_average`, `mirror`, plus
+    constant offsets) can join the same products with `affine=True`. The
+    method is probed once when the class is created to extract its weights,
+    and its inputs are the landmarks it turned out to read.
+
     The generated landmark becomes accessible as a dynamic attribute with enum-like behavior:
         - `instance.NAME` → a dynamic object with `.value` (the landmark index)
         - `instance[instance.NAME.value]` → the corresponding NormalizedLandmark
@@ -34,16 +70,32 @@ def landmark(name: str, connection: list[str] = None):
         name (str): Unique name/key to associate with the custom landmark. Must be a valid identifier.
         connection (list[str], optional): Names of other landmarks to which this one should connect.
             Defaults to an empty list if not provided.
+        inputs (list[str], optional): Names of the landmarks read by the method.
+            Defaults to None, meaning the inputs are inferred from the method body.
+        visibility (Union[str, dict, None], optional): How the visibility of the
+            landmark is computed from its inputs: `"min"` (default), `"product"`,
+            `"mean"`, a dictionary mapping landmark names to weights (weighted
+            mean of those landmarks), or None for a constant visibility of 1.0.
+        expr (Expression, optional): Declares the landmark with an expression
+            instead of a method. The inputs are the landmarks it references.
+        affine (bool): Declares that the method returns a fixed affine
+            combination of landmarks, computed with the expressions of the
+            class. Defaults to False.
 
     Returns:
-        Callable: The original method, wrapped with metadata used during class initialization.
+        Callable: The original method, wrapped with metadata used during class
+            initialization. With `expr`, the generated method itself.
+
+    Raises:
+        ValueError: If an argument is invalid, or `expr` is combined with
+            `inputs` or `affine`.
 
     Example:
         @landmark(\"NECK\", connection=[\"LEFT_SHOULDER\", \"RIGHT_SHOULDER\"])
         def calc_neck(self):
-            return self._middle(
-                self._landmarks[self._plm.LEFT_SHOULDER.value],
-                self._landmarks[self._plm.RIGHT_SHOULDER.value]
+            return calculus.middle(
+                self[self.virtual_landmark.LEFT_SHOULDER],
+                self[self.virtual_landmark.RIGHT_SHOULDER],
             )
     """
     if not isinstance(name, str) or not name.isidentifier():
@@ -59,10 +111,119 @@ def landmark(name: str, connection: list[str] = None):
             else:
                 raise ValueError(f"Invalid connection value: {c!r}")
 
+    input_names = None
+    if inputs is not None:
+        input_names = []
+        for i in inputs:
+            if isinstance(i, str):
+                input_names.append(i)
+            elif hasattr(i, "name"):
+                input_names.append(i.name)
+            else:
+                raise ValueError(f"Invalid input value: {i!r}")
+
+    visibility_rule = visibility
+    if isinstance(visibility, dict):
+        visibility_rule = []
+        for key, weight in visibility.items():
+            key = key.name if hasattr(key, "name") else key
+            if not isinstance(key, str):
+                raise ValueError(f"Invalid visibility landmark: {key!r}")
+            if not isinstance(weight, (int, float)) or weight < 0:
+                raise ValueError(f"Visibility weights must be non-negative numbers, got {weight!r}")
+            visibility_rule.append((key, float(weight)))
+        if not sum(w for _, w in visibility_rule):
+            raise ValueError("Visibility weights must not all be zero.")
+        visibility_rule = tuple(visibility_rule)
+    elif visibility is not None and visibility not in ("min", "product", "mean"):
+        raise ValueError(
+            f"visibility must be 'min', 'product', 'mean', a dict of weights or None, got {visibility!r}"
+        )
+
     def wrapper(fn):
         fn._is_custom_landmark = True
         fn._landmark_name = name
         fn._landmark_connections = connection_names
+        fn._landmark_inputs = input_names
+        fn._landmark_visibility = visibility_rule
+        fn._landmark_expr = expr
+        fn._landmark_affine = affine
         return fn
 
-    return wrapper
\ No newline at end of file
+    if expr is not None:
+        from .expression import Expression, expression_method
+
+        if not isinstance(expr, Expression):
+            raise ValueError(f"expr must be an expression, got {expr!r}")
+        if inputs is not None:
+            raise ValueError("inputs cannot be combined with expr, they are taken from the expression")
+        if affine:
+            raise ValueError("affine cannot be combined with expr, expressions are compiled already")
+
+        input_names = list(expr.names())
+        method = expression_method(expr)
+        method.__name__ = method.__qualname__ = f"expression_{name.lower()}"
+        return wrapper(method)
+
+    return wrapper
+
+
+def angle(name: str, a, pivot, b, dims: int = 3):
+    """
+    Class decorator declaring a joint angle of a `VirtualLandmark` subclass.
+
+    The angle is formed at `pivot` by the segments towards `a` and `b`. Any
+    landmark of the class can be used, built-in or virtual. All the angles of a
+    class are computed together, in one vectorized operation, by
+    `VirtualLandmark.angles()` (one frame) or `VirtualLandmark.compute_angles()`
+    (any landmark array, e.g. a whole clip).
+
+    Stacked decorators keep their top-to-bottom order, and subclasses inherit
+    the angles of their parents.
+
+    Args:
+        name (str): Unique name of the angle. Must be a valid identifier.
+        a (Union[str, Enum]): First landmark forming the angle.
+        pivot (Union[str, Enum]): Vertex of the angle.
+        b (Union[str, Enum]): Second landmark forming the angle.
+        dims (int): 3 for the angle in space (default), 2 for the angle in the
+            image plane (x, y).
+
+    Returns:
+        Callable: A decorator returning the class itself.
+
+    Raises:
+        ValueError: If the name, a landmark or `dims` is invalid.
+
+    Example:
+        @angle("LEFT_ELBOW", "LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST")
+        @angle("NECK_TILT", "NOSE", "NECK", "MIDDLE_HIP", dims=2)
+        class Skeleton(VirtualLandmark):
+            ...
+    """
+    from .plan import AngleSpec
+
+    if not isinstance(name, str) or not name.isidentifier():
+        raise ValueError("Angle name must be a valid identifier string.")
+    if dims not in (2, 3):
+        raise ValueError(f"dims must be 2 or 3, got {dims!r}")
+
+    points = []
+    for p in (a, pivot, b):
+        if isinstance(p, str):
+            points.append(p)
+        elif hasattr(p, "name"):
+            points.append(p.name)
+        else:
+            raise ValueError(f"Invalid landmark value: {p!r}")
+
+    spec = AngleSpec(name=name, points=tuple(points), dims=dims)
+
+    def wrapper(cls):
+        declare = getattr(cls, "_declare_angle", None)
+        if declare is None:
+            raise TypeError("@angle can only decorate VirtualLandmark subclasses")
+        declare(spec)
+        return cls
+
+    return wrapper
@@ -0,0 +1,78 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+MediaPipe pose detector for BGR frames.
+
+`PoseDetector` turns a frame into a `(33, 4)` landmark array. It is the
+default detector of the batch tool (`virtual_landmark.batch`) and of the
+asyncio sessions (`virtual_landmark.aio`). MediaPipe and OpenCV are imported
+when the first detector is created.
+"""
+
+
+class PoseDetector:
+    """
+    Frame detector backed by a MediaPipe `Pose` instance.
+
+    Args:
+        model_complexity (int): MediaPipe model complexity (0, 1 or 2).
+        pool (PosePool, optional): Pool the `Pose` instance is checked out
+            from, and returned to by `close()`. Defaults to a new instance.
+    """
+
+    def __init__(self, model_complexity: int = 1, pool=None):
+        import cv2
+
+        from .abstract_landmark import landmarks_to_array
+
+        self._to_array = landmarks_to_array
+        self._cvt = lambda frame: cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        self._pool = pool
+        config = dict(
+            static_image_mode=False,
+            model_complexity=model_complexity,
+            enable_segmentation=False,
+        )
+        if pool is not None:
+            self._pose = pool.acquire(**config)
+        else:
+            import mediapipe as mp
+
+            self._pose = mp.solutions.pose.Pose(**config)
+
+    def __call__(self, frame):
+        results = self._pose.process(self._cvt(frame))
+        if not results.pose_landmarks:
+            return None
+        return self._to_array(results.pose_landmarks.landmark)
+
+    def reset(self):
+        """
+        Clears the tracking state, before processing an unrelated video.
+        """
+        self._pose.reset()
+
+    def close(self):
+        """
+        Returns the `Pose` instance to the pool, or closes it. Calling it
+        again has no effect.
+        """
+        pose, self._pose = self._pose, None
+        if pose is None:
+            return
+        if self._pool is not None:
+            self._pool.release(pose)
+        else:
+            pose.close()
@@ -1,7 +1,29 @@
-from .connections import Connections
-from .style import get_extended_pose_landmarks_style
+import importlib
+
+# The renderer and the styles need OpenCV and MediaPipe, so every name is
+# imported on first access
+_LAZY = {
+    "Connections": ".connections",
+    "LandmarkRenderer": ".renderer",
+    "get_extended_pose_landmarks_style": ".style",
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_LAZY))
+
 
 __ALL__ = [
     "Connections",
+    "LandmarkRenderer",
     "get_extended_pose_landmarks_style"
 ]
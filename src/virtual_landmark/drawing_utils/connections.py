@@ -12,17 +12,61 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import mediapipe as mp
+import weakref
 
 from ..virtual_landmark import VirtualLandmark
 
+# MediaPipe's pose connections (`mp.solutions.pose.POSE_CONNECTIONS`), sorted.
+# They never change, so they are listed here rather than imported with MediaPipe.
+POSE_CONNECTIONS = [
+    (0, 1), (0, 4), (1, 2), (2, 3), (3, 7), (4, 5), (5, 6),
+    (6, 8), (9, 10), (11, 12), (11, 13), (11, 23), (12, 14), (12, 24),
+    (13, 15), (14, 16), (15, 17), (15, 19), (15, 21), (16, 18), (16, 20),
+    (16, 22), (17, 19), (18, 20), (23, 24), (23, 25), (24, 26), (25, 27),
+    (26, 28), (27, 29), (27, 31), (28, 30), (28, 32), (29, 31), (30, 32),
+]
+
+# VirtualLandmark subclass → (custom connections, all connections), as tuples
+_CLASS_CACHE = weakref.WeakKeyDictionary()
+
+
+def _resolve(connections, registry) -> tuple:
+    """
+    Resolves name pairs to index pairs, in a deterministic order.
+    """
+    return tuple((registry[x1], registry[x2]) for x1, x2 in sorted(connections))
+
+
 class Connections:
+    """
+    Index-based connections of a landmark instance, ready for drawing.
+
+    For `VirtualLandmark` subclasses the connections declared on the class are
+    resolved once per class and shared by every `Connections` object built for
+    its instances. Instances with connections of their own (added with
+    `_add_connection`) are resolved separately. The properties return new
+    lists, which callers may modify.
+    """
+
     def __init__(self, landmarks: VirtualLandmark):
         connections = getattr(landmarks, '_connections')
-        vl = landmarks.virtual_landmark
-        
-        self._connections = [(vl[x1], vl[x2]) for x1, x2 in connections]
-        
+        shared = (
+            isinstance(landmarks, VirtualLandmark)
+            and connections == landmarks._landmark_plan.connections
+        )
+
+        if shared:
+            cls = type(landmarks)
+            cached = _CLASS_CACHE.get(cls)
+            if cached is None:
+                custom = _resolve(connections, cls._registry)
+                cached = _CLASS_CACHE[cls] = (custom, tuple(POSE_CONNECTIONS) + custom)
+        else:
+            custom = _resolve(connections, landmarks.virtual_landmark)
+            cached = (custom, tuple(POSE_CONNECTIONS) + custom)
+
+        self._connections, self._all_connections = cached
+
     @property
     def CUSTOM_CONNECTION(self):
         return list(self._connections)
@@ -39,7 +83,7 @@ class Connections:
         Returns:
             List[Tuple[int, int]]: List of index pairs from MediaPipe's POSE_CONNECTIONS.
         """
-        return list(mp.solutions.pose.POSE_CONNECTIONS)
+        return list(POSE_CONNECTIONS)
 
     @property
     def ALL_CONNECTIONS(self):
@@ -52,4 +96,4 @@ class Connections:
         Returns:
             List[Tuple[int, int]]: Combined list of MediaPipe and custom landmark connections.
         """
-        return  self.POSE_CONNECTIONS + self.CUSTOM_CONNECTION
\ No newline at end of file
+        return list(self._all_connections)
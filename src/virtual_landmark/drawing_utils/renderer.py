@@ -0,0 +1,234 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import functools
+import weakref
+
+import cv2
+import numpy as np
+from mediapipe.python.solutions.drawing_utils import DrawingSpec, WHITE_COLOR
+
+from .connections import POSE_CONNECTIONS, Connections
+from .style import _base_style
+
+VISIBILITY_THRESHOLD = 0.5
+
+# Tolerance of MediaPipe's check that normalized coordinates are in [0, 1]
+_EPSILON = 1e-9
+
+
+def _edges(connections) -> np.ndarray:
+    """
+    Returns connections as a `(E, 2)` index array.
+    """
+    return np.array(connections, dtype=np.intp).reshape(-1, 2)
+
+
+_POSE_EDGES = _edges(POSE_CONNECTIONS)
+
+
+@functools.lru_cache(maxsize=None)
+def _style_table():
+    """
+    Returns the style of the built-in landmarks and of the left, right and
+    center custom landmarks as arrays, built only once.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray, np.ndarray]: `(33 + 3, 3)` colors,
+            `(33 + 3,)` radii and `(33 + 3,)` thicknesses. The last three rows
+            are the right, left and center styles, in this order.
+    """
+    base_style, left_style, right_style, center_style = _base_style()
+    specs = [base_style[idx] for idx in range(len(base_style))]
+    specs += [right_style, left_style, center_style]
+
+    colors = np.array([spec.color for spec in specs], dtype=np.int32)
+    radii = np.array([spec.circle_radius for spec in specs], dtype=np.int32)
+    thickness = np.array([spec.thickness for spec in specs], dtype=np.int32)
+    return colors, radii, thickness
+
+
+def landmark_style_indices(array: np.ndarray) -> np.ndarray:
+    """
+    Returns the row of `_style_table()` used by each landmark, following the
+    rules of `get_extended_pose_landmarks_style`.
+
+    Args:
+        array (np.ndarray): A `(..., N, 4)` landmark array.
+
+    Returns:
+        np.ndarray: `(..., N)` style rows.
+    """
+    builtin = len(_base_style()[0])
+    rows = np.broadcast_to(np.arange(array.shape[-2]), array.shape[:-1]).copy()
+
+    x = array[..., builtin:, 0]
+    rows[..., builtin:] = np.where(
+        x < 0.45, builtin, np.where(x > 0.55, builtin + 1, builtin + 2)
+    )
+    return rows
+
+
+class LandmarkRenderer:
+    """
+    Draws landmarks and connections with batched OpenCV calls.
+
+    This is a drop-in replacement for `mp.solutions.drawing_utils.draw_landmarks`
+    combined with `get_extended_pose_landmarks_style`: it draws the same picture,
+    but it works on the landmark array directly (no `NormalizedLandmarkList`
+    is needed), converts all the coordinates to pixels in one vectorized step,
+    and draws every connection with a single `cv2.polylines` call.
+
+    As in MediaPipe, landmarks whose visibility is below the threshold or
+    whose coordinates are outside the image are skipped, together with their
+    connections.
+
+    Example:
+        >>> renderer = LandmarkRenderer()
+        >>> for frame in frames:
+        ...     pose.update(...)
+        ...     renderer.draw(frame, pose)
+
+    Args:
+        connection_drawing_spec (DrawingSpec): Color and thickness of the
+            connections. Defaults to MediaPipe's default (light gray lines of
+            thickness 2).
+        draw_landmarks (bool): Whether to draw the landmarks, or only the
+            connections. Defaults to True.
+        visibility_threshold (float): Minimum visibility of a drawn landmark.
+            Defaults to 0.5.
+    """
+
+    def __init__(
+        self,
+        connection_drawing_spec: DrawingSpec = DrawingSpec(),
+        draw_landmarks: bool = True,
+        visibility_threshold: float = VISIBILITY_THRESHOLD,
+    ):
+        self.connection_drawing_spec = connection_drawing_spec
+        self.draw_landmarks = draw_landmarks
+        self.visibility_threshold = visibility_threshold
+        self._class_edges = weakref.WeakKeyDictionary()  # class -> (connections, edges)
+
+    def _instance_edges(self, landmarks) -> np.ndarray:
+        """
+        Returns the connections of a landmark instance as a `(E, 2)` index
+        array. Instances using the connections of their class share them, so
+        the array is kept per class (and dropped with the class).
+        """
+        connections = Connections(landmarks)._all_connections
+        cls = type(landmarks)
+        cached = self._class_edges.get(cls)
+        if cached is None or cached[0] is not connections:
+            cached = self._class_edges[cls] = (connections, _edges(connections))
+        return cached[1]
+
+    def _resolve(self, landmarks, connections):
+        """
+        Returns the `(P, N, 4)` landmark array and the `(E, 2)` connections to draw.
+        """
+        batched = getattr(landmarks, "landmarks", None)  # MultiPose
+        if batched is not None and hasattr(landmarks, "as_array"):
+            edges = self._instance_edges(batched) if connections is None else _edges(connections)
+            return landmarks.as_array(), edges
+
+        if hasattr(landmarks, "as_array"):
+            edges = self._instance_edges(landmarks) if connections is None else _edges(connections)
+            array = landmarks.as_array()
+        else:
+            array = np.asarray(landmarks)
+            edges = _POSE_EDGES if connections is None else _edges(connections)
+
+        if array.ndim < 2 or array.shape[-1] < 3:
+            raise ValueError("landmarks must have shape (..., N, 3) or (..., N, 4)")
+
+        return array.reshape((-1,) + array.shape[-2:]), edges
+
+    def pixel_coordinates(self, array: np.ndarray, width: int, height: int):
+        """
+        Converts normalized landmarks to pixel coordinates.
+
+        Args:
+            array (np.ndarray): A `(..., N, 3)` or `(..., N, 4)` landmark array.
+            width (int): Image width.
+            height (int): Image height.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: `(..., N, 2)` int32 pixel coordinates,
+                and a `(..., N)` mask of the landmarks to draw.
+        """
+        x = array[..., 0]
+        y = array[..., 1]
+
+        with np.errstate(invalid="ignore"):
+            visible = (
+                (x > -_EPSILON) & (x < 1 + _EPSILON) & (y > -_EPSILON) & (y < 1 + _EPSILON)
+            )
+            if array.shape[-1] > 3:
+                visible &= array[..., 3] >= self.visibility_threshold
+
+        px = np.empty(array.shape[:-1] + (2,), dtype=np.int32)
+        px[..., 0] = np.clip(np.floor(np.nan_to_num(x) * width), 0, width - 1)
+        px[..., 1] = np.clip(np.floor(np.nan_to_num(y) * height), 0, height - 1)
+        return px, visible
+
+    def draw(self, image: np.ndarray, landmarks, connections=None) -> np.ndarray:
+        """
+        Draws landmarks and their connections on an image, in place.
+
+        Args:
+            image (np.ndarray): A three-channel BGR image.
+            landmarks (Union[VirtualLandmark, MultiPose, np.ndarray]): A landmark
+                instance, a multi-person container, or a `(N, 4)` / `(P, N, 4)`
+                array.
+            connections (List[Tuple[int, int]], optional): Index pairs to draw.
+                Defaults to the connections of the instance, or to MediaPipe's
+                pose connections for arrays.
+
+        Returns:
+            np.ndarray: The image.
+
+        Raises:
+            ValueError: If the image is not a BGR image, or a connection uses
+                an invalid index.
+        """
+        if image.ndim != 3 or image.shape[2] != 3:
+            raise ValueError("Input image must contain three channel bgr data.")
+
+        array, edges = self._resolve(landmarks, connections)
+        height, width = image.shape[:2]
+        px, visible = self.pixel_coordinates(array, width, height)
+
+        spec = self.connection_drawing_spec
+        if spec is not None and len(edges):
+            if edges.max() >= array.shape[-2] or edges.min() < 0:
+                raise ValueError("Landmark index is out of range in connections.")
+
+            drawn = visible[:, edges[:, 0]] & visible[:, edges[:, 1]]
+            segments = px[:, edges][drawn]  # (S, 2, 2)
+            if len(segments):
+                cv2.polylines(image, segments, False, spec.color, spec.thickness)
+
+        if self.draw_landmarks:
+            colors, radii, thickness = _style_table()
+            rows = landmark_style_indices(array)[visible]
+            points = px[visible].tolist()
+            for (x, y), color, radius, t in zip(
+                points, colors[rows].tolist(), radii[rows].tolist(), thickness[rows].tolist()
+            ):
+                border = max(radius + 1, int(radius * 1.2))
+                cv2.circle(image, (x, y), border, WHITE_COLOR, t)
+                cv2.circle(image, (x, y), radius, color, t)
+
+        return image
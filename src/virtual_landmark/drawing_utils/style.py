@@ -1,6 +1,32 @@
+import dataclasses
+import functools
+
+import numpy as np
 import mediapipe as mp
 from mediapipe.python.solutions.drawing_styles import get_default_pose_landmarks_style
 
+PoseLandmark = mp.solutions.pose.PoseLandmark
+
+
+@functools.lru_cache(maxsize=None)
+def _base_style():
+    """
+    Returns MediaPipe's default pose landmark style, built only once.
+
+    Returns:
+        Tuple[Dict[int, DrawingSpec], DrawingSpec, DrawingSpec, DrawingSpec]:
+            The default styles, and the left, right and center reference styles.
+    """
+    base_style = get_default_pose_landmarks_style()
+
+    # Base reference styles (copied, not tupled)
+    left_style = base_style[PoseLandmark.LEFT_SHOULDER.value]
+    right_style = base_style[PoseLandmark.RIGHT_SHOULDER.value]
+    center_style = base_style[PoseLandmark.NOSE.value]
+
+    return base_style, left_style, right_style, center_style
+
+
 def get_extended_pose_landmarks_style(landmarks):
     """
     Returns a landmark drawing style dictionary with:
@@ -10,35 +36,34 @@ def get_extended_pose_landmarks_style(landmarks):
         - Green for right-side points
         - Gray for center/virtual points
 
+    The default styles are built once; each call returns new `DrawingSpec`
+    copies, so the caller may modify them.
+
     Args:
         landmarks (CustomLandmark): An instance of a CustomLandmark or DefaultCustomLandmark
 
     Returns:
         Dict[int, DrawingSpec]: Drawing styles for each landmark index
     """
-    plm = mp.solutions.pose.PoseLandmark
-    base_style = get_default_pose_landmarks_style()
-
-    # Base reference styles (copied, not tupled)
-    left_style = base_style[plm.LEFT_SHOULDER.value]
-    right_style = base_style[plm.RIGHT_SHOULDER.value]
-    center_style = base_style[plm.NOSE.value]
+    base_style, left_style, right_style, center_style = _base_style()
+    style = {idx: dataclasses.replace(spec) for idx, spec in base_style.items()}
 
     # Only style custom landmarks (index >= 33)
-    for idx in range(len(plm), len(landmarks)):
-        point = landmarks[idx]
-        x = point.x
-
-        style = next(
-            s
-            for cond, s in [
-                (x < 0.45, right_style),
-                (x > 0.55, left_style),
-                (True, center_style),
-            ]
-            if cond
-        )
-
-        base_style[idx] = style
-
-    return base_style
+    first = len(PoseLandmark)
+    if hasattr(landmarks, "as_array"):
+        xs = landmarks.as_array()[first:, 0].tolist()
+    else:
+        xs = [
+            point[0] if isinstance(point, np.ndarray) else point.x
+            for point in (landmarks[idx] for idx in range(first, len(landmarks)))
+        ]
+
+    for idx, x in enumerate(xs, start=first):
+        if x < 0.45:
+            style[idx] = dataclasses.replace(right_style)
+        elif x > 0.55:
+            style[idx] = dataclasses.replace(left_style)
+        else:
+            style[idx] = dataclasses.replace(center_style)
+
+    return style
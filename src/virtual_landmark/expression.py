@@ -0,0 +1,582 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Declarative virtual landmarks.
+
+Instead of a method, a virtual landmark can be declared as an expression over
+landmark names, built with the functions of this module (which mirror the
+ones of `calculus`):
+
+    >>> from virtual_landmark.expression import extend, middle
+    >>> class Skeleton(VirtualLandmark):
+    ...     neck = landmark("NECK", expr=middle("LEFT_SHOULDER", "RIGHT_SHOULDER"))
+    ...     head = landmark("HEAD", expr=extend("NECK", "NOSE", 0.5))
+
+`middle`, `centroid`, `interpolate`, `extend`, `weighted_average` and `mirror`
+are linear combinations of their points. When the class is created, the
+expressions that reference each other are inlined, so every expression becomes
+a set of weights over the built-in landmarks (and the virtual landmarks
+computed by methods). All the expressions of an evaluation level are then
+computed together by an `ExpressionProgram`: one gather of the input
+landmarks and one matrix product, per frame or for a whole clip.
+
+`projection` is not linear: each distinct projection (common subexpressions
+are computed once) is evaluated with one vectorized call per nesting depth
+before the final product.
+
+Methods can be folded into the same product too: a method decorated with
+`@landmark(..., affine=True)` is evaluated once on probe landmarks when the
+class is created, and replaced by the weights and offset it turned out to
+apply (see `affine_expression`).
+"""
+
+import abc
+
+import numpy as np
+
+from . import vectorized
+
+# Weights of a term, one per coordinate (x, y, z)
+_ISOTROPIC = (1.0, 1.0, 1.0)
+
+# Source of the constant offsets of affine expressions
+_CONSTANT = ("constant",)
+
+# Random landmark sets used to check that a probed method is affine
+_AFFINE_SAMPLES = 4
+
+
+def _as_expression(value) -> "Expression":
+    """
+    Converts a landmark name, an enum member or an expression to an expression.
+
+    Raises:
+        ValueError: If the value is none of them.
+    """
+    if isinstance(value, Expression):
+        return value
+    if isinstance(value, str):
+        if not value.isidentifier():
+            raise ValueError(f"Invalid landmark name: {value!r}")
+        return Ref(value)
+    if hasattr(value, "name"):  # PoseLandmark enum or similar
+        return Ref(value.name)
+    raise ValueError(f"Invalid expression value: {value!r}")
+
+
+def _number(value, name: str) -> float:
+    """
+    Checks that an expression parameter is a plain number.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{name} must be a number, got {value!r}")
+    return float(value)
+
+
+def _point(value) -> np.ndarray:
+    """
+    Returns the (x, y, z) coordinates of a landmark message or array row.
+    """
+    if hasattr(value, "x"):
+        return np.array([value.x, value.y, value.z])
+    return vectorized._xyz(value)
+
+
+class Expression(abc.ABC):
+    """
+    Base class of landmark expressions. Expressions are immutable.
+    """
+
+    __slots__ = ()
+
+    def names(self) -> tuple:
+        """
+        Returns the landmark names referenced by the expression.
+
+        Returns:
+            tuple[str, ...]: Names, in order of first appearance.
+        """
+        return tuple(dict.fromkeys(self._names()))
+
+    @abc.abstractmethod
+    def _names(self):
+        """
+        Yields the landmark names referenced by the expression, with repeats.
+        """
+
+    @abc.abstractmethod
+    def evaluate(self, lookup) -> np.ndarray:
+        """
+        Evaluates the expression directly, without compiling it.
+
+        Args:
+            lookup (Callable[[str], Any]): Returns the landmark of a name, as a
+                `NormalizedLandmark` or a `(..., 3)` / `(..., 4)` array.
+
+        Returns:
+            np.ndarray: The point, shape `(..., 3)`.
+        """
+
+
+class Ref(Expression):
+    """
+    A landmark, by name.
+    """
+
+    __slots__ = ("name",)
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def _names(self):
+        yield self.name
+
+    def evaluate(self, lookup):
+        return _point(lookup(self.name))
+
+    def __repr__(self):
+        return repr(self.name)
+
+
+class Linear(Expression):
+    """
+    A linear combination of expressions, with one weight per coordinate, plus
+    an optional constant offset.
+
+    Attributes:
+        terms (tuple[tuple[Expression, tuple[float, float, float]], ...]): The
+            expressions and their (x, y, z) weights.
+        offset (tuple[float, float, float], optional): Added to the combination.
+    """
+
+    __slots__ = ("terms", "offset")
+
+    def __init__(self, terms, offset=None):
+        self.terms = tuple((_as_expression(e), tuple(w)) for e, w in terms)
+        self.offset = tuple(offset) if offset is not None else None
+
+    def _names(self):
+        for expression, _ in self.terms:
+            yield from expression._names()
+
+    def evaluate(self, lookup):
+        total = sum(np.asarray(w) * e.evaluate(lookup) for e, w in self.terms)
+        return total + np.asarray(self.offset) if self.offset is not None else total
+
+    def __repr__(self):
+        parts = [f"{w} * {e!r}" for e, w in self.terms]
+        if self.offset is not None:
+            parts.append(f"offset={self.offset}")
+        return "Linear(" + ", ".join(parts) + ")"
+
+
+class Projection(Expression):
+    """
+    The projection of `target` onto the line through `p1` and `p2`.
+    """
+
+    __slots__ = ("args",)
+
+    def __init__(self, p1, p2, target):
+        self.args = (_as_expression(p1), _as_expression(p2), _as_expression(target))
+
+    def _names(self):
+        for arg in self.args:
+            yield from arg._names()
+
+    def evaluate(self, lookup):
+        return vectorized.projection(*(arg.evaluate(lookup) for arg in self.args))
+
+    def __repr__(self):
+        return "projection({!r}, {!r}, {!r})".format(*self.args)
+
+
+def ref(name) -> Expression:
+    """
+    Returns an expression reading a landmark, e.g. to reuse a built-in
+    landmark under another name.
+
+    Args:
+        name (Union[str, Enum]): The landmark.
+    """
+    return _as_expression(name)
+
+
+def middle(p1, p2) -> Expression:
+    """
+    Midpoint of two landmarks, see `calculus.middle`.
+    """
+    return Linear([(p1, (0.5,) * 3), (p2, (0.5,) * 3)])
+
+
+def centroid(*points) -> Expression:
+    """
+    Centroid of several landmarks, see `calculus.centroid`.
+
+    Raises:
+        ValueError: If no point is given.
+    """
+    if not points:
+        raise ValueError("centroid() requires at least one point")
+
+    weight = (1.0 / len(points),) * 3
+    return Linear([(p, weight) for p in points])
+
+
+def interpolate(p1, p2, alpha: float = 0.5) -> Expression:
+    """
+    Point between two landmarks (0.0 = p1, 1.0 = p2), see `calculus.interpolate`.
+    """
+    alpha = _number(alpha, "alpha")
+    return Linear([(p1, (1 - alpha,) * 3), (p2, (alpha,) * 3)])
+
+
+def extend(p1, p2, factor: float = 1.0) -> Expression:
+    """
+    Extends the vector from p1 to p2 beyond p2, see `calculus.extend`.
+    """
+    factor = _number(factor, "factor")
+    return Linear([(p1, (-factor,) * 3), (p2, (1 + factor,) * 3)])
+
+
+def weighted_average(p1, p2, w1: float = 0.5, w2: float = 0.5) -> Expression:
+    """
+    Weighted average of two landmarks, see `calculus.weighted_average`.
+
+    Raises:
+        ValueError: If the weights add up to zero.
+    """
+    w1, w2 = _number(w1, "w1"), _number(w2, "w2")
+    if w1 + w2 == 0:
+        raise ValueError("The weights must not add up to zero.")
+
+    total = w1 + w2
+    return Linear([(p1, (w1 / total,) * 3), (p2, (w2 / total,) * 3)])
+
+
+def mirror(p, axis_point) -> Expression:
+    """
+    Reflects a landmark across the vertical axis through another one, see
+    `calculus.mirror`.
+    """
+    return Linear([(p, (-1.0, 1.0, 1.0)), (axis_point, (2.0, 0.0, 0.0))])
+
+
+def projection(p1, p2, target) -> Expression:
+    """
+    Projects a landmark onto the line through two others, see `calculus.projection`.
+    """
+    return Projection(p1, p2, target)
+
+
+def expression_method(expr: Expression):
+    """
+    Returns a `@landmark` method evaluating an expression on an instance.
+
+    It is used when the compiled program cannot be (lazy mode).
+    """
+
+    def method(self):
+        registry = self.virtual_landmark
+        return expr.evaluate(lambda name: self[registry[name]])
+
+    return method
+
+
+class _Probe:
+    """
+    Stand-in for a `VirtualLandmark` instance, serving the rows of a stacked
+    probe array to a `@landmark` method.
+    """
+
+    __slots__ = ("virtual_landmark", "_array")
+
+    def __init__(self, registry, array: np.ndarray):
+        self.virtual_landmark = registry
+        self._array = array
+
+    def __getitem__(self, idx):
+        return self._array[..., idx, :]
+
+
+def affine_expression(name: str, method, registry) -> Linear:
+    """
+    Extracts the weights of a method declared with `@landmark(..., affine=True)`.
+
+    The method is called once on stacked probe landmarks: all zeros (giving
+    the offset), one unit coordinate at a time (giving the weights), and a few
+    random sets on which the extracted weights must reproduce the method. It
+    must therefore accept stacked `(P, 4)` landmarks, as the `calculus`
+    functions do, and only read landmarks through `self[...]`.
+
+    Args:
+        name (str): The landmark computed by the method.
+        method (Callable): The `@landmark` method.
+        registry (VirtualPoseLandmark): Name/index mapping of every landmark
+            of the class. Indices only have to be distinct.
+
+    Returns:
+        Linear: The weights of every landmark the method reads, and its offset.
+
+    Raises:
+        ValueError: If the method cannot be evaluated on stacked landmarks,
+            mixes coordinates (e.g. a rotation), or is not affine.
+    """
+    names = {index: other for other, index in registry.items()}
+    size = max(names) + 1
+
+    basis = np.zeros((1 + 3 * size, size, 4))
+    rows = np.arange(3 * size)
+    basis[1 + rows, rows // 3, rows % 3] = 1.0
+    samples = np.random.default_rng(0).uniform(-1.0, 1.0, (_AFFINE_SAMPLES, size, 4))
+    probes = np.concatenate([basis, samples])
+    probes[..., 3] = 1.0
+
+    try:
+        out = np.asarray(method(_Probe(registry, probes)), dtype=float)[..., :3]
+    except Exception as e:
+        raise ValueError(f"Affine landmark '{name}' cannot be evaluated on stacked landmarks: {e}") from e
+    if out.shape != (len(probes), 3) or not np.isfinite(out).all():
+        raise ValueError(f"Affine landmark '{name}' is not an affine combination of landmarks")
+
+    offset = out[0]
+    effect = (out[1 : 1 + 3 * size] - offset).reshape(size, 3, 3)  # (landmark, from, to)
+    weights = effect[:, [0, 1, 2], [0, 1, 2]].copy()
+    weights[np.abs(weights) < 1e-12] = 0.0
+
+    cross = effect.copy()
+    cross[:, [0, 1, 2], [0, 1, 2]] = 0.0
+    expected = offset + np.einsum("ic,sic->sc", weights, samples[..., :3])
+    if np.abs(cross).max() > 1e-9 or not np.allclose(out[1 + 3 * size :], expected, atol=1e-9):
+        raise ValueError(f"Affine landmark '{name}' is not an affine combination of landmarks")
+
+    terms = [(Ref(names[i]), tuple(weights[i].tolist())) for i in np.flatnonzero(weights.any(axis=1))]
+    return Linear(terms, offset=tuple(offset.tolist()) if offset.any() else None)
+
+
+def inline_sources(name: str, expressions: dict, _visiting=()) -> tuple:
+    """
+    Returns the landmarks an expression landmark is computed from, once the
+    expression landmarks it references are inlined.
+
+    Args:
+        name (str): The expression landmark.
+        expressions (Dict[str, Expression]): The expression landmarks of the class.
+
+    Returns:
+        tuple[str, ...]: Names of built-in or method-computed landmarks.
+
+    Raises:
+        ValueError: If expression landmarks reference each other in a cycle.
+    """
+    if name in _visiting:
+        cycle = " -> ".join(_visiting + (name,))
+        raise ValueError(f"Cyclic landmark dependencies: {cycle}")
+
+    sources = {}
+    for ref_name in expressions[name].names():
+        if ref_name in expressions:
+            sources.update(dict.fromkeys(inline_sources(ref_name, expressions, _visiting + (name,))))
+        else:
+            sources[ref_name] = None
+    return tuple(sources)
+
+
+class ExpressionProgram:
+    """
+    The expression landmarks of one evaluation level, compiled into one program.
+
+    Each expression is reduced to weights over a vector of sources: the
+    landmarks read from the instance, followed by the distinct projections.
+    Evaluating the program gathers the sources, computes the projections
+    (one vectorized call per nesting depth) and applies the weights with one
+    matrix product. Weights may differ per axis (as for `mirror`), so they are
+    stored as a `(3K, 3M)` matrix acting on the flattened (x, y, z) sources,
+    which is a single product whatever the leading dimensions (frames,
+    people or coordinate spaces).
+
+    Attributes:
+        names (tuple[str, ...]): The landmarks computed, in output order.
+        positions (tuple[int, ...]): Indices of the landmarks read.
+    """
+
+    __slots__ = (
+        "_names", "_positions", "_index", "_stages", "_weights", "_size", "spec"
+    )
+
+    def __init__(self, names, expressions: dict, registry, label: str = "expressions"):
+        """
+        Args:
+            names (Iterable[str]): The expression landmarks to compute.
+            expressions (Dict[str, Expression]): All the expression landmarks of
+                the class, referenced ones are inlined.
+            registry (VirtualPoseLandmark): Name/index mapping of the class.
+            label (str): Name of the program in profiles.
+
+        Raises:
+            ValueError: If an expression uses unknown landmarks.
+        """
+        from .plan import LandmarkSpec
+
+        self._names = tuple(names)
+        self._positions = []
+        columns = {}  # landmark index -> source
+        projections = {}  # canonical key -> (source, depth, args)
+
+        def source_of_column(idx):
+            if idx not in columns:
+                columns[idx] = len(columns)
+                self._positions.append(idx)
+            return ("column", columns[idx])
+
+        def linear(expr, owner):
+            """
+            Returns the expression as {source: (wx, wy, wz)}.
+            """
+            if isinstance(expr, Ref):
+                if expr.name in expressions:
+                    return linear(expressions[expr.name], owner)
+                if expr.name not in registry:
+                    raise ValueError(f"Landmark '{owner}' uses unknown landmark '{expr.name}'")
+                return {source_of_column(registry[expr.name]): _ISOTROPIC}
+
+            if isinstance(expr, Linear):
+                result = {} if expr.offset is None else {_CONSTANT: expr.offset}
+                for term, weights in expr.terms:
+                    for source, w in linear(term, owner).items():
+                        total = result.get(source, (0.0, 0.0, 0.0))
+                        result[source] = tuple(t + a * b for t, a, b in zip(total, weights, w))
+                return {s: w for s, w in result.items() if any(w)}
+
+            args = tuple(linear(arg, owner) for arg in expr.args)
+            key = tuple(tuple(sorted(arg.items())) for arg in args)
+            if key not in projections:
+                depth = 1 + max(
+                    (projections[s[1]][1] for arg in args for s in arg if s[0] == "projection"),
+                    default=0,
+                )
+                projections[key] = (len(projections), depth, args)
+            return {("projection", key): _ISOTROPIC}
+
+        rows = [linear(expressions[name], name) for name in self._names]
+
+        # Sources: columns first, then projections by depth
+        order = sorted(projections, key=lambda k: projections[k][1])
+        slot = {("column", i): i for i in range(len(columns))}
+        for offset, key in enumerate(order, start=len(columns)):
+            slot[("projection", key)] = offset
+        self._size = len(slot)
+
+        def matrix(forms):
+            weights = np.zeros((3, len(forms), self._size))
+            offsets = np.zeros((len(forms), 3))
+            for row, form in enumerate(forms):
+                for source, w in form.items():
+                    if source == _CONSTANT:
+                        offsets[row] = w
+                    else:
+                        weights[:, row, slot[source]] = w
+            return weights, offsets
+
+        self._stages = []
+        for depth in sorted({projections[k][1] for k in order}):
+            keys = [k for k in order if projections[k][1] == depth]
+            forms = [arg for k in keys for arg in projections[k][2]]
+            targets = np.array([slot[("projection", k)] for k in keys], dtype=np.intp)
+            self._stages.append((self._pack(*matrix(forms)), targets))
+        self._stages = tuple(self._stages)
+
+        self._weights = self._pack(*matrix(rows))
+        self._positions = tuple(self._positions)
+        self._index = np.array(self._positions, dtype=np.intp)
+
+        self.spec = LandmarkSpec(attr="", name=f"<{label}>", method=self.evaluate, connections=())
+
+    @staticmethod
+    def _pack(weights: np.ndarray, offsets: np.ndarray):
+        """
+        Converts `(3, K, M)` per-axis weights to the `(3M, 3K)` matrix applied
+        to flattened sources, the `(M, K)` mask of the sources each landmark
+        uses, and the flattened `(3K,)` offsets (None if all zero).
+        """
+        _, k, m = weights.shape
+        full = np.zeros((3 * m, 3 * k))
+        for c in range(3):
+            full[c::3, c::3] = weights[c].T
+        used = (weights != 0).any(axis=0).T.astype(np.float64)
+        return full, used, offsets.reshape(-1) if offsets.any() else None
+
+    @staticmethod
+    def _apply(packed, sources: np.ndarray) -> np.ndarray:
+        """
+        Applies packed weights to `(..., M, 3)` sources.
+
+        NaN sources (e.g. landmarks skipped because they are hidden) only turn
+        the landmarks that use them into NaN.
+        """
+        full, used, offsets = packed
+        lead = sources.shape[:-2]
+        flat = sources.reshape(int(np.prod(lead)), full.shape[0])
+
+        out = flat @ full
+        if np.isnan(out).any():
+            missing = np.isnan(flat).reshape(len(flat), -1, 3).any(axis=-1)
+            out = np.where(np.isnan(flat), 0.0, flat) @ full
+            out.reshape(len(flat), -1, 3)[(missing @ used) > 0] = np.nan
+        if offsets is not None:
+            out += offsets
+
+        return out.reshape(lead + (-1, 3))
+
+    def evaluate(self, instance) -> np.ndarray:
+        """
+        Computes the expression landmarks of an instance.
+
+        Args:
+            instance (AbstractLandmark): The landmarks to read.
+
+        Returns:
+            np.ndarray: `(..., K, 3)` points, in the order of `names`.
+        """
+        columns = instance._coordinates(self._positions, self._index)
+        if not self._stages:
+            return self._apply(self._weights, columns)
+
+        sources = np.zeros(columns.shape[:-2] + (self._size, 3))
+        sources[..., : len(self._positions), :] = columns
+        for packed, targets in self._stages:
+            args = self._apply(packed, sources)
+            sources[..., targets, :] = vectorized.projection(
+                args[..., 0::3, :], args[..., 1::3, :], args[..., 2::3, :]
+            )
+
+        return self._apply(self._weights, sources)
+
+    @property
+    def names(self):
+        return self._names
+
+    @property
+    def positions(self):
+        return self._positions
+
+    def __len__(self):
+        return len(self._names)
+
+    def __repr__(self):
+        return (
+            f"<ExpressionProgram landmarks={list(self._names)} sources={self._size} "
+            f"projections={self._size - len(self._positions)}>"
+        )
@@ -0,0 +1,306 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Temporal smoothing filters for landmark streams.
+
+Each filter processes a whole landmark array per frame: every (x, y, z)
+coordinate of every landmark (and of every person, for stacked arrays) is
+filtered independently, with the state held in arrays allocated on the first
+frame. The visibility column is passed through unchanged.
+
+Filters are plain callables, so they can be used directly as `Pipeline`
+stages, either on the raw MediaPipe landmarks (before the virtual landmarks
+are computed) or on the complete array of a `VirtualLandmark` instance. A
+filter keeps the state of one stream of same-shaped arrays, so each position
+needs its own:
+
+    >>> pose = HelloWorld(results.pose_landmarks.landmark, storage="numpy")
+    >>> smooth_raw = OneEuroFilter(min_cutoff=1.0, beta=0.01)
+    >>> smooth_all = OneEuroFilter(min_cutoff=1.0, beta=0.01)
+    >>> pose.update(smooth_raw(results.pose_landmarks.landmark))  # before, (33, 4)
+    >>> points = smooth_all(pose.as_array())                      # after, (33 + K, 4)
+
+Missing values (NaN, e.g. frames without a pose) are returned as NaN and
+restart the filter of the affected coordinates once they are valid again.
+"""
+
+import abc
+
+import numpy as np
+
+from .abstract_landmark import landmarks_to_array
+
+DEFAULT_FREQUENCY = 30.0
+
+
+class TemporalFilter(abc.ABC):
+    """
+    Base class of the landmark filters.
+
+    Args:
+        freq (float): Frame rate used when no timestamps are given, or when
+            they do not increase. Defaults to 30.
+
+    Raises:
+        ValueError: If `freq` is not positive.
+    """
+
+    def __init__(self, freq: float = DEFAULT_FREQUENCY):
+        if freq <= 0:
+            raise ValueError(f"freq must be positive, got {freq!r}")
+
+        self.freq = freq
+        self._shape = None
+        self._ready = None
+        self._timestamp = None
+
+    def __call__(self, landmarks, timestamp: float = None) -> np.ndarray:
+        """
+        Filters one frame.
+
+        Args:
+            landmarks (Union[np.ndarray, AbstractLandmark, List[NormalizedLandmark]]):
+                A `(..., N, 3)` or `(..., N, 4)` array, a landmark instance
+                (its `as_array()` is filtered) or a list of landmarks.
+            timestamp (float, optional): Time of the frame in seconds. Defaults
+                to one `1 / freq` step after the previous frame.
+
+        Returns:
+            np.ndarray: The filtered float32 array, of the same shape as the input.
+        """
+        if hasattr(landmarks, "as_array"):
+            frame = landmarks.as_array()
+        elif isinstance(landmarks, np.ndarray):
+            frame = landmarks
+        else:
+            frame = landmarks_to_array(landmarks)
+
+        x = np.asarray(frame[..., :3], dtype=np.float64)
+        if x.shape != self._shape:
+            self.reset()
+            self._shape = x.shape
+            self._ready = np.zeros(x.shape, dtype=bool)
+            self._allocate(x.shape)
+
+        dt = 1.0 / self.freq
+        if timestamp is not None:
+            if self._timestamp is not None and timestamp > self._timestamp:
+                dt = timestamp - self._timestamp
+            self._timestamp = timestamp
+
+        valid = ~np.isnan(x)
+        fresh = valid & ~self._ready
+
+        with np.errstate(invalid="ignore"):
+            value = self._step(x, dt)
+        if fresh.any():
+            self._start(x, fresh)
+            value = np.where(fresh, x, value)
+
+        self._ready = valid
+
+        out = np.array(frame, dtype=np.float32)
+        out[..., :3] = np.where(valid, value, np.nan)
+        return out
+
+    def reset(self):
+        """
+        Forgets the state, e.g. before processing an unrelated video.
+
+        The state is also reset automatically when the shape of the input
+        changes (for instance when the number of tracked people changes).
+        """
+        self._shape = None
+        self._ready = None
+        self._timestamp = None
+
+    @abc.abstractmethod
+    def _allocate(self, shape):
+        """
+        Allocates the state arrays for inputs of the given `(..., N, 3)` shape.
+        """
+
+    @abc.abstractmethod
+    def _step(self, x: np.ndarray, dt: float) -> np.ndarray:
+        """
+        Advances the state with a new measurement and returns the estimate.
+        """
+
+    @abc.abstractmethod
+    def _start(self, x: np.ndarray, mask: np.ndarray):
+        """
+        Initializes the state of the masked coordinates from a measurement.
+        """
+
+
+class ExponentialFilter(TemporalFilter):
+    """
+    Exponential moving average.
+
+    Args:
+        alpha (float): Weight of the new measurement, between 0 (frozen) and
+            1 (no smoothing).
+        freq (float): See `TemporalFilter`.
+
+    Raises:
+        ValueError: If `alpha` is not in (0, 1].
+    """
+
+    def __init__(self, alpha: float = 0.5, freq: float = DEFAULT_FREQUENCY):
+        if not 0 < alpha <= 1:
+            raise ValueError(f"alpha must be in (0, 1], got {alpha!r}")
+
+        super().__init__(freq)
+        self.alpha = alpha
+
+    def _allocate(self, shape):
+        self._value = np.zeros(shape)
+
+    def _step(self, x, dt):
+        self._value += self.alpha * (x - self._value)
+        return self._value
+
+    def _start(self, x, mask):
+        self._value[mask] = x[mask]
+
+
+def _smoothing_factor(dt: float, cutoff):
+    """
+    Returns the smoothing factor of a first-order low-pass filter.
+    """
+    tau = 1.0 / (2 * np.pi * cutoff)
+    return 1.0 / (1.0 + tau / dt)
+
+
+class OneEuroFilter(TemporalFilter):
+    """
+    One-Euro filter (Casiez et al., 2012): a low-pass filter whose cutoff
+    frequency grows with the speed, so slow movements are smoothed strongly
+    and fast movements keep a low lag.
+
+    Args:
+        min_cutoff (float): Cutoff frequency at rest, in Hz. Lower values
+            remove more jitter.
+        beta (float): Speed coefficient. Higher values reduce the lag of fast
+            movements.
+        d_cutoff (float): Cutoff frequency of the speed estimate, in Hz.
+        freq (float): See `TemporalFilter`.
+
+    Raises:
+        ValueError: If a cutoff frequency is not positive or `beta` is negative.
+    """
+
+    def __init__(
+        self,
+        min_cutoff: float = 1.0,
+        beta: float = 0.0,
+        d_cutoff: float = 1.0,
+        freq: float = DEFAULT_FREQUENCY,
+    ):
+        if min_cutoff <= 0 or d_cutoff <= 0:
+            raise ValueError("Cutoff frequencies must be positive.")
+        if beta < 0:
+            raise ValueError(f"beta must not be negative, got {beta!r}")
+
+        super().__init__(freq)
+        self.min_cutoff = min_cutoff
+        self.beta = beta
+        self.d_cutoff = d_cutoff
+
+    def _allocate(self, shape):
+        self._value = np.zeros(shape)
+        self._speed = np.zeros(shape)
+
+    def _step(self, x, dt):
+        speed = (x - self._value) / dt
+        self._speed += _smoothing_factor(dt, self.d_cutoff) * (speed - self._speed)
+
+        cutoff = self.min_cutoff + self.beta * np.abs(self._speed)
+        self._value += _smoothing_factor(dt, cutoff) * (x - self._value)
+        return self._value
+
+    def _start(self, x, mask):
+        self._value[mask] = x[mask]
+        self._speed[mask] = 0.0
+
+
+class KalmanFilter(TemporalFilter):
+    """
+    Constant-velocity Kalman filter, run independently on every coordinate.
+
+    The state of each coordinate is its position and velocity; the 2x2
+    covariances are stored as three arrays, so a frame is updated with a few
+    element-wise operations whatever the number of landmarks.
+
+    Args:
+        process_noise (float): Variance of the acceleration. Higher values
+            follow fast movements more closely.
+        measurement_noise (float): Variance of the measured positions. Higher
+            values smooth more.
+        freq (float): See `TemporalFilter`.
+
+    Raises:
+        ValueError: If a noise value is not positive.
+    """
+
+    def __init__(
+        self,
+        process_noise: float = 1.0,
+        measurement_noise: float = 1e-4,
+        freq: float = DEFAULT_FREQUENCY,
+    ):
+        if process_noise <= 0 or measurement_noise <= 0:
+            raise ValueError("Noise values must be positive.")
+
+        super().__init__(freq)
+        self.process_noise = process_noise
+        self.measurement_noise = measurement_noise
+
+    def _allocate(self, shape):
+        self._position = np.zeros(shape)
+        self._velocity = np.zeros(shape)
+        self._p00 = np.zeros(shape)
+        self._p01 = np.zeros(shape)
+        self._p11 = np.zeros(shape)
+
+    def _step(self, x, dt):
+        q = self.process_noise
+        p00, p01, p11 = self._p00, self._p01, self._p11
+
+        # Predict
+        self._position += self._velocity * dt
+        p00 += dt * (2 * p01 + dt * p11) + q * dt**4 / 4
+        p01 += dt * p11 + q * dt**3 / 2
+        p11 += q * dt**2
+
+        # Update
+        s = p00 + self.measurement_noise
+        k0 = p00 / s
+        k1 = p01 / s
+        residual = x - self._position
+        self._position += k0 * residual
+        self._velocity += k1 * residual
+        p11 -= k1 * p01
+        p01 *= 1 - k0
+        p00 *= 1 - k0
+
+        return self._position
+
+    def _start(self, x, mask):
+        self._position[mask] = x[mask]
+        self._velocity[mask] = 0.0
+        self._p00[mask] = self.measurement_noise
+        self._p01[mask] = 0.0
+        self._p11[mask] = self.process_noise
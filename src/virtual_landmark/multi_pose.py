@@ -0,0 +1,200 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+
+from .abstract_landmark import NUMPY, _landmark_pb2, landmarks_to_array
+from .virtual_landmark import VirtualLandmark
+from .virtual_pose_landmark import BUILTIN_LANDMARKS
+
+
+def poses_to_array(poses) -> np.ndarray:
+    """
+    Converts the poses detected in one image to a `(P, N, 4)` float32 array.
+
+    Args:
+        poses (Union[np.ndarray, Sequence]): A `(P, N, 3)` or `(P, N, 4)` array,
+            or one landmark list per person, such as `result.pose_landmarks` of
+            MediaPipe's Tasks `PoseLandmarker`.
+
+    Returns:
+        np.ndarray: The stacked landmarks. Visibility defaults to 1.0.
+
+    Raises:
+        ValueError: If the array does not have 3 dimensions, or the people do
+            not have the same number of landmarks.
+    """
+    if isinstance(poses, np.ndarray):
+        if poses.ndim != 3:
+            raise ValueError("poses must have shape (P, N, 3) or (P, N, 4)")
+        return landmarks_to_array(poses)
+
+    arrays = [
+        landmarks_to_array(pose if isinstance(pose, np.ndarray) else list(pose))
+        for pose in poses
+    ]
+    if not arrays:
+        return np.empty((0, 0, 4), dtype=np.float32)
+    if len({a.shape for a in arrays}) > 1:
+        raise ValueError("All poses must have the same number of landmarks")
+
+    return np.stack(arrays)
+
+
+class MultiPose:
+    """
+    Virtual landmarks of several people seen in the same frame.
+
+    The landmarks of all P people are held in a single `(P, 33, 4)` array and
+    wrapped in one instance of the `VirtualLandmark` subclass with stacked
+    `"numpy"` storage, so each `@landmark` method runs once per frame for
+    everybody, receiving `(P, 4)` arrays from `self[...]`. Methods built on
+    `calculus` work unchanged.
+
+    Example:
+        >>> people = MultiPose(HelloWorld, result.pose_landmarks)
+        >>> people.as_array().shape
+        (5, 36, 4)
+        >>> for landmark_list, style in zip(people.as_landmark_lists(), people.styles()):
+        ...     mp_drawing.draw_landmarks(frame, landmark_list, people.connections.ALL_CONNECTIONS, style)
+
+    Args:
+        landmark_class (type): The `VirtualLandmark` subclass to evaluate.
+        poses (Union[np.ndarray, Sequence]): The detected poses, see `poses_to_array`.
+
+    Raises:
+        TypeError: If `landmark_class` is not a `VirtualLandmark` subclass.
+        ValueError: If the poses do not have 33 landmarks each.
+    """
+
+    def __init__(self, landmark_class: type, poses):
+        if not (isinstance(landmark_class, type) and issubclass(landmark_class, VirtualLandmark)):
+            raise TypeError("landmark_class must be a VirtualLandmark subclass")
+
+        self._class = landmark_class
+        self._landmarks = None
+        self._landmark_lists = None
+        self.update(poses)
+
+    def update(self, poses):
+        """
+        Replaces the poses with the ones of a new frame.
+
+        When the number of people does not change, the existing buffers are
+        reused; otherwise they are reallocated.
+
+        Args:
+            poses (Union[np.ndarray, Sequence]): The detected poses.
+
+        Returns:
+            MultiPose: The instance itself.
+        """
+        array = poses_to_array(poses)
+        if not len(array):
+            array = np.empty((0, len(BUILTIN_LANDMARKS), 4), dtype=np.float32)
+
+        if self._landmarks is not None and self._landmarks.as_array().shape[0] == len(array):
+            self._landmarks.update(array)
+        else:
+            self._landmarks = self._class(array, storage=NUMPY)
+
+        self._landmark_lists = None
+        return self
+
+    @property
+    def landmarks(self) -> VirtualLandmark:
+        """
+        Returns the batched instance holding all the people.
+        """
+        return self._landmarks
+
+    @property
+    def virtual_landmark(self):
+        """
+        Returns the name/index registry of the landmark class.
+        """
+        return self._landmarks.virtual_landmark
+
+    @property
+    def connections(self):
+        """
+        Returns the connections of the landmark class, shared by all people.
+
+        Returns:
+            Connections: The index-based connections, ready for drawing.
+        """
+        from .drawing_utils import Connections
+
+        return Connections(self._landmarks)
+
+    def as_array(self) -> np.ndarray:
+        """
+        Returns the landmarks of all people as a `(P, 33 + K, 4)` array view.
+        """
+        return self._landmarks.as_array()
+
+    def as_landmark_lists(self) -> list:
+        """
+        Returns one MediaPipe landmark list per person, e.g. for drawing.
+
+        The lists are built once per frame and reused until the next `update()`.
+
+        Returns:
+            List[NormalizedLandmarkList]: The landmarks of each person.
+        """
+        if self._landmark_lists is None:
+            landmark_pb2 = _landmark_pb2()
+            self._landmark_lists = []
+            for rows in self.as_array().tolist():
+                landmark_list = landmark_pb2.NormalizedLandmarkList()
+                for x, y, z, visibility in rows:
+                    landmark_list.landmark.add(x=x, y=y, z=z, visibility=visibility)
+                self._landmark_lists.append(landmark_list)
+
+        return self._landmark_lists
+
+    def styles(self) -> list:
+        """
+        Returns the drawing style of each person, see `get_extended_pose_landmarks_style`.
+
+        Returns:
+            List[Dict[int, DrawingSpec]]: One style dictionary per person.
+        """
+        from .drawing_utils import get_extended_pose_landmarks_style
+
+        return [get_extended_pose_landmarks_style(person) for person in self.as_array()]
+
+    def angles(self, degrees: bool = False) -> np.ndarray:
+        """
+        Computes the angles declared with `@angle` for all people.
+
+        Returns:
+            np.ndarray: A `(P, A)` array of angles.
+        """
+        return self._landmarks.angles(degrees)
+
+    def __len__(self):
+        return self.as_array().shape[0]
+
+    def __getitem__(self, person: int) -> np.ndarray:
+        """
+        Returns the `(33 + K, 4)` landmarks of one person, as an array view.
+        """
+        return self.as_array()[person]
+
+    def __iter__(self):
+        return iter(self.as_array())
+
+    def __repr__(self):
+        return f"<MultiPose class={self._class.__name__} people={len(self)}>"
@@ -0,0 +1,343 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import itertools
+import queue
+import threading
+from typing import Callable, Iterable
+
+BLOCK = "block"
+DROP_NEWEST = "drop_newest"
+DROP_OLDEST = "drop_oldest"
+POLICIES = (BLOCK, DROP_NEWEST, DROP_OLDEST)
+
+_STOP = object()
+_POLL = 0.05
+
+
+class Stage:
+    """
+    A processing step of a `Pipeline`.
+
+    Each worker of the stage runs in its own thread and applies a callable to
+    the items it receives. With several workers items are processed
+    concurrently, but the stage still emits them in their original order.
+
+    Args:
+        fn (Callable, optional): The callable shared by all workers.
+        factory (Callable, optional): Zero-argument callable creating one
+            callable per worker, inside the worker thread. Use it for objects
+            that are not thread-safe, such as MediaPipe's `Pose`. If the
+            created object has a `close()` method, it is called when the
+            worker stops.
+        workers (int): Number of worker threads. Defaults to 1.
+        name (str, optional): Name used for the worker threads.
+
+    Raises:
+        ValueError: If neither or both of `fn` and `factory` are given, or
+            `workers` is lower than 1.
+    """
+
+    def __init__(
+        self,
+        fn: Callable = None,
+        *,
+        factory: Callable = None,
+        workers: int = 1,
+        name: str = None,
+    ):
+        if (fn is None) == (factory is None):
+            raise ValueError("Exactly one of fn and factory must be given.")
+        if workers < 1:
+            raise ValueError("workers must be at least 1.")
+
+        self.fn = fn
+        self.factory = factory
+        self.workers = workers
+        self.name = name or getattr(fn or factory, "__name__", "stage")
+
+    def _create(self):
+        return self.fn if self.factory is None else self.factory()
+
+
+class _Sequencer:
+    """
+    Forwards `(seq, item)` pairs to a queue in sequence order, holding back the
+    items that arrive early.
+
+    At most `window` items are in flight, i.e. taken by a worker and not
+    forwarded yet: workers call `acquire()` before taking an item. A stalled
+    worker therefore holds back the other workers of its stage, and the queues
+    before it fill up (applying the policy of the pipeline), instead of the
+    early items piling up here.
+    """
+
+    def __init__(self, pipeline, out: queue.Queue, window: int):
+        self._pipeline = pipeline
+        self._out = out
+        self._next = 0
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._slots = threading.Semaphore(window)
+
+    def acquire(self) -> bool:
+        """
+        Waits for an in-flight slot. Returns False if the pipeline stopped.
+        """
+        while not self._pipeline._stopped.is_set():
+            if self._slots.acquire(timeout=_POLL):
+                return True
+        return False
+
+    def release(self):
+        self._slots.release()
+
+    def put(self, seq: int, item):
+        with self._lock:
+            self._pending[seq] = item
+            while self._next in self._pending:
+                self._pipeline._put(self._out, (self._next, self._pending.pop(self._next)))
+                self._next += 1
+                self._slots.release()
+
+    def finish(self):
+        self._pipeline._put(self._out, _STOP)
+
+
+class Pipeline:
+    """
+    Runs a chain of stages concurrently on bounded queues.
+
+    A thread reads items from the source, and each stage processes them in its
+    own worker threads, so capture, inference, virtual landmark computation
+    and rendering overlap instead of running one after the other. Results
+    are yielded in the order of the source.
+
+    When the first queue is full, the `policy` decides what happens to new
+    source items:
+
+    - `"block"` (default): the source waits, e.g. for recorded videos.
+    - `"drop_newest"`: the new item is discarded.
+    - `"drop_oldest"`: the oldest waiting item is discarded, which keeps the
+      latency of live sources low.
+
+    Example:
+        >>> pipeline = Pipeline(
+        ...     frames(cap),
+        ...     [Stage(factory=make_pose), build_landmarks, render],
+        ... )
+        >>> for frame in pipeline:
+        ...     cv2.imshow("Pose", frame)
+
+    Args:
+        source (Iterable): The items to process, e.g. video frames.
+        stages (Iterable[Union[Stage, Callable]]): The stages, in order. Plain
+            callables are wrapped in single-worker stages.
+        maxsize (int): Capacity of each queue between stages. A stage also
+            holds at most `workers + maxsize` items at once, including the
+            results waiting to be emitted in order. Defaults to 4.
+        policy (str): What to do when the first queue is full. Defaults to `"block"`.
+
+    Raises:
+        ValueError: If the policy is unknown, `maxsize` is lower than 1, or
+            there are no stages.
+    """
+
+    def __init__(
+        self,
+        source: Iterable,
+        stages: Iterable,
+        maxsize: int = 4,
+        policy: str = BLOCK,
+    ):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}, got {policy!r}")
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1.")
+
+        self._stages = [s if isinstance(s, Stage) else Stage(s) for s in stages]
+        if not self._stages:
+            raise ValueError("A pipeline needs at least one stage.")
+
+        self._source = source
+        self._maxsize = maxsize
+        self._policy = policy
+        self._dropped = 0
+        self._error = None
+        self._stopped = threading.Event()
+        self._threads = []
+        self._started = False
+
+    @property
+    def dropped(self) -> int:
+        """
+        Returns the number of source items discarded by the drop policy.
+        """
+        return self._dropped
+
+    def __iter__(self):
+        """
+        Starts the pipeline and yields the results of the last stage in order.
+
+        Raises:
+            RuntimeError: If the pipeline was already started.
+            Exception: Any exception raised by the source or a stage.
+        """
+        if self._started:
+            raise RuntimeError("A pipeline can only be run once.")
+        self._started = True
+
+        out = self._start()
+        try:
+            while True:
+                item = self._get(out)
+                if item is _STOP:
+                    break
+                yield item[1]
+        finally:
+            self.close()
+
+        if self._error is not None:
+            raise self._error
+
+    def close(self):
+        """
+        Stops all threads and waits for them to finish.
+        """
+        self._stopped.set()
+        for thread in self._threads:
+            thread.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _start(self) -> queue.Queue:
+        source_queue = queue.Queue(self._maxsize)
+        self._spawn(self._read, "source", source_queue)
+
+        inbox = source_queue
+        counter = itertools.count()
+        take_lock = threading.Lock()
+
+        for index, stage in enumerate(self._stages):
+            outbox = queue.Queue(self._maxsize)
+            sequencer = _Sequencer(self, outbox, stage.workers + self._maxsize)
+            remaining = [stage.workers]
+            done_lock = threading.Lock()
+
+            for worker in range(stage.workers):
+                self._spawn(
+                    self._work,
+                    f"{stage.name}-{worker}",
+                    stage,
+                    inbox,
+                    sequencer,
+                    remaining,
+                    done_lock,
+                    (counter, take_lock) if index == 0 else None,
+                )
+
+            inbox = outbox
+
+        return inbox
+
+    def _spawn(self, target, name, *args):
+        thread = threading.Thread(target=target, name=name, args=args, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _fail(self, error: BaseException):
+        if self._error is None:
+            self._error = error
+        self._stopped.set()
+
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._stopped.is_set():
+            try:
+                q.put(item, timeout=_POLL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        while True:
+            try:
+                return q.get(timeout=_POLL)
+            except queue.Empty:
+                if self._stopped.is_set():
+                    return _STOP
+
+    def _read(self, out: queue.Queue):
+        try:
+            for item in self._source:
+                if self._stopped.is_set():
+                    return
+                if self._policy == BLOCK:
+                    self._put(out, item)
+                    continue
+
+                try:
+                    out.put_nowait(item)
+                except queue.Full:
+                    if self._policy == DROP_OLDEST:
+                        try:
+                            out.get_nowait()
+                        except queue.Empty:
+                            pass
+                        self._put(out, item)
+                    self._dropped += 1
+        except Exception as error:
+            self._fail(error)
+        finally:
+            self._put(out, _STOP)
+
+    def _work(self, stage, inbox, sequencer, remaining, done_lock, numbering):
+        fn = None
+        try:
+            fn = stage._create()
+            while sequencer.acquire():
+                if numbering is None:
+                    entry = self._get(inbox)
+                    if entry is _STOP:
+                        sequencer.release()
+                        self._put(inbox, _STOP)  # for the other workers
+                        break
+                    seq, item = entry
+                else:
+                    counter, take_lock = numbering
+                    with take_lock:
+                        item = self._get(inbox)
+                        if item is _STOP:
+                            sequencer.release()
+                            self._put(inbox, _STOP)  # for the other workers
+                            break
+                        seq = next(counter)
+
+                sequencer.put(seq, fn(item))
+        except Exception as error:
+            self._fail(error)
+        finally:
+            close = getattr(fn, "close", None) if stage.factory is not None else None
+            if callable(close):
+                close()
+
+            with done_lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last:
+                sequencer.finish()
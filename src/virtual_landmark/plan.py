@@ -0,0 +1,683 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import ast
+import inspect
+import math
+import textwrap
+from typing import Callable, NamedTuple
+
+import numpy as np
+
+from . import vectorized
+from .expression import affine_expression, inline_sources
+
+
+def infer_inputs(method: Callable) -> tuple:
+    """
+    Infers the landmark names read by a `@landmark` method from its source.
+
+    Only explicit reads are recognized: `self[self.virtual_landmark.NAME]` and
+    `self[self.virtual_landmark["NAME"]]`, also through an alias assigned with
+    `vl = self.virtual_landmark`, and `self[i]` with a built-in index `i`
+    (which is not an input). Decorator arguments are ignored, so connections
+    are never taken as inputs. Names that do not name a landmark are discarded
+    by the caller.
+
+    Any other use of `self` (e.g. a helper method reading the landmarks, or an
+    index computed at runtime) could hide an input, so it is an error: such
+    methods must declare their inputs with `@landmark(..., inputs=[...])`.
+
+    Args:
+        method (Callable): The decorated function.
+
+    Returns:
+        tuple[str, ...]: Input names, in order of first appearance.
+
+    Raises:
+        ValueError: If the source code is not available, or the method uses
+            `self` in a way the inputs cannot be inferred from.
+    """
+    qualname = getattr(method, "__qualname__", repr(method))
+    hint = "declare them with @landmark(..., inputs=[...])"
+    try:
+        source = textwrap.dedent(inspect.getsource(method))
+        tree = ast.parse(source)
+    except (OSError, TypeError, SyntaxError):
+        raise ValueError(
+            f"Cannot infer the inputs of {qualname}: its source is not available; {hint}."
+        ) from None
+
+    func = next(
+        (
+            node
+            for node in ast.walk(tree)
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+        ),
+        None,
+    )
+    params = [*func.args.posonlyargs, *func.args.args] if func is not None else []
+    if not params:
+        return ()
+    this = params[0].arg
+
+    from .virtual_pose_landmark import BUILTIN_LANDMARKS
+
+    def is_self(node):
+        return isinstance(node, ast.Name) and node.id == this
+
+    def is_registry(node):
+        return (
+            isinstance(node, ast.Attribute)
+            and node.attr == "virtual_landmark"
+            and is_self(node.value)
+        ) or (isinstance(node, ast.Name) and node.id in aliases)
+
+    def read_name(node):
+        if isinstance(node, ast.Attribute) and is_registry(node.value):
+            return node.attr
+        if (
+            isinstance(node, ast.Subscript)
+            and is_registry(node.value)
+            and isinstance(node.slice, ast.Constant)
+            and isinstance(node.slice.value, str)
+        ):
+            return node.slice.value
+        return None
+
+    nodes = [node for statement in func.body for node in ast.walk(statement)]
+
+    aliases = set()
+    accepted = set()
+    for node in nodes:
+        if (
+            isinstance(node, ast.Assign)
+            and len(node.targets) == 1
+            and isinstance(node.targets[0], ast.Name)
+            and is_registry(node.value)
+            and not isinstance(node.value, ast.Name)
+        ):
+            aliases.add(node.targets[0].id)
+            accepted.update((id(node.targets[0]), id(node.value.value)))
+
+    names = {}
+    for node in nodes:
+        name = read_name(node)
+        if name is not None:
+            names.setdefault(name, None)
+            base = node.value.value if isinstance(node.value, ast.Attribute) else node.value
+            accepted.add(id(base))
+        elif isinstance(node, ast.Subscript) and is_self(node.value):
+            index = node.slice
+            if read_name(index) is not None or (
+                isinstance(index, ast.Constant)
+                and type(index.value) is int
+                and 0 <= index.value < len(BUILTIN_LANDMARKS)
+            ):
+                accepted.add(id(node.value))
+
+    parents = {id(child): parent for parent in nodes for child in ast.iter_child_nodes(parent)}
+    for node in nodes:
+        if (
+            isinstance(node, ast.Name)
+            and (node.id == this or node.id in aliases)
+            and id(node) not in accepted
+        ):
+            usage = ast.unparse(parents.get(id(node), node))
+            raise ValueError(
+                f"Cannot infer the inputs of {qualname}: `{usage}` "
+                f"is not a landmark read like `self[self.virtual_landmark.NAME]`; {hint}."
+            )
+
+    return tuple(names)
+
+
+class LandmarkSpec(NamedTuple):
+    """
+    Immutable description of a single `@landmark`-decorated method.
+
+    Attributes:
+        attr (str): Attribute name of the method in the owner class.
+        name (str): Name of the virtual landmark produced by the method.
+        method (Callable): The plain (unbound) function to call with the instance.
+        connections (tuple[str, ...]): Names of the landmarks it connects to.
+        inputs (tuple[str, ...]): Names read by the method, declared or inferred.
+        depends (tuple[str, ...]): The inputs that are virtual landmarks of the
+            same class, i.e. the landmarks that must be evaluated first.
+        visibility (Union[str, tuple, None]): How the visibility of the landmark
+            is derived from its inputs: `"min"`, `"product"`, `"mean"`, a tuple
+            of `(name, weight)` pairs, or None for a constant 1.0.
+        expr (Expression, optional): The expression declaring the landmark,
+            if it was declared without a method, or the weights extracted from
+            a method declared with `affine=True`.
+    """
+
+    attr: str
+    name: str
+    method: Callable
+    connections: tuple
+    inputs: tuple = ()
+    depends: tuple = ()
+    visibility: object = "min"
+    expr: object = None
+
+
+class LandmarkPlan:
+    """
+    Compiled, immutable evaluation plan of a `VirtualLandmark` subclass.
+
+    The plan is built once per class (see `VirtualLandmark.__init_subclass__`)
+    by scanning the class for `@landmark`-decorated methods. Every instance of
+    the class reuses it, so no reflection happens while processing frames.
+
+    Specs are sorted topologically by their dependencies and grouped in levels:
+    every landmark of a level only depends on landmarks of previous levels, so
+    the landmarks of one level can be evaluated together. Cyclic dependencies
+    raise a `ValueError` when the plan is compiled.
+
+    Attributes:
+        specs (tuple[LandmarkSpec, ...]): Landmark specs in evaluation order.
+        levels (tuple[tuple[LandmarkSpec, ...], ...]): Specs grouped by depth.
+        names (tuple[str, ...]): Virtual landmark names in evaluation order.
+        connections (frozenset[tuple[str, str]]): Unique, undirected connections
+            declared by all specs, stored as sorted name pairs.
+    """
+
+    __slots__ = ("_specs", "_levels", "_names", "_connections")
+
+    def __init__(self, specs):
+        specs = tuple(specs)
+
+        names = set()
+        for spec in specs:
+            if spec.name in names:
+                raise ValueError(f"Landmark '{spec.name}' is defined more than once.")
+            names.add(spec.name)
+
+        specs = tuple(
+            spec._replace(
+                depends=tuple(
+                    dict.fromkeys(i for i in spec.inputs if i in names)
+                )
+            )
+            for spec in specs
+        )
+
+        self._levels = self._sort(specs)
+        self._specs = tuple(spec for level in self._levels for spec in level)
+        self._names = tuple(spec.name for spec in self._specs)
+
+        self._connections = frozenset(
+            tuple(sorted((spec.name, target)))
+            for spec in self._specs
+            for target in spec.connections
+        )
+
+    @classmethod
+    def compile(cls, owner: type) -> "LandmarkPlan":
+        """
+        Scans a class (including inherited members) for `@landmark` methods.
+
+        Independent methods are ordered by attribute name, matching the order
+        in which `dir()` used to discover them on every instance.
+
+        The inputs of an expression landmark are the landmarks it is computed
+        from once the expression landmarks it references are inlined, so
+        chained expressions over built-in landmarks share the first level.
+        Methods declared with `affine=True` are probed here and become
+        expression landmarks.
+
+        Args:
+            owner (type): The class to scan.
+
+        Returns:
+            LandmarkPlan: The compiled plan.
+
+        Raises:
+            ValueError: If a method declared with `affine=True` is not affine,
+                or the inputs of a method cannot be inferred.
+        """
+        specs = []
+        for attr in dir(owner):
+            method = getattr(owner, attr, None)
+            if callable(method) and getattr(method, "_is_custom_landmark", False):
+                name = method._landmark_name
+                inputs = getattr(method, "_landmark_inputs", None)
+                if getattr(method, "_landmark_affine", False):
+                    inputs = ()  # probed below
+                elif inputs is None:
+                    inputs = [i for i in infer_inputs(method) if i != name]
+
+                # Weighted visibility reads its landmarks as well
+                visibility = getattr(method, "_landmark_visibility", "min")
+                if isinstance(visibility, tuple):
+                    inputs = list(dict.fromkeys([*inputs, *(n for n, _ in visibility)]))
+
+                specs.append(
+                    LandmarkSpec(
+                        attr=attr,
+                        name=name,
+                        method=method,
+                        connections=tuple(method._landmark_connections),
+                        inputs=tuple(inputs),
+                        visibility=visibility,
+                        expr=getattr(method, "_landmark_expr", None),
+                    )
+                )
+
+        affine = [k for k, spec in enumerate(specs) if getattr(spec.method, "_landmark_affine", False)]
+        if affine:
+            from .virtual_pose_landmark import BUILTIN_LANDMARKS, VirtualPoseLandmark
+
+            registry = VirtualPoseLandmark()
+            for idx, spec in enumerate(specs, start=len(BUILTIN_LANDMARKS)):
+                registry.add(spec.name, idx)
+            for k in affine:
+                expr = affine_expression(specs[k].name, specs[k].method, registry)
+                specs[k] = specs[k]._replace(inputs=expr.names(), expr=expr)
+
+        expressions = {spec.name: spec.expr for spec in specs if spec.expr is not None}
+        if expressions:
+            specs = [
+                spec._replace(
+                    inputs=tuple(
+                        dict.fromkeys(
+                            inline_sources(spec.name, expressions)
+                            + tuple(n for n in spec.inputs if n not in spec.expr.names())
+                        )
+                    )
+                )
+                if spec.expr is not None
+                else spec
+                for spec in specs
+            ]
+
+        return cls(specs)
+
+    @staticmethod
+    def _sort(specs):
+        """
+        Groups specs in dependency levels (Kahn's algorithm), keeping the
+        original relative order inside each level.
+
+        Raises:
+            ValueError: If the dependencies contain a cycle.
+        """
+        done = set()
+        pending = list(specs)
+        levels = []
+
+        while pending:
+            level = tuple(s for s in pending if all(d in done for d in s.depends))
+            if not level:
+                cycle = ", ".join(
+                    f"{s.name} -> {list(s.depends)}" for s in pending
+                )
+                raise ValueError(f"Cyclic landmark dependencies: {cycle}")
+
+            levels.append(level)
+            done.update(s.name for s in level)
+            pending = [s for s in pending if s.name not in done]
+
+        return tuple(levels)
+
+    @property
+    def specs(self):
+        return self._specs
+
+    @property
+    def levels(self):
+        return self._levels
+
+    @property
+    def names(self):
+        return self._names
+
+    @property
+    def connections(self):
+        return self._connections
+
+    def __len__(self):
+        return len(self._specs)
+
+    def __iter__(self):
+        return iter(self._specs)
+
+    def __repr__(self):
+        return f"<LandmarkPlan landmarks={list(self._names)}>"
+
+
+VISIBILITY_RULES = ("min", "product", "mean")
+
+
+class VisibilityRule:
+    """
+    Compiled visibility rule of one virtual landmark.
+
+    The inputs of the landmark are resolved to indices once per class, so the
+    visibility of a frame (or of a whole clip, with stacked `"numpy"` storage)
+    is a single gather of the visibility column followed by one reduction.
+
+    Attributes:
+        mode (str): `"min"`, `"product"` or `"weighted"`.
+        index (np.ndarray): Indices of the landmarks the visibility depends on.
+        weights (np.ndarray): Normalized weights of the inputs (`"weighted"` mode).
+    """
+
+    __slots__ = ("_mode", "_index", "_positions", "_weights", "_weight_list")
+
+    def __init__(self, mode: str, index, weights=None):
+        self._mode = mode
+        self._positions = tuple(int(i) for i in index)
+        self._index = np.array(self._positions, dtype=np.intp)
+        self._weights = None
+        self._weight_list = ()
+        if weights is not None:
+            weights = np.asarray(weights, dtype=np.float64)
+            self._weights = weights / weights.sum()
+            self._weight_list = tuple(self._weights.tolist())
+
+    @classmethod
+    def compile(cls, spec: LandmarkSpec, registry):
+        """
+        Resolves the visibility rule of a spec against the registry of a class.
+
+        Inputs that are not landmark names are ignored. Landmarks without any
+        input landmark (e.g. methods indexing `self` with integers) keep a
+        constant visibility of 1.0.
+
+        Args:
+            spec (LandmarkSpec): The landmark.
+            registry (VirtualPoseLandmark): Name/index mapping of the class.
+
+        Returns:
+            Optional[VisibilityRule]: The compiled rule, or None for a constant 1.0.
+
+        Raises:
+            ValueError: If a weighted rule uses unknown landmarks.
+        """
+        rule = spec.visibility
+        if rule is None:
+            return None
+
+        if isinstance(rule, tuple):
+            missing = [name for name, _ in rule if name not in registry]
+            if missing:
+                raise ValueError(
+                    f"Visibility of landmark '{spec.name}' uses unknown landmarks {missing}"
+                )
+            return cls("weighted", [registry[n] for n, _ in rule], [w for _, w in rule])
+
+        index = [registry[name] for name in spec.inputs if name in registry]
+        if not index:
+            return None
+        if rule == "mean":
+            return cls("weighted", index, [1.0] * len(index))
+        return cls(rule, index)
+
+    def combine(self, visibility):
+        """
+        Combines the visibility of the inputs.
+
+        Args:
+            visibility (Union[Sequence[float], np.ndarray]): Visibility of each
+                input, as a sequence (single landmark set) or a `(..., M)` array.
+
+        Returns:
+            Union[float, np.ndarray]: The visibility of the landmark, a float
+                or a `(...,)` array.
+        """
+        if isinstance(visibility, np.ndarray):
+            if self._mode == "min":
+                return visibility.min(axis=-1)
+            if self._mode == "product":
+                return visibility.prod(axis=-1)
+            return visibility @ self._weights
+
+        if self._mode == "min":
+            return min(visibility)
+        if self._mode == "product":
+            return math.prod(visibility)
+        return sum(w * v for w, v in zip(self._weight_list, visibility))
+
+    @property
+    def mode(self):
+        return self._mode
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def positions(self):
+        return self._positions
+
+    @property
+    def weights(self):
+        return self._weights
+
+    def __repr__(self):
+        return f"<VisibilityRule mode={self._mode} index={list(self._positions)}>"
+
+
+class VisibilityPlan:
+    """
+    Compiled visibility rules of a `VirtualLandmark` subclass.
+
+    The rules follow the levels of the `LandmarkPlan`: every landmark of a
+    level only reads landmarks of previous levels, so the visibilities of a
+    whole level are computed together, with one gather of the visibility
+    column and one reduction per rule mode, before its methods run.
+
+    Attributes:
+        rules (tuple[Optional[VisibilityRule], ...]): Rule of each landmark, in
+            evaluation order. None stands for a constant visibility of 1.0.
+    """
+
+    __slots__ = ("_rules", "_levels")
+
+    def __init__(self, plan: LandmarkPlan, registry):
+        """
+        Args:
+            plan (LandmarkPlan): The landmark plan of the class.
+            registry (VirtualPoseLandmark): Name/index mapping of the class.
+
+        Raises:
+            ValueError: If a weighted rule uses unknown landmarks.
+        """
+        self._rules = tuple(VisibilityRule.compile(spec, registry) for spec in plan)
+
+        self._levels = []
+        start = 0
+        for level in plan.levels:
+            rules = self._rules[start : start + len(level)]
+            self._levels.append(self._group(rules))
+            start += len(level)
+        self._levels = tuple(self._levels)
+
+    @staticmethod
+    def _group(rules):
+        """
+        Groups the rules of a level by mode, as padded `(G, M)` index arrays.
+        """
+        groups = []
+        for mode in ("min", "product", "weighted"):
+            members = [(k, r) for k, r in enumerate(rules) if r is not None and r.mode == mode]
+            if not members:
+                continue
+
+            width = max(len(r.positions) for _, r in members)
+            index = np.empty((len(members), width), dtype=np.intp)
+            extra = None
+            if mode == "product":
+                extra = np.zeros((len(members), width), dtype=bool)
+            elif mode == "weighted":
+                extra = np.zeros((len(members), width))
+
+            for row, (_, rule) in enumerate(members):
+                m = len(rule.positions)
+                # Repeating an input does not change the minimum; for the
+                # other modes padding is masked out or has a zero weight
+                index[row] = rule.positions + rule.positions[:1] * (width - m)
+                if mode == "product":
+                    extra[row, :m] = True
+                elif mode == "weighted":
+                    extra[row, :m] = rule.weights
+
+            positions = np.array([k for k, _ in members], dtype=np.intp)
+            groups.append((mode, positions, index, extra))
+
+        # Whether the only group covers the whole level, in order
+        direct = len(groups) == 1 and len(groups[0][1]) == len(rules)
+        return len(rules), tuple(groups), direct
+
+    def compute(self, level: int, visibility: np.ndarray) -> np.ndarray:
+        """
+        Computes the visibility of the landmarks of one level.
+
+        Args:
+            level (int): Index of the level in `LandmarkPlan.levels`.
+            visibility (np.ndarray): The `(..., N)` visibility column of the
+                landmark set, with the previous levels already filled in.
+
+        Returns:
+            np.ndarray: `(..., K)` visibilities of the K landmarks of the level.
+        """
+        size, groups, direct = self._levels[level]
+        if not direct:
+            out = np.ones(visibility.shape[:-1] + (size,), dtype=visibility.dtype)
+
+        for mode, positions, index, extra in groups:
+            values = visibility[..., index]
+            if mode == "min":
+                result = values.min(axis=-1)
+            elif mode == "product":
+                result = np.where(extra, values, 1.0).prod(axis=-1)
+            else:
+                result = (values * extra).sum(axis=-1)
+
+            if direct:
+                return result
+            out[..., positions] = result
+
+        return out
+
+    @property
+    def rules(self):
+        return self._rules
+
+    def __len__(self):
+        return len(self._rules)
+
+    def __repr__(self):
+        return f"<VisibilityPlan landmarks={len(self._rules)} levels={len(self._levels)}>"
+
+
+class AngleSpec(NamedTuple):
+    """
+    Immutable description of a joint angle declared with `@angle`.
+
+    Attributes:
+        name (str): Name of the angle.
+        points (tuple[str, str, str]): Names of the first landmark, the pivot
+            and the second landmark.
+        dims (int): 3 for the angle in space, 2 for the image plane.
+    """
+
+    name: str
+    points: tuple
+    dims: int = 3
+
+
+class AnglePlan:
+    """
+    Compiled joint angles of a `VirtualLandmark` subclass.
+
+    Landmark names are resolved to indices once, so all the angles of a frame
+    (or of a whole clip) are computed with a single gather and one vectorized
+    `vectorized.angle` call.
+
+    Attributes:
+        specs (tuple[AngleSpec, ...]): Angle specs, in declaration order.
+        names (tuple[str, ...]): Angle names, in declaration order.
+        index (np.ndarray): `(K, 3)` landmark indices of each angle.
+        dims (np.ndarray): `(K,)` dimensionality of each angle.
+    """
+
+    __slots__ = ("_specs", "_names", "_index", "_dims")
+
+    def __init__(self, specs, registry):
+        """
+        Args:
+            specs (Iterable[AngleSpec]): The angles.
+            registry (VirtualPoseLandmark): Name/index mapping of the class.
+
+        Raises:
+            ValueError: If an angle name is repeated, or a landmark is unknown.
+        """
+        self._specs = tuple(specs)
+        self._names = tuple(spec.name for spec in self._specs)
+        if len(set(self._names)) != len(self._names):
+            raise ValueError(f"Angle names must be unique, got {list(self._names)}")
+
+        index = []
+        for spec in self._specs:
+            missing = [p for p in spec.points if p not in registry]
+            if missing:
+                raise ValueError(f"Angle '{spec.name}' uses unknown landmarks {missing}")
+            index.append([registry[p] for p in spec.points])
+
+        self._index = np.array(index, dtype=np.intp).reshape(-1, 3)
+        self._dims = np.array([spec.dims for spec in self._specs], dtype=np.intp)
+
+    def compute(self, array: np.ndarray) -> np.ndarray:
+        """
+        Computes all the angles from a landmark array.
+
+        Args:
+            array (np.ndarray): A `(..., N, 3)` or `(..., N, 4)` landmark array,
+                e.g. a single frame or a `(T, N, 4)` clip.
+
+        Returns:
+            np.ndarray: `(..., K)` angles in radians, in declaration order.
+        """
+        points = np.asarray(array)[..., self._index, :3]
+        return vectorized.angle(
+            points[..., 0, :], points[..., 1, :], points[..., 2, :], self._dims
+        )
+
+    @property
+    def specs(self):
+        return self._specs
+
+    @property
+    def names(self):
+        return self._names
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def dims(self):
+        return self._dims
+
+    def __len__(self):
+        return len(self._specs)
+
+    def __iter__(self):
+        return iter(self._specs)
+
+    def __repr__(self):
+        return f"<AnglePlan angles={list(self._names)}>"
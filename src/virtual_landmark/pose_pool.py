@@ -0,0 +1,309 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Reuse of MediaPipe `Pose` instances.
+
+Creating a `Pose` loads its graph and model, which takes hundreds of
+milliseconds (more with `model_complexity=2`). A `PosePool` keeps instances
+alive between sessions, so a new client gets a ready one:
+
+    >>> pool = PosePool()
+    >>> pool.prewarm(2, model_complexity=2)
+    >>> with pool.pose(model_complexity=2) as pose:
+    ...     results = pose.process(rgb_frame)
+
+Instances are reset when they are returned, so no tracking state leaks from
+one session to the next.
+"""
+
+import inspect
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+
+class PosePool:
+    """
+    A thread-safe pool of `Pose` instances, grouped by configuration.
+
+    Configurations are compared after applying the defaults of the factory,
+    so `acquire()` and `acquire(model_complexity=1)` share instances.
+
+    Args:
+        factory (Callable, optional): Creates an instance from configuration
+            keyword arguments. Defaults to `mp.solutions.pose.Pose`.
+        max_idle (int): Maximum number of idle instances kept per
+            configuration; extra ones are closed when returned. Defaults to 4.
+        idle_timeout (float, optional): Idle instances unused for longer than
+            this many seconds are closed by `evict()`, which `acquire()` and
+            `release()` also call. None keeps them forever. Defaults to 300.
+        clock (Callable[[], float]): Time source, in seconds. Defaults to
+            `time.monotonic`.
+
+    Raises:
+        ValueError: If `max_idle` is negative or `idle_timeout` is not positive.
+    """
+
+    def __init__(
+        self,
+        factory: Callable = None,
+        max_idle: int = 4,
+        idle_timeout: float = 300.0,
+        clock: Callable = time.monotonic,
+    ):
+        if max_idle < 0:
+            raise ValueError("max_idle must not be negative.")
+        if idle_timeout is not None and idle_timeout <= 0:
+            raise ValueError("idle_timeout must be positive.")
+
+        self._factory = factory
+        self._max_idle = max_idle
+        self._idle_timeout = idle_timeout
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._idle = {}  # configuration -> [(idle since, instance)], oldest first
+        self._leased = {}  # id(instance) -> (configuration, instance)
+        self._created = 0
+        self._closed = False
+
+    def _get_factory(self) -> Callable:
+        if self._factory is None:
+            import mediapipe as mp
+
+            self._factory = mp.solutions.pose.Pose
+        return self._factory
+
+    def _key(self, config: dict) -> tuple:
+        """
+        Returns the configuration with the defaults of the factory applied.
+
+        Raises:
+            TypeError: If the factory does not accept the arguments.
+        """
+        factory = self._get_factory()
+        try:
+            signature = inspect.signature(factory)
+        except (TypeError, ValueError):  # builtins without a signature
+            return tuple(sorted(config.items()))
+
+        bound = signature.bind(**config)
+        bound.apply_defaults()
+        arguments = dict(bound.arguments)
+        for name, parameter in signature.parameters.items():
+            if parameter.kind is inspect.Parameter.VAR_KEYWORD:
+                arguments.update(arguments.pop(name, {}))
+        return tuple(sorted(arguments.items()))
+
+    def _create(self, key: tuple):
+        instance = self._get_factory()(**dict(key))
+        with self._lock:
+            self._created += 1
+        return instance
+
+    @staticmethod
+    def _close(instances):
+        for instance in instances:
+            close = getattr(instance, "close", None)
+            if callable(close):
+                close()
+
+    def prewarm(self, count: int = 1, **config) -> int:
+        """
+        Creates idle instances of a configuration, up to `count` idle ones
+        (and at most `max_idle`).
+
+        Args:
+            count (int): Number of idle instances wanted. Defaults to 1.
+            **config: Keyword arguments of the factory.
+
+        Returns:
+            int: Number of instances created.
+
+        Raises:
+            RuntimeError: If the pool is closed.
+        """
+        key = self._key(config)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The pool is closed.")
+            missing = min(count, self._max_idle) - len(self._idle.get(key, ()))
+
+        created = [self._create(key) for _ in range(max(0, missing))]
+        now = self._clock()
+        with self._lock:
+            if self._closed:
+                surplus = created
+            else:
+                self._idle.setdefault(key, []).extend((now, instance) for instance in created)
+                surplus = []
+
+        self._close(surplus)
+        if surplus:
+            raise RuntimeError("The pool is closed.")
+        return len(created)
+
+    def acquire(self, **config):
+        """
+        Checks out an instance, creating one if none of this configuration
+        is idle.
+
+        Args:
+            **config: Keyword arguments of the factory.
+
+        Returns:
+            The instance. Give it back with `release()`.
+
+        Raises:
+            RuntimeError: If the pool is closed.
+        """
+        self.evict()
+        key = self._key(config)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("The pool is closed.")
+            idle = self._idle.get(key)
+            instance = idle.pop()[1] if idle else None
+
+        if instance is None:
+            instance = self._create(key)
+
+        with self._lock:
+            self._leased[id(instance)] = (key, instance)
+        return instance
+
+    def release(self, instance):
+        """
+        Returns an instance to the pool, after resetting its tracking state.
+
+        The instance is closed instead if the pool is closed or already holds
+        `max_idle` idle instances of its configuration, or if resetting it
+        fails.
+
+        Args:
+            instance: An instance obtained from `acquire()`.
+
+        Raises:
+            ValueError: If the instance was not checked out from this pool.
+            Exception: Any exception raised by the `reset()` of the instance.
+        """
+        with self._lock:
+            entry = self._leased.pop(id(instance), None)
+        if entry is None or entry[1] is not instance:
+            raise ValueError("The instance was not checked out from this pool.")
+
+        reset = getattr(instance, "reset", None)
+        if callable(reset):
+            try:
+                reset()
+            except BaseException:
+                self._close([instance])
+                raise
+
+        key = entry[0]
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            keep = not self._closed and len(idle) < self._max_idle
+            if keep:
+                idle.append((self._clock(), instance))
+
+        if not keep:
+            self._close([instance])
+        self.evict()
+
+    @contextmanager
+    def pose(self, **config):
+        """
+        Checks out an instance for the duration of a `with` block.
+
+        Args:
+            **config: Keyword arguments of the factory.
+
+        Yields:
+            The instance.
+        """
+        instance = self.acquire(**config)
+        try:
+            yield instance
+        finally:
+            self.release(instance)
+
+    def evict(self) -> int:
+        """
+        Closes the instances that have been idle for longer than `idle_timeout`.
+
+        Returns:
+            int: Number of instances closed.
+        """
+        if self._idle_timeout is None:
+            return 0
+
+        deadline = self._clock() - self._idle_timeout
+        expired = []
+        with self._lock:
+            for idle in self._idle.values():
+                # Oldest first: stop at the first recent one
+                count = 0
+                while count < len(idle) and idle[count][0] < deadline:
+                    count += 1
+                expired.extend(instance for _, instance in idle[:count])
+                del idle[:count]
+
+        self._close(expired)
+        return len(expired)
+
+    def close(self):
+        """
+        Closes the idle instances. Instances still checked out are closed
+        when they are released.
+        """
+        with self._lock:
+            self._closed = True
+            idle = [instance for entries in self._idle.values() for _, instance in entries]
+            self._idle = {}
+
+        self._close(idle)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def idle(self) -> int:
+        """
+        Returns the number of idle instances, all configurations together.
+        """
+        with self._lock:
+            return sum(len(entries) for entries in self._idle.values())
+
+    @property
+    def leased(self) -> int:
+        """
+        Returns the number of instances checked out.
+        """
+        with self._lock:
+            return len(self._leased)
+
+    @property
+    def created(self) -> int:
+        """
+        Returns the number of instances created since the pool was built.
+        """
+        return self._created
+
+    def __repr__(self):
+        return f"<PosePool idle={self.idle} leased={self.leased} created={self._created}>"
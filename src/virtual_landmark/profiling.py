@@ -0,0 +1,323 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Opt-in profiling of `@landmark` methods.
+
+A `LandmarkProfiler` attached to a `VirtualLandmark` subclass (or to
+`VirtualLandmark` itself, to profile every subclass) records the time spent
+in each `@landmark` method, and optionally the memory it allocates,
+aggregated over all the frames processed while it is attached:
+
+    >>> with LandmarkProfiler(HelloWorld) as profiler:
+    ...     for frame in frames:
+    ...         pose.update(frame)
+    >>> print(profiler.report())
+    >>> profiler.save_chrome_trace("trace.json")  # open in chrome://tracing or Perfetto
+
+When no profiler is attached, the evaluation loop only checks a class
+attribute once per frame.
+"""
+
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import NamedTuple
+
+from .virtual_landmark import VirtualLandmark
+
+
+class LandmarkStats(NamedTuple):
+    """
+    Aggregated measurements of one `@landmark` method.
+
+    Times include the landmarks evaluated on demand by the method (lazy mode).
+
+    Attributes:
+        owner (str): Name of the class of the profiled instances.
+        name (str): Name of the virtual landmark.
+        calls (int): Number of calls.
+        total (float): Total time, in seconds.
+        min (float): Fastest call, in seconds.
+        max (float): Slowest call, in seconds.
+        peak_bytes (int): Largest memory peak of a call, in bytes (0 unless
+            memory profiling is enabled).
+    """
+
+    owner: str
+    name: str
+    calls: int
+    total: float
+    min: float
+    max: float
+    peak_bytes: int = 0
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.calls if self.calls else 0.0
+
+
+class LandmarkProfiler:
+    """
+    Records the cost of the `@landmark` methods of a class.
+
+    Args:
+        landmark_class (type, optional): The `VirtualLandmark` subclass to
+            profile. Defaults to `VirtualLandmark`, i.e. all subclasses that
+            do not have a profiler of their own.
+        memory (bool): Whether to measure the memory allocated by each call
+            with `tracemalloc`. This slows the methods down noticeably.
+            Defaults to False.
+        max_events (int): Maximum number of calls kept for the Chrome trace.
+            Later calls are still aggregated in the statistics. Defaults to 100000.
+
+    Raises:
+        TypeError: If `landmark_class` is not a `VirtualLandmark` subclass.
+    """
+
+    def __init__(self, landmark_class: type = VirtualLandmark, memory: bool = False, max_events: int = 100_000):
+        if not (isinstance(landmark_class, type) and issubclass(landmark_class, VirtualLandmark)):
+            raise TypeError("landmark_class must be a VirtualLandmark subclass")
+
+        self._class = landmark_class
+        self._memory = memory
+        self._max_events = max_events
+        self._lock = threading.Lock()
+        self._started_tracemalloc = False
+        self._calls = threading.local()  # memory of the calls running in each thread
+        self.reset()
+
+    def reset(self):
+        """
+        Discards all the measurements.
+        """
+        with self._lock:
+            self._stats = {}
+            self._events = []
+            self._frames = 0
+            self._origin = time.perf_counter_ns()
+
+    def attach(self):
+        """
+        Starts profiling the class.
+
+        Returns:
+            LandmarkProfiler: The profiler itself.
+
+        Raises:
+            RuntimeError: If the class already has a profiler attached.
+        """
+        if self._class.__dict__.get("_profiler") is not None:
+            raise RuntimeError(f"{self._class.__name__} already has a profiler attached")
+
+        if self._memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+        self._class._profiler = self
+        return self
+
+    def detach(self):
+        """
+        Stops profiling the class. The measurements are kept.
+        """
+        if self._class.__dict__.get("_profiler") is self:
+            if self._class is VirtualLandmark:
+                self._class._profiler = None
+            else:
+                del self._class._profiler
+
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def __enter__(self):
+        return self.attach()
+
+    def __exit__(self, *exc):
+        self.detach()
+
+    @contextmanager
+    def frame(self, instance):
+        """
+        Wraps the evaluation of all the landmarks of an instance.
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            end = time.perf_counter_ns()
+            with self._lock:
+                self._frames += 1
+                self._record_event(type(instance).__name__, "frame", start, end)
+
+    def call(self, spec, instance):
+        """
+        Calls a `@landmark` method and records its cost.
+
+        Args:
+            spec (LandmarkSpec): The landmark to evaluate.
+            instance (VirtualLandmark): The instance passed to the method.
+
+        Returns:
+            The value returned by the method.
+        """
+        memory = self._memory and tracemalloc.is_tracing()
+        if memory:
+            # Nested calls (lazy landmarks reading each other) reset the peak
+            # too: each running call keeps [base, peak] and the peak seen so
+            # far is folded into the enclosing call before it is reset.
+            running = self._calls.__dict__.setdefault("stack", [])
+            current, peak = tracemalloc.get_traced_memory()
+            if running:
+                running[-1][1] = max(running[-1][1], peak)
+            tracemalloc.reset_peak()
+            running.append([current, current])
+
+        start = time.perf_counter_ns()
+        try:
+            return spec.method(instance)
+        finally:
+            end = time.perf_counter_ns()
+            peak = 0
+            if memory:
+                base, highest = running.pop()
+                highest = max(highest, tracemalloc.get_traced_memory()[1])
+                if running:
+                    running[-1][1] = max(running[-1][1], highest)
+                peak = highest - base
+            self._record(type(instance).__name__, spec.name, start, end, peak)
+
+    def _record(self, owner, name, start, end, peak):
+        elapsed = (end - start) / 1e9
+        key = (owner, name)
+
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                self._stats[key] = LandmarkStats(owner, name, 1, elapsed, elapsed, elapsed, peak)
+            else:
+                self._stats[key] = LandmarkStats(
+                    owner,
+                    name,
+                    stats.calls + 1,
+                    stats.total + elapsed,
+                    min(stats.min, elapsed),
+                    max(stats.max, elapsed),
+                    max(stats.peak_bytes, peak),
+                )
+            self._record_event(owner, name, start, end)
+
+    def _record_event(self, owner, name, start, end):
+        if len(self._events) < self._max_events:
+            self._events.append((owner, name, start, end, threading.get_ident()))
+
+    @property
+    def frames(self) -> int:
+        """
+        Returns the number of evaluation passes recorded (creations and updates).
+        """
+        return self._frames
+
+    def stats(self) -> list:
+        """
+        Returns the aggregated measurements, slowest landmark first.
+
+        Returns:
+            List[LandmarkStats]: One entry per class and landmark.
+        """
+        with self._lock:
+            return sorted(self._stats.values(), key=lambda s: s.total, reverse=True)
+
+    def report(self, limit: int = None) -> str:
+        """
+        Formats the measurements as a plain-text table.
+
+        Args:
+            limit (int, optional): Maximum number of landmarks listed.
+
+        Returns:
+            str: The table.
+        """
+        stats = self.stats()[:limit]
+        total = sum(s.total for s in stats) or 1.0
+
+        lines = [
+            f"{self._frames} frames",
+            f"{'landmark':<40} {'calls':>8} {'total ms':>10} {'mean us':>10} {'max us':>10} {'share':>7} {'peak KiB':>9}",
+        ]
+        for s in stats:
+            lines.append(
+                f"{s.owner + '.' + s.name:<40} {s.calls:>8} {s.total * 1e3:>10.2f} "
+                f"{s.mean * 1e6:>10.1f} {s.max * 1e6:>10.1f} {s.total / total:>6.1%} "
+                f"{s.peak_bytes / 1024:>9.1f}"
+            )
+        return "\n".join(lines)
+
+    def to_dict(self) -> dict:
+        """
+        Returns the measurements as JSON-serializable data.
+        """
+        return {
+            "frames": self._frames,
+            "landmarks": [dict(s._asdict(), mean=s.mean) for s in self.stats()],
+        }
+
+    def chrome_trace(self) -> dict:
+        """
+        Returns the recorded calls in the Chrome trace event format.
+
+        Returns:
+            dict: Trace data, to be saved as JSON and opened in `chrome://tracing`
+                or Perfetto.
+        """
+        pid = os.getpid()
+        with self._lock:
+            events = list(self._events)
+            origin = self._origin
+
+        return {
+            "traceEvents": [
+                {
+                    "name": name,
+                    "cat": owner,
+                    "ph": "X",
+                    "ts": (start - origin) / 1e3,
+                    "dur": (end - start) / 1e3,
+                    "pid": pid,
+                    "tid": tid,
+                }
+                for owner, name, start, end, tid in events
+            ],
+            "displayTimeUnit": "ms",
+        }
+
+    def save_chrome_trace(self, path):
+        """
+        Writes the Chrome trace to a JSON file.
+
+        Args:
+            path (Union[str, Path]): Destination file.
+        """
+        with open(path, "w") as f:
+            json.dump(self.chrome_trace(), f)
+
+    def __repr__(self):
+        return (
+            f"<LandmarkProfiler class={self._class.__name__} frames={self._frames} "
+            f"landmarks={len(self._stats)}>"
+        )
@@ -0,0 +1,289 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Compact binary format for landmark recordings.
+
+A recording file (`.vlm`) is laid out as follows, in little-endian order:
+
+1. A 32-byte prefix: magic (`b"VLMREC\\x00\\x01"`), format version (uint32),
+   header size (uint32), number of landmarks N (uint64) and number of
+   frames T (uint64).
+2. A UTF-8 JSON header with the landmark names (in index order), the
+   connections (index pairs) and free-form metadata, padded so the data
+   starts on a 64-byte boundary.
+3. T frame records, each a float64 timestamp followed by the float32
+   `(N, 4)` landmarks (x, y, z, visibility).
+
+Frames are streamed to disk with their timestamps as they are appended; the
+frame count is written when the writer is closed. Recordings that were not
+closed (e.g. after a crash) can still be read: the frame count is recovered
+from the file size, and a trailing partial record is ignored.
+
+`RecordingReader` memory-maps the data, so opening a multi-hour recording or
+slicing a time range of it does not load the whole file.
+"""
+
+import json
+import struct
+
+import numpy as np
+
+MAGIC = b"VLMREC\x00\x01"
+VERSION = 2
+EXTENSION = ".vlm"
+
+_PREFIX = struct.Struct("<8sIIQQ")
+_ALIGNMENT = 64
+_OPEN = 2**64 - 1  # frame count of a recording that was not closed
+_FRAME_DTYPE = np.dtype("<f4")
+_TIME_DTYPE = np.dtype("<f8")
+
+
+def _record_dtype(n_landmarks: int) -> np.dtype:
+    """
+    Returns the dtype of one frame record: its timestamp and its landmarks.
+    """
+    return np.dtype([("timestamp", _TIME_DTYPE), ("landmarks", _FRAME_DTYPE, (n_landmarks, 4))])
+
+
+class RecordingWriter:
+    """
+    Streams landmark frames to a recording file.
+
+    Example:
+        >>> with RecordingWriter.for_class("session.vlm", HelloWorld) as writer:
+        ...     for frame in frames:
+        ...         writer.append(HelloWorld(frame.landmark, storage="numpy"))
+
+    Args:
+        path (Union[str, Path]): Path of the file to create.
+        names (Sequence[str]): Landmark names, in index order.
+        connections (Iterable[Tuple[int, int]]): Index pairs of connected landmarks.
+        metadata (dict, optional): JSON-serializable information stored in the header.
+    """
+
+    def __init__(self, path, names, connections=(), metadata=None):
+        self._names = [str(name) for name in names]
+        self._record = _record_dtype(len(self._names))
+        self._count = 0
+        self._file = open(path, "wb")
+
+        header = json.dumps(
+            {
+                "names": self._names,
+                "connections": [[int(a), int(b)] for a, b in connections],
+                "metadata": metadata or {},
+            }
+        ).encode("utf-8")
+        padding = -(_PREFIX.size + len(header)) % _ALIGNMENT
+        header += b" " * padding
+
+        self._file.write(_PREFIX.pack(MAGIC, VERSION, len(header), len(self._names), _OPEN))
+        self._file.write(header)
+
+    @classmethod
+    def for_class(cls, path, landmark_class, metadata=None) -> "RecordingWriter":
+        """
+        Creates a writer for the landmarks of a `VirtualLandmark` subclass, using
+        its name registry and its connections (MediaPipe's and the custom ones).
+
+        Args:
+            path (Union[str, Path]): Path of the file to create.
+            landmark_class (type): The `VirtualLandmark` subclass.
+            metadata (dict, optional): Information stored in the header.
+
+        Returns:
+            RecordingWriter: The writer.
+        """
+        from .drawing_utils.connections import POSE_CONNECTIONS
+
+        registry = landmark_class._registry
+        names = [registry[idx] for idx in range(len(registry))]
+        custom = [
+            (registry[a], registry[b])
+            for a, b in sorted(landmark_class._landmark_plan.connections)
+        ]
+
+        return cls(path, names, list(POSE_CONNECTIONS) + custom, metadata)
+
+    def __len__(self):
+        return self._count
+
+    def append(self, frame, timestamp: float = None):
+        """
+        Appends one frame.
+
+        Args:
+            frame (Union[np.ndarray, AbstractLandmark]): A `(N, 4)` array, or a
+                landmark instance (its `as_array()` is written).
+            timestamp (float, optional): Time of the frame in seconds. Defaults
+                to the frame index.
+
+        Raises:
+            ValueError: If the frame does not have `(N, 4)` shape.
+        """
+        if hasattr(frame, "as_array"):
+            frame = frame.as_array()
+        self.extend(
+            np.asarray(frame)[np.newaxis],
+            None if timestamp is None else [timestamp],
+        )
+
+    def extend(self, frames, timestamps=None):
+        """
+        Appends several frames at once.
+
+        Args:
+            frames (np.ndarray): A `(T, N, 4)` array.
+            timestamps (Sequence[float], optional): Times of the frames in
+                seconds. Defaults to the frame indices.
+
+        Raises:
+            ValueError: If the shapes do not match the recording.
+        """
+        frames = np.asarray(frames)
+        if frames.ndim != 3 or frames.shape[1:] != (len(self._names), 4):
+            raise ValueError(
+                f"frames must have shape (T, {len(self._names)}, 4), got {frames.shape}"
+            )
+
+        if timestamps is None:
+            timestamps = range(len(self), len(self) + len(frames))
+        timestamps = [float(t) for t in timestamps]
+        if len(timestamps) != len(frames):
+            raise ValueError("timestamps must have one value per frame")
+
+        records = np.empty(len(frames), dtype=self._record)
+        records["timestamp"] = timestamps
+        records["landmarks"] = frames
+        self._file.write(records.tobytes())
+        self._count += len(frames)
+
+    def close(self):
+        """
+        Writes the frame count and closes the file.
+        """
+        if self._file.closed:
+            return
+
+        self._file.seek(_PREFIX.size - 8)
+        self._file.write(struct.pack("<Q", self._count))
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordingReader:
+    """
+    Reads a recording file through memory maps.
+
+    Attributes:
+        names (List[str]): Landmark names, in index order.
+        connections (List[Tuple[int, int]]): Index pairs of connected landmarks.
+        metadata (dict): Information stored by the writer.
+        landmarks (np.ndarray): Read-only `(T, N, 4)` float32 landmarks,
+            memory-mapped.
+        timestamps (np.ndarray): `(T,)` timestamps in seconds, memory-mapped.
+        complete (bool): Whether the writer was closed properly.
+
+    Args:
+        path (Union[str, Path]): Path of the recording.
+
+    Raises:
+        ValueError: If the file is not a recording, or has an unsupported version.
+    """
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            prefix = f.read(_PREFIX.size)
+            if len(prefix) < _PREFIX.size:
+                raise ValueError(f"{path} is not a landmark recording")
+
+            magic, version, header_size, n_landmarks, n_frames = _PREFIX.unpack(prefix)
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a landmark recording")
+            if version != VERSION:
+                raise ValueError(f"Unsupported recording version {version}")
+
+            header = json.loads(f.read(header_size).decode("utf-8"))
+            f.seek(0, 2)
+            size = f.tell()
+
+        self.names = header["names"]
+        self.connections = [tuple(pair) for pair in header["connections"]]
+        self.metadata = header["metadata"]
+
+        offset = _PREFIX.size + header_size
+        record = _record_dtype(n_landmarks)
+        self.complete = n_frames != _OPEN
+        if not self.complete:
+            n_frames = (size - offset) // record.itemsize
+
+        if n_frames:
+            records = np.memmap(path, dtype=record, mode="r", offset=offset, shape=(n_frames,))
+        else:
+            records = np.empty(0, dtype=record)
+
+        self.landmarks = records["landmarks"]
+        self.timestamps = records["timestamp"]
+
+    def __len__(self):
+        return len(self.landmarks)
+
+    def __getitem__(self, idx):
+        """
+        Returns frames by index or slice, without copying them into memory.
+        """
+        return self.landmarks[idx]
+
+    def time_slice(self, start: float = None, end: float = None):
+        """
+        Returns the frames whose timestamps are in `[start, end)`.
+
+        Timestamps are expected to be in increasing order.
+
+        Args:
+            start (float, optional): First time, in seconds. Defaults to the beginning.
+            end (float, optional): End time (excluded), in seconds. Defaults to the end.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: The `(T', N, 4)` landmarks (a memory-mapped
+                view) and their `(T',)` timestamps.
+        """
+        first = 0 if start is None else int(np.searchsorted(self.timestamps, start, "left"))
+        last = len(self) if end is None else int(np.searchsorted(self.timestamps, end, "left"))
+        return self.landmarks[first:last], self.timestamps[first:last]
+
+    def index(self, name: str) -> int:
+        """
+        Returns the index of a landmark by name.
+
+        Raises:
+            KeyError: If the name is unknown.
+        """
+        try:
+            return self.names.index(name)
+        except ValueError:
+            raise KeyError(name) from None
+
+    def __repr__(self):
+        return (
+            f"<RecordingReader frames={len(self)} landmarks={len(self.names)} "
+            f"complete={self.complete}>"
+        )
@@ -0,0 +1,263 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Array-native variants of the `calculus` primitives.
+
+Every function takes points as arrays of shape `(..., 3)` (or `(..., 4)`, in
+which case the trailing visibility column is ignored) and broadcasts over the
+leading dimensions, so a single call can process many landmarks, people or
+frames at once. Results are returned as `(..., 3)` arrays. Scalar parameters
+such as weights, factors or angles may also be arrays broadcastable to the
+leading dimensions.
+"""
+
+import numpy as np
+
+
+def _xyz(p) -> np.ndarray:
+    """
+    Returns the (x, y, z) columns of a point array as floating point values.
+    """
+    p = np.asarray(p)
+    if not np.issubdtype(p.dtype, np.floating):
+        p = p.astype(float)
+    return p[..., :3]
+
+
+def _scalar(value) -> np.ndarray:
+    """
+    Adds a trailing axis to a scalar parameter so it broadcasts over (x, y, z).
+    """
+    return np.asarray(value)[..., np.newaxis]
+
+
+def _dot(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    Row-wise dot product, keeping the trailing axis.
+    """
+    return np.sum(a * b, axis=-1, keepdims=True)
+
+
+def _unit(v: np.ndarray) -> np.ndarray:
+    """
+    Scales vectors to unit length, leaving zero-length vectors untouched.
+    """
+    norm = np.linalg.norm(v, axis=-1, keepdims=True)
+    return np.divide(v, norm, out=np.array(v, copy=True), where=norm != 0)
+
+
+def middle(p1, p2) -> np.ndarray:
+    """
+    Calculates the midpoints between two arrays of points.
+
+    Args:
+        p1 (np.ndarray): First points, shape `(..., 3)`.
+        p2 (np.ndarray): Second points, shape `(..., 3)`.
+
+    Returns:
+        np.ndarray: Midpoints, shape `(..., 3)`.
+    """
+    return (_xyz(p1) + _xyz(p2)) / 2
+
+
+def projection(p1, p2, target) -> np.ndarray:
+    """
+    Projects points onto the lines defined by two other arrays of points.
+
+    Degenerate lines (`p1 == p2`) project onto `p1`.
+
+    Args:
+        p1 (np.ndarray): First points on the lines, shape `(..., 3)`.
+        p2 (np.ndarray): Second points on the lines, shape `(..., 3)`.
+        target (np.ndarray): Points to be projected, shape `(..., 3)`.
+
+    Returns:
+        np.ndarray: Projected points, shape `(..., 3)`.
+    """
+    a = _xyz(p1)
+    ab = _xyz(p2) - a
+    ap = _xyz(target) - a
+    denom = _dot(ab, ab)
+    t = np.divide(_dot(ap, ab), denom, out=np.zeros_like(denom), where=denom != 0)
+    return a + t * ab
+
+
+def centroid(*points) -> np.ndarray:
+    """
+    Calculates the centroids of several arrays of points.
+
+    Args:
+        *points (np.ndarray): Any number of point arrays, shape `(..., 3)`.
+
+    Returns:
+        np.ndarray: Centroids, shape `(..., 3)`.
+    """
+    return np.mean(np.stack(np.broadcast_arrays(*[_xyz(p) for p in points])), axis=0)
+
+
+def mirror(p, axis_point) -> np.ndarray:
+    """
+    Reflects points across the vertical axes defined by other points.
+
+    Args:
+        p (np.ndarray): Points to reflect, shape `(..., 3)`.
+        axis_point (np.ndarray): Reference axes for the X reflection, shape `(..., 3)`.
+
+    Returns:
+        np.ndarray: Reflected points, shape `(..., 3)`.
+    """
+    point, axis = np.broadcast_arrays(_xyz(p), _xyz(axis_point))
+    out = point.astype(np.result_type(point, axis))
+    out[..., 0] = axis[..., 0] + (axis[..., 0] - point[..., 0])
+    return out
+
+
+def weighted_average(p1, p2, w1=0.5, w2=0.5) -> np.ndarray:
+    """
+    Computes weighted averages between two arrays of points.
+
+    Args:
+        p1 (np.ndarray): First points, shape `(..., 3)`.
+        p2 (np.ndarray): Second points, shape `(..., 3)`.
+        w1 (Union[float, np.ndarray]): Weights for p1.
+        w2 (Union[float, np.ndarray]): Weights for p2.
+
+    Returns:
+        np.ndarray: Weighted averages, shape `(..., 3)`.
+    """
+    w1, w2 = _scalar(w1), _scalar(w2)
+    total = w1 + w2
+    return _xyz(p1) * (w1 / total) + _xyz(p2) * (w2 / total)
+
+
+def extend(p1, p2, factor=1.0) -> np.ndarray:
+    """
+    Extends the vectors from p1 to p2 beyond p2 by a given factor.
+
+    Args:
+        p1 (np.ndarray): Start points, shape `(..., 3)`.
+        p2 (np.ndarray): End points, shape `(..., 3)`.
+        factor (Union[float, np.ndarray]): How much to extend beyond p2.
+
+    Returns:
+        np.ndarray: Extended points, shape `(..., 3)`.
+    """
+    b = _xyz(p2)
+    return b + (b - _xyz(p1)) * _scalar(factor)
+
+
+def normalize(p1, p2) -> np.ndarray:
+    """
+    Returns the unit direction vectors from p1 to p2.
+
+    Zero-length vectors are returned unchanged.
+
+    Args:
+        p1 (np.ndarray): Start points, shape `(..., 3)`.
+        p2 (np.ndarray): End points, shape `(..., 3)`.
+
+    Returns:
+        np.ndarray: Unit vectors, shape `(..., 3)`.
+    """
+    return _unit(_xyz(p2) - _xyz(p1))
+
+
+def interpolate(p1, p2, alpha=0.5) -> np.ndarray:
+    """
+    Interpolates between two arrays of points.
+
+    Args:
+        p1 (np.ndarray): Start points, shape `(..., 3)`.
+        p2 (np.ndarray): End points, shape `(..., 3)`.
+        alpha (Union[float, np.ndarray]): Interpolation factors (0.0 = p1, 1.0 = p2).
+
+    Returns:
+        np.ndarray: Interpolated points, shape `(..., 3)`.
+    """
+    alpha = _scalar(alpha)
+    return (1 - alpha) * _xyz(p1) + alpha * _xyz(p2)
+
+
+def bisector(p1, pivot, p2) -> np.ndarray:
+    """
+    Calculates the unit angle bisector vectors at pivot joints.
+
+    Args:
+        p1 (np.ndarray): First points forming the angles, shape `(..., 3)`.
+        pivot (np.ndarray): Centers of the angles, shape `(..., 3)`.
+        p2 (np.ndarray): Second points forming the angles, shape `(..., 3)`.
+
+    Returns:
+        np.ndarray: Unit bisector vectors, shape `(..., 3)`.
+    """
+    return _unit(normalize(pivot, p1) + normalize(pivot, p2))
+
+
+def rotate(p, axis_p1, axis_p2, angle) -> np.ndarray:
+    """
+    Rotates points around the 3D axes defined by two other arrays of points.
+
+    Uses Rodrigues’ rotation formula.
+
+    Args:
+        p (np.ndarray): Points to rotate, shape `(..., 3)`.
+        axis_p1 (np.ndarray): Axis starts, shape `(..., 3)`.
+        axis_p2 (np.ndarray): Axis ends, shape `(..., 3)`.
+        angle (Union[float, np.ndarray]): Rotation angles in radians.
+
+    Returns:
+        np.ndarray: Rotated points, shape `(..., 3)`.
+    """
+    a = _xyz(axis_p1)
+    k = _unit(_xyz(axis_p2) - a)
+    v = _xyz(p) - a
+    angle = _scalar(angle)
+    cos_theta = np.cos(angle)
+    v_rot = (v * cos_theta +
+             np.cross(k, v) * np.sin(angle) +
+             k * _dot(k, v) * (1 - cos_theta))
+    return v_rot + a
+
+
+def angle(p1, pivot, p2, dims=3) -> np.ndarray:
+    """
+    Calculates the angles formed at pivot joints, in radians.
+
+    Angles are unsigned, between 0 and pi. With `dims=2` only the (x, y)
+    coordinates are used, i.e. the angles are measured in the image plane.
+    Degenerate angles (a point equal to its pivot) are 0.
+
+    Args:
+        p1 (np.ndarray): First points forming the angles, shape `(..., 3)`.
+        pivot (np.ndarray): Vertices of the angles, shape `(..., 3)`.
+        p2 (np.ndarray): Second points forming the angles, shape `(..., 3)`.
+        dims (Union[int, np.ndarray]): 2 or 3, or an array of them broadcastable
+            to the leading dimensions.
+
+    Returns:
+        np.ndarray: Angles in radians, shape `(...)`.
+    """
+    center = _xyz(pivot)
+    v1 = _xyz(p1) - center
+    v2 = _xyz(p2) - center
+
+    planar = np.asarray(dims) == 2
+    if planar.any():
+        keep = np.ones(planar.shape + (3,))
+        keep[..., 2] = np.where(planar, 0.0, 1.0)
+        v1, v2 = v1 * keep, v2 * keep
+
+    cross = np.linalg.norm(np.cross(v1, v2), axis=-1)
+    return np.arctan2(cross, np.sum(v1 * v2, axis=-1))
@@ -12,7 +12,18 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import numpy as np
+
 from .abstract_landmark import AbstractLandmark
+from .expression import ExpressionProgram
+from .plan import AnglePlan, LandmarkPlan, VisibilityPlan
+from .virtual_pose_landmark import BUILTIN_LANDMARKS, VirtualPoseLandmark
+
+# Value of a lazy virtual landmark until it is computed
+_PLACEHOLDER = (0.0, 0.0, 0.0)
+
+# Value of a virtual landmark skipped because its inputs are not visible
+_MISSING = (np.nan, np.nan, np.nan)
 
 
 class VirtualLandmark(AbstractLandmark):
@@ -24,27 +35,402 @@ class VirtualLandmark(AbstractLandmark):
     It extends AbstractLandmark and supports:
     - Dynamic landmark creation
     - Automatic connection registration
+
+    The decorated methods are discovered once per subclass, when the class is
+    created, and stored in an immutable `LandmarkPlan` shared by all instances.
+    Landmarks declared with `landmark(name, expr=...)` are compiled at the same
+    time into one `ExpressionProgram` per evaluation level, which computes all
+    of them with a few array operations.
+    The name/index registry (`virtual_landmark`) is built at the same time and
+    frozen, as indices only depend on the class: virtual landmarks follow the
+    33 MediaPipe pose landmarks, so instances require exactly 33 of them.
+
+    With `lazy=True`, virtual landmarks are not computed when the instance is
+    created (or updated): each one is computed the first time it is read
+    through `self[...]`, e.g. `self[self.virtual_landmark.NECK]`, and kept for
+    the rest of the frame. Its dependencies are resolved on demand, since the
+    method itself reads them through `self[...]`. Exporting the landmarks
+    (`as_array()`, `as_landmark_list()`, iteration) computes the remaining ones.
+
+    The visibility of each virtual landmark is derived from the visibility of
+    its inputs, following the rule given to `@landmark` (the minimum by
+    default). When `visibility_threshold` is set (on the class or on an
+    instance), landmarks whose visibility is below it are not computed: their
+    coordinates are set to NaN, so downstream code can tell them apart. With
+    stacked landmark sets the method only runs if some set is visible enough.
+
+    Passing `world_landmarks` (with `"numpy"` storage) computes the virtual
+    landmarks in normalized and metric coordinates in the same pass: methods
+    receive `(2, 4)` rows from `self[...]`, normalized first, and methods built
+    on `calculus` work unchanged.
+
+    Example:
+        >>> pose = HelloWorld(
+        ...     results.pose_landmarks.landmark,
+        ...     storage="numpy",
+        ...     world_landmarks=results.pose_world_landmarks.landmark,
+        ... )
+        >>> pose.as_world_array()[pose.virtual_landmark.NECK]  # meters
+
+    Raises:
+        ValueError: If the landmarks are not the 33 MediaPipe pose landmarks.
     """
 
-    def __init__(self, landmarks):
-        super().__init__(landmarks)
+    _landmark_plan = LandmarkPlan(())
+    _registry = VirtualPoseLandmark().freeze()
+    _angle_plan = AnglePlan((), _registry)
+    _inherited_angles = 0
+    _visibility_plan = VisibilityPlan(_landmark_plan, _registry)
+    _expression_programs = ()
+    _profiler = None  # see profiling.LandmarkProfiler
+
+    visibility_threshold = None
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._landmark_plan = LandmarkPlan.compile(cls)
+
+        registry = VirtualPoseLandmark()
+        for idx, name in enumerate(cls._landmark_plan.names, start=len(BUILTIN_LANDMARKS)):
+            registry.add(name, idx)
+        cls._registry = registry.freeze()
+        cls._visibility_plan = VisibilityPlan(cls._landmark_plan, registry)
+
+        # Landmarks declared with expressions are computed by one program per level
+        expressions = {s.name: s.expr for s in cls._landmark_plan if s.expr is not None}
+        programs = []
+        for depth, level in enumerate(cls._landmark_plan.levels):
+            names = [s.name for s in level if s.expr is not None]
+            programs.append(
+                ExpressionProgram(names, expressions, registry, f"expressions:{depth}")
+                if names
+                else None
+            )
+        cls._expression_programs = tuple(programs)
+
+        # Inherited angles are resolved again, as virtual indices may differ
+        cls._angle_plan = AnglePlan(cls._angle_plan.specs, registry)
+        cls._inherited_angles = len(cls._angle_plan)
+
+    @classmethod
+    def _declare_angle(cls, spec):
+        """
+        Adds an angle declared with `@angle` to the class. Class decorators run
+        bottom-up, so each one is inserted before the angles declared below it.
+        """
+        if cls is VirtualLandmark:
+            raise TypeError("@angle can only decorate VirtualLandmark subclasses")
+
+        specs = list(cls._angle_plan.specs)
+        specs.insert(cls._inherited_angles, spec)
+        cls._angle_plan = AnglePlan(specs, cls._registry)
+
+    def __init__(self, landmarks, storage: str = "protobuf", lazy: bool = False, world_landmarks=None):
+        self._lazy = lazy
+        self._pending = {}
+
+        super().__init__(
+            landmarks,
+            storage=storage,
+            reserve=len(self._landmark_plan),
+            world_landmarks=world_landmarks,
+        )
+
+        if self._base_size != len(BUILTIN_LANDMARKS):
+            raise ValueError(
+                f"expected {len(BUILTIN_LANDMARKS)} landmarks, got {self._base_size}"
+            )
+
         self._process_virtual_landmarks()
 
+    def _create_registry(self) -> VirtualPoseLandmark:
+        """
+        Returns the frozen registry shared by all instances of the class.
+        """
+        return self._registry
+
     def _process_virtual_landmarks(self):
         """
-        Scans the class for methods decorated with @landmark, executes them to
-        get the 3D points, and registers them using _add_landmark and _add_connection.
+        Executes the class's compiled plan to get the 3D points, and registers
+        them using _add_landmark. Connections are taken from the plan as well.
+
+        In lazy mode the slots are registered with a placeholder point and
+        left pending instead.
+        """
+        plan = self._landmark_plan
+
+        if self._lazy:
+            for spec in plan:
+                self._add_landmark(spec.name, _PLACEHOLDER)
+            self._slots = dict(enumerate(plan, start=self._base_size))
+            self._pending = dict(self._slots)
+        else:
+            self._evaluate_plan(add=True)
+
+        self._connections.update(plan.connections)
+
+    def _evaluate_plan(self, add: bool):
+        """
+        Computes every virtual landmark, level by level. The visibilities of a
+        level are computed together before its methods run, so the methods
+        whose inputs are not visible enough can be skipped.
+
+        Args:
+            add (bool): Whether the slots are created (first frame) or
+                overwritten (`update()`).
+        """
+        profiler = self._profiler
+        if profiler is not None:
+            with profiler.frame(self):
+                return self._evaluate_levels(add, profiler)
+        return self._evaluate_levels(add, None)
+
+    def _evaluate_levels(self, add, profiler):
+        plan = self._landmark_plan
+        programs = self._expression_programs
+        visibility_plan = self._visibility_plan
+        threshold = self.visibility_threshold
+        column = self._visibility_column(self._base_size + len(plan))
+
+        idx = self._base_size
+        for level, specs in enumerate(plan.levels):
+            values = visibility_plan.compute(level, column)
+            column[..., idx : idx + len(specs)] = values
+
+            if values.ndim == 1:
+                visibilities = values.tolist()
+            else:
+                visibilities = [values[..., k] for k in range(len(specs))]
+
+            skipped = partial = ()
+            if threshold is not None:
+                hidden = values < threshold
+                if hidden.ndim == 1:
+                    skipped = hidden.tolist()
+                else:
+                    axes = tuple(range(hidden.ndim - 1))
+                    skipped = hidden.all(axis=axes).tolist()
+                    partial = hidden.any(axis=axes).tolist()
+
+            program = programs[level]
+            if program is not None:
+                computed = program.evaluate(self) if profiler is None else profiler.call(program.spec, self)
+                fused = 0
+
+            for k, spec in enumerate(specs):
+                if spec.expr is not None:
+                    point = computed[..., fused, :]
+                    fused += 1
+
+                if skipped and skipped[k]:
+                    point = _MISSING
+                else:
+                    if spec.expr is None:
+                        point = spec.method(self) if profiler is None else profiler.call(spec, self)
+                    if partial and partial[k]:
+                        point = np.where(hidden[..., k, None], np.nan, np.asarray(point)[..., :3])
+
+                if add:
+                    self._add_landmark(spec.name, point, visibilities[k])
+                else:
+                    self._set_landmark(idx, point, visibilities[k])
+                idx += 1
+
+    def _resolve(self, idx: int):
+        """
+        Computes a pending virtual landmark. The slot is marked as done before
+        the method runs, so its own dependencies are resolved recursively.
+        """
+        spec = self._pending.pop(idx)
+        rule = self._visibility_plan.rules[idx - self._base_size]
+        try:
+            visibility = 1.0
+            if rule is not None:
+                for i in rule.positions:
+                    if i in self._pending:
+                        self._resolve(i)
+                visibility = rule.combine(self._visibility(rule.positions, rule.index))
+
+            threshold = self.visibility_threshold
+            hidden = None if threshold is None else np.less(visibility, threshold)
+            if hidden is not None and hidden.all():
+                point = _MISSING
+            else:
+                profiler = self._profiler
+                point = spec.method(self) if profiler is None else profiler.call(spec, self)
+                if hidden is not None and hidden.any():
+                    point = np.where(hidden[..., None], np.nan, np.asarray(point)[..., :3])
+
+            self._set_landmark(idx, point, visibility)
+        except BaseException:
+            self._pending[idx] = spec
+            raise
+
+    def evaluate(self):
+        """
+        Computes every virtual landmark that is still pending (lazy mode).
+
+        Returns:
+            VirtualLandmark: The instance itself.
+        """
+        while self._pending:
+            self._resolve(next(iter(self._pending)))
+        return self
+
+    def update(self, landmarks, world_landmarks=None):
+        """
+        Reuses the instance for a new frame.
+
+        The original landmarks are overwritten in place and the virtual landmarks
+        are recomputed into their existing slots, so a streaming loop can keep a
+        single instance instead of creating a new one per frame. Indices,
+        names and connections do not change. In lazy mode the virtual
+        landmarks are only marked as pending.
+
+        Args:
+            landmarks (List[NormalizedLandmark]): Landmarks of the new frame, as
+                many as the instance was created with (or an array with `"numpy"`
+                storage).
+            world_landmarks (List[Landmark], optional): World landmarks of the
+                new frame, required if the instance was created with them.
+
+        Returns:
+            VirtualLandmark: The instance itself.
+
+        Raises:
+            ValueError: If the number of landmarks differs, or world landmarks
+                are missing or unexpected.
+        """
+        self._reset_landmarks(landmarks, world_landmarks)
+
+        if self._lazy:
+            self._pending = dict(self._slots)
+            return self
+
+        self._evaluate_plan(add=False)
+        return self
+
+    @classmethod
+    def evaluate_clip(cls, landmarks) -> np.ndarray:
+        """
+        Computes the virtual landmarks of a whole clip in a single pass.
+
+        Instead of building one instance per frame, a single instance holds
+        the clip with `"numpy"` storage and each `@landmark` method runs once,
+        receiving `(T, 4)` arrays from `self[...]`. Methods built on
+        `calculus` work unchanged, as its functions broadcast over frames.
+
+        Args:
+            landmarks (np.ndarray): Raw MediaPipe landmarks of shape `(T, 33, 4)`
+                (or `(T, 33, 3)`, with visibility defaulting to 1.0).
+
+        Returns:
+            np.ndarray: A `(T, 33 + K, 4)` float32 array, where K is the number
+                of virtual landmarks of the class, in index order.
+
+        Raises:
+            ValueError: If `landmarks` is not a 3-dimensional array.
+        """
+        landmarks = np.asarray(landmarks)
+        if landmarks.ndim != 3:
+            raise ValueError("landmarks must have shape (T, N, 3) or (T, N, 4)")
+
+        return cls(landmarks, storage="numpy").as_array()
+
+    @classmethod
+    def compute_angles(cls, landmarks, degrees: bool = False) -> np.ndarray:
+        """
+        Computes all the angles declared with `@angle` from a landmark array.
+
+        Args:
+            landmarks (np.ndarray): A `(..., 33 + K, 4)` array with the virtual
+                landmarks of the class, e.g. the result of `evaluate_clip()`.
+            degrees (bool): Whether to return degrees instead of radians.
+
+        Returns:
+            np.ndarray: `(..., A)` angles, in the order of `angle_plan().names`.
+        """
+        result = cls._angle_plan.compute(landmarks)
+        return np.degrees(result) if degrees else result
+
+    def angles(self, degrees: bool = False, world: bool = False) -> np.ndarray:
+        """
+        Computes all the angles declared with `@angle` for this instance.
+
+        Args:
+            degrees (bool): Whether to return degrees instead of radians.
+            world (bool): Whether to use the world landmarks, whose metric
+                coordinates give the true 3D angles.
+
+        Returns:
+            np.ndarray: `(A,)` angles (or `(..., A)` for stacked landmark sets),
+                in the order of `angle_plan().names`.
+
+        Raises:
+            ValueError: If `world` is set and the instance has no world landmarks.
+        """
+        array = self.as_world_array() if world else self.as_array()
+        return self.compute_angles(array, degrees)
+
+    @classmethod
+    def angle_plan(cls) -> AnglePlan:
+        """
+        Returns the compiled joint angles of the class.
+
+        Returns:
+            AnglePlan: The angles declared with `@angle`, resolved to indices.
+        """
+        return cls._angle_plan
+
+    @classmethod
+    def landmark_plan(cls) -> LandmarkPlan:
+        """
+        Returns the compiled evaluation plan of the class.
+
+        Returns:
+            LandmarkPlan: The immutable plan shared by all instances.
         """
-        for attr_name in dir(self):
-            method = getattr(self, attr_name)
-            if callable(method) and getattr(method, "_is_custom_landmark", False):
-                name = method._landmark_name
-                connections = method._landmark_connections
+        return cls._landmark_plan
 
-                point = method()
-                self._add_landmark(name, point)
-                self._add_connection(name, connections)
-                
     @property
     def virtual_landmark(self):
-        return self._virtual_landmark
\ No newline at end of file
+        return self._virtual_landmark
+
+    @property
+    def lazy(self) -> bool:
+        """
+        Returns whether virtual landmarks are computed on first access.
+        """
+        return self._lazy
+
+    def __getitem__(self, idx):
+        if self._pending:
+            if isinstance(idx, int):
+                if idx < 0:
+                    idx += len(self)
+                if idx in self._pending:
+                    self._resolve(idx)
+            else:
+                self.evaluate()
+
+        return super().__getitem__(idx)
+
+    def __iter__(self):
+        self.evaluate()
+        return super().__iter__()
+
+    def as_array(self) -> np.ndarray:
+        self.evaluate()
+        return super().as_array()
+
+    def as_landmark_list(self):
+        self.evaluate()
+        return super().as_landmark_list()
+
+    def as_world_array(self) -> np.ndarray:
+        self.evaluate()
+        return super().as_world_array()
+
+    def as_world_landmark_list(self):
+        self.evaluate()
+        return super().as_world_landmark_list()
\ No newline at end of file
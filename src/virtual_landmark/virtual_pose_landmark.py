@@ -12,9 +12,56 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import mediapipe as mp
-
-PoseLandmark = mp.solutions.pose.PoseLandmark
+# Names of MediaPipe's built-in pose landmarks, in index order (the order of
+# `mp.solutions.pose.PoseLandmark`). They are part of the model's output
+# format, so they are listed here rather than imported with MediaPipe.
+_BUILTIN_NAMES = (
+    "NOSE",
+    "LEFT_EYE_INNER",
+    "LEFT_EYE",
+    "LEFT_EYE_OUTER",
+    "RIGHT_EYE_INNER",
+    "RIGHT_EYE",
+    "RIGHT_EYE_OUTER",
+    "LEFT_EAR",
+    "RIGHT_EAR",
+    "MOUTH_LEFT",
+    "MOUTH_RIGHT",
+    "LEFT_SHOULDER",
+    "RIGHT_SHOULDER",
+    "LEFT_ELBOW",
+    "RIGHT_ELBOW",
+    "LEFT_WRIST",
+    "RIGHT_WRIST",
+    "LEFT_PINKY",
+    "RIGHT_PINKY",
+    "LEFT_INDEX",
+    "RIGHT_INDEX",
+    "LEFT_THUMB",
+    "RIGHT_THUMB",
+    "LEFT_HIP",
+    "RIGHT_HIP",
+    "LEFT_KNEE",
+    "RIGHT_KNEE",
+    "LEFT_ANKLE",
+    "RIGHT_ANKLE",
+    "LEFT_HEEL",
+    "RIGHT_HEEL",
+    "LEFT_FOOT_INDEX",
+    "RIGHT_FOOT_INDEX",
+)
+
+# (name, index) pairs of MediaPipe's built-in pose landmarks
+BUILTIN_LANDMARKS = tuple((name, index) for index, name in enumerate(_BUILTIN_NAMES))
+
+
+def __getattr__(name):
+    # `PoseLandmark` used to be re-exported from here; importing it loads MediaPipe
+    if name == "PoseLandmark":
+        import mediapipe as mp
+
+        return mp.solutions.pose.PoseLandmark
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class VirtualPoseLandmark(dict):
@@ -30,6 +77,8 @@ class VirtualPoseLandmark(dict):
     - Attribute access: `vpl.NECK` → 33
     - Index-to-name access: `vpl[33]` → "NECK"
     - Dynamic insertion of custom landmark names and indices.
+    - Optional freezing, so a single mapping can be safely shared (e.g. by all
+      instances of a `VirtualLandmark` subclass).
 
     Example:
         >>> vpl = VirtualPoseLandmark()
@@ -44,23 +93,22 @@ class VirtualPoseLandmark(dict):
 
     def __init__(self):
         super().__init__()
+        self._frozen = False
         self._reverse = {}  # Maps index → name
         self._load_builtin_landmarks()
 
         # Provide attribute-style access for all landmarks
-        for name in self:
-            setattr(self, name, self[name])
+        self.__dict__.update(self)
 
     def _load_builtin_landmarks(self):
         """
         Loads all MediaPipe built-in pose landmarks into the internal map.
 
-        These landmarks are taken from `mp.solutions.pose.PoseLandmark` and include
+        These landmarks are the ones of `mp.solutions.pose.PoseLandmark` and include
         standard names like "NOSE", "LEFT_EAR", "RIGHT_SHOULDER", etc.
         """
-        for landmark in PoseLandmark:
-            self[landmark.name] = landmark.value
-            self._reverse[landmark.value] = landmark.name
+        dict.update(self, BUILTIN_LANDMARKS)
+        self._reverse.update((index, name) for name, index in BUILTIN_LANDMARKS)
 
     def add(self, name: str, index: int):
         """
@@ -75,6 +123,7 @@ class VirtualPoseLandmark(dict):
 
         Raises:
             ValueError: If name or index already exists, or name is invalid.
+            TypeError: If the mapping is frozen.
         """
         if not isinstance(name, str) or not name.isidentifier():
             raise ValueError("Custom landmark name must be a valid identifier string.")
@@ -89,6 +138,61 @@ class VirtualPoseLandmark(dict):
         self._reverse[index] = name
         setattr(self, name, index)
 
+    def freeze(self):
+        """
+        Makes the mapping read-only.
+
+        Any later attempt to add, change or remove landmarks raises a `TypeError`.
+
+        Returns:
+            VirtualPoseLandmark: The mapping itself.
+        """
+        self._frozen = True
+        return self
+
+    @property
+    def frozen(self) -> bool:
+        """
+        Returns whether the mapping is read-only.
+        """
+        return self._frozen
+
+    def _check_mutable(self):
+        if self.__dict__.get("_frozen", False):
+            raise TypeError(f"'{type(self).__name__}' is frozen and cannot be modified")
+
+    def __setitem__(self, key, value):
+        self._check_mutable()
+        super().__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self._check_mutable()
+        super().__delitem__(key)
+
+    def __setattr__(self, name, value):
+        self._check_mutable()
+        super().__setattr__(name, value)
+
+    def clear(self):
+        self._check_mutable()
+        super().clear()
+
+    def pop(self, *args):
+        self._check_mutable()
+        return super().pop(*args)
+
+    def popitem(self):
+        self._check_mutable()
+        return super().popitem()
+
+    def setdefault(self, *args):
+        self._check_mutable()
+        return super().setdefault(*args)
+
+    def update(self, *args, **kwargs):
+        self._check_mutable()
+        super().update(*args, **kwargs)
+
     def __getattr__(self, name):
         """
         Enables attribute-style access (e.g., vpl.LEFT_HIP).
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import pytest
+import numpy as np
 from mediapipe.framework.formats.landmark_pb2 import NormalizedLandmark
 from virtual_landmark.abstract_landmark import AbstractLandmark
 
@@ -75,4 +76,69 @@ def test_repr(sample_landmarks):
     obj.add_virtual("NECK", (0.1, 0.1, 0.1))
     rep = repr(obj)
     assert "landmarks=4" in rep
-    assert "custom=1" in rep
\ No newline at end of file
+    assert "custom=1" in rep
+
+
+def test_numpy_storage_initialization(sample_landmarks):
+    obj = DummyLandmark(sample_landmarks, storage="numpy")
+    assert obj.storage == "numpy"
+    assert len(obj) == 3
+    assert obj.as_array().shape == (3, 4)
+    assert obj.as_array().dtype == np.float32
+    assert obj[2][0] == 2
+
+
+def test_numpy_storage_accepts_arrays():
+    obj = DummyLandmark(np.zeros((5, 3)), storage="numpy")
+    assert len(obj) == 5
+    assert np.all(obj.as_array()[:, 3] == 1.0)
+
+    with pytest.raises(ValueError, match="shape"):
+        DummyLandmark(np.zeros((5, 2)), storage="numpy")
+
+
+def test_numpy_storage_add_landmark_grows(sample_landmarks):
+    obj = DummyLandmark(sample_landmarks, storage="numpy", reserve=1)
+    assert obj.add_virtual("NECK", (0.5, 0.5, 0.5)) == 3
+    assert obj.add_virtual("HEAD", np.array([0.1, 0.2, 0.3])) == 4
+    assert len(obj) == 5
+    assert np.allclose(obj[4], (0.1, 0.2, 0.3, 1.0))
+    assert [row[0] for row in obj] == pytest.approx([0, 1, 2, 0.5, 0.1])
+
+
+def test_numpy_storage_materializes_landmark_list_lazily(sample_landmarks):
+    obj = DummyLandmark(sample_landmarks, storage="numpy")
+    assert obj._landmark_list is None
+
+    landmark_list = obj.as_landmark_list()
+    assert len(landmark_list.landmark) == 3
+    assert isinstance(landmark_list.landmark[0], NormalizedLandmark)
+
+    obj.add_virtual("NECK", (0.5, 0.25, 0.5))
+    assert obj.as_landmark_list() is landmark_list
+    assert len(landmark_list.landmark) == 4
+    assert landmark_list.landmark[3].y == 0.25
+
+
+def test_protobuf_storage_as_array(sample_landmarks):
+    obj = DummyLandmark(sample_landmarks)
+    assert np.allclose(obj.as_array()[:, 0], [0, 1, 2])
+
+
+def test_invalid_storage(sample_landmarks):
+    with pytest.raises(ValueError, match="storage must be one of"):
+        DummyLandmark(sample_landmarks, storage="arrow")
+
+
+def test_numpy_storage_stacked_sets():
+    obj = DummyLandmark(np.zeros((2, 3, 4)), storage="numpy")
+    assert len(obj) == 3
+    assert obj[1].shape == (2, 4)
+
+    obj.add_virtual("NECK", np.array([[1.0, 1.0, 1.0], [2.0, 2.0, 2.0]]))
+    assert obj.as_array().shape == (2, 4, 4)
+    assert np.allclose(obj[-1][:, 0], [1.0, 2.0])
+    assert len(list(obj)) == 4
+
+    with pytest.raises(ValueError, match="single landmark set"):
+        obj.as_landmark_list()
@@ -0,0 +1,248 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import random
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from virtual_landmark import VirtualLandmark, landmark
+from virtual_landmark import calculus as calc
+from virtual_landmark.aio import AsyncPoseSession, LandmarkExecutor
+
+
+class Neck(VirtualLandmark):
+    @landmark("NECK")
+    def neck(self):
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.LEFT_SHOULDER], self[vl.RIGHT_SHOULDER])
+
+
+def frame(value):
+    return np.full((33, 4), value, dtype=np.float32)
+
+
+class FakeDetector:
+    """
+    Returns the frame as landmarks, after a random delay, and records how many
+    frames it detects at once.
+    """
+
+    instances = []
+
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+        self.closed = False
+        self._lock = threading.Lock()
+        FakeDetector.instances.append(self)
+
+    def __call__(self, image):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(random.random() * 0.002)
+        with self._lock:
+            self.active -= 1
+        return None if image is None else image
+
+    def close(self):
+        self.closed = True
+
+
+def test_stream_yields_frames_in_order():
+    async def main():
+        async with LandmarkExecutor(max_workers=4) as executor:
+            async with AsyncPoseSession(Neck, executor, detector=FakeDetector) as session:
+                return [
+                    pose if pose is None else float(pose[pose.virtual_landmark.NECK][0])
+                    for pose in [p async for p in session.stream((frame(i) for i in range(40)), prefetch=4)]
+                ]
+
+    FakeDetector.instances = []
+    assert asyncio.run(main()) == pytest.approx([float(i) for i in range(40)])
+
+    (detector,) = FakeDetector.instances
+    assert detector.max_active == 1
+    assert detector.closed
+
+
+def test_frames_without_a_pose_give_none():
+    async def main():
+        async with AsyncPoseSession(Neck, detector=FakeDetector) as session:
+            async def frames():
+                for value in (1.0, None, 2.0):
+                    yield None if value is None else frame(value)
+
+            return [p async for p in session.stream(frames())]
+
+    results = asyncio.run(main())
+    assert results[1] is None
+    assert [isinstance(r, Neck) for r in results] == [True, False, True]
+
+
+def test_closing_a_stream_waits_for_its_pending_frames():
+    async def main():
+        async with AsyncPoseSession(Neck, detector=FakeDetector) as session:
+            results = session.stream((frame(i) for i in range(10)), prefetch=4)
+            async for _ in results:
+                break
+            await results.aclose()
+            return asyncio.all_tasks() - {asyncio.current_task()}
+
+    assert asyncio.run(main()) == set()
+
+
+def test_sessions_run_concurrently():
+    barrier = threading.Barrier(2, timeout=5)
+
+    def detector():
+        def detect(image):
+            barrier.wait()  # only passes if both sessions detect at once
+            return image
+        return detect
+
+    async def main():
+        with LandmarkExecutor(max_workers=2) as executor:
+            sessions = [AsyncPoseSession(Neck, executor, detector=detector) for _ in range(2)]
+            return await asyncio.gather(*(s.process_frame(frame(i)) for i, s in enumerate(sessions)))
+
+    first, second = asyncio.run(main())
+    assert first[first.virtual_landmark.NECK][0] == 0.0
+    assert second[second.virtual_landmark.NECK][0] == 1.0
+
+
+def test_cancelled_frames_hold_the_detector_until_it_returns():
+    events = []
+    started = threading.Event()
+
+    class SlowDetector:
+        def __call__(self, image):
+            events.append("start")
+            started.set()
+            time.sleep(0.05)
+            events.append("end")
+            return image
+
+        def close(self):
+            events.append("close")
+
+    async def cancel_during_detection(session, value):
+        started.clear()
+        task = asyncio.ensure_future(session.process_frame(frame(value)))
+        while not started.is_set():
+            await asyncio.sleep(0.001)
+        task.cancel()
+        return task
+
+    async def main():
+        async with LandmarkExecutor(max_workers=4) as executor:
+            session = AsyncPoseSession(Neck, executor, detector=SlowDetector)
+            first = await cancel_during_detection(session, 0.0)
+            pose = await session.process_frame(frame(1.0))
+            last = await cancel_during_detection(session, 2.0)
+            await session.aclose()
+
+            for task in (first, last):
+                with pytest.raises(asyncio.CancelledError):
+                    await task
+            return pose
+
+    pose = asyncio.run(main())
+    assert pose[pose.virtual_landmark.NECK][0] == 1.0
+    assert events == ["start", "end"] * 3 + ["close"]
+
+
+def test_executor_bounds_pending_calls_and_keeps_the_loop_responsive():
+    lock = threading.Lock()
+    counts = {"active": 0, "max": 0}
+
+    def work(value):
+        with lock:
+            counts["active"] += 1
+            counts["max"] = max(counts["max"], counts["active"])
+        time.sleep(0.01)
+        with lock:
+            counts["active"] -= 1
+        return value
+
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.001)
+
+        task = asyncio.ensure_future(ticker())
+        async with LandmarkExecutor(max_workers=4, max_pending=2) as executor:
+            results = await asyncio.gather(*(executor.run(work, i) for i in range(10)))
+        task.cancel()
+        return results, ticks
+
+    results, ticks = asyncio.run(main())
+    assert results == list(range(10))
+    assert counts["max"] == 2
+    assert ticks > 5
+
+
+def test_session_without_detector_only_evaluates(fake_landmarks):
+    async def main():
+        async with AsyncPoseSession(Neck, detector=None, storage="protobuf") as session:
+            return await session.process_frame(fake_landmarks)
+
+    pose = asyncio.run(main())
+    assert pose[pose.virtual_landmark.NECK].x == pytest.approx(1.15)
+
+
+def test_errors_reach_the_caller():
+    def detector():
+        def detect(image):
+            raise RuntimeError("camera unplugged")
+        return detect
+
+    async def main():
+        async with AsyncPoseSession(Neck, detector=detector) as session:
+            await session.process_frame(frame(0.0))
+
+    with pytest.raises(RuntimeError, match="camera unplugged"):
+        asyncio.run(main())
+
+
+def test_closed_sessions_and_executors_reject_frames():
+    async def main():
+        session = AsyncPoseSession(Neck, detector=None)
+        await session.aclose()
+        with pytest.raises(RuntimeError, match="session is closed"):
+            await session.process_frame(frame(0.0))
+
+        executor = LandmarkExecutor(max_workers=1)
+        executor.close()
+        with pytest.raises(RuntimeError, match="executor is closed"):
+            await executor.run(print)
+
+    asyncio.run(main())
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError, match="max_workers"):
+        LandmarkExecutor(max_workers=0)
+    with pytest.raises(ValueError, match="max_pending"):
+        LandmarkExecutor(max_workers=1, max_pending=0)
+    with pytest.raises(TypeError, match="VirtualLandmark subclass"):
+        AsyncPoseSession(dict)
@@ -0,0 +1,129 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import cv2
+import numpy as np
+import pytest
+
+from virtual_landmark import VirtualLandmark, landmark, calculus as calc
+from virtual_landmark.batch import (
+    find_videos, load_class, main, output_path, process_video, read_landmarks,
+)
+
+
+class Skeleton(VirtualLandmark):
+    @landmark("MIDDLE_HIP")
+    def middle_hip(self):
+        return calc.middle(
+            self[self.virtual_landmark.LEFT_HIP],
+            self[self.virtual_landmark.RIGHT_HIP],
+        )
+
+
+@pytest.fixture
+def video(tmp_path):
+    path = tmp_path / "videos" / "clip.avi"
+    path.parent.mkdir()
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 32))
+    for i in range(6):
+        writer.write(np.full((32, 32, 3), i * 40, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def fake_detect(frame):
+    if frame.mean() < 20:
+        return None
+    return np.full((33, 4), frame.mean() / 255, dtype=np.float32)
+
+
+def test_load_class():
+    assert load_class("virtual_landmark:VirtualLandmark") is VirtualLandmark
+
+    with pytest.raises(ValueError, match="module:ClassName"):
+        load_class("virtual_landmark")
+    with pytest.raises(ValueError, match="has no class"):
+        load_class("virtual_landmark:Missing")
+
+
+def test_find_videos_and_output_path(tmp_path, video):
+    (video.parent / "notes.txt").write_text("")
+    nested = video.parent / "day1" / "b.MP4"
+    nested.parent.mkdir()
+    nested.write_bytes(b"")
+
+    root = video.parent
+    assert find_videos(root) == [video, nested]
+    assert find_videos(root, ["*.avi"]) == [video]
+    assert output_path(nested, root, tmp_path / "out") == tmp_path / "out" / "day1" / "b.npz"
+
+
+def test_read_landmarks(video):
+    landmarks, timestamps = read_landmarks(video, fake_detect)
+
+    assert landmarks.shape == (6, 33, 4)
+    assert np.isnan(landmarks[0]).all()
+    assert not np.isnan(landmarks[1:]).any()
+    assert timestamps.shape == (6,)
+    assert np.all(np.diff(timestamps) > 0)
+
+    with pytest.raises(IOError, match="Cannot open"):
+        read_landmarks(video.parent / "missing.avi", fake_detect)
+
+
+def test_process_video_adds_virtual_landmarks(tmp_path, video):
+    destination = tmp_path / "out" / "clip.npz"
+    assert process_video(video, destination, fake_detect, Skeleton) == 6
+
+    with np.load(destination) as data:
+        assert data["landmarks"].shape == (6, 34, 4)
+        assert np.allclose(data["landmarks"][1:, 33, :3], data["landmarks"][1:, 23, :3])
+        assert data["timestamps"].shape == (6,)
+        assert list(data["names"]) == ["MIDDLE_HIP"]
+    assert not (tmp_path / "out" / "clip.npz.partial").exists()
+
+
+@pytest.mark.parametrize("landmark_class", [Skeleton, None])
+def test_process_empty_video(tmp_path, landmark_class):
+    video = tmp_path / "empty.avi"
+    cv2.VideoWriter(str(video), cv2.VideoWriter_fourcc(*"MJPG"), 10, (32, 32)).release()
+
+    destination = tmp_path / "out" / "empty.npz"
+    assert process_video(video, destination, fake_detect, landmark_class) == 0
+
+    with np.load(destination) as data:
+        size = 33 + len(data["names"])
+        assert data["landmarks"].shape == (0, size, 4)
+        assert data["timestamps"].shape == (0,)
+        assert list(data["names"]) == (["MIDDLE_HIP"] if landmark_class else [])
+
+
+def test_main_skips_processed_videos(tmp_path, video, capsys):
+    destination = output_path(video, video.parent, tmp_path / "out")
+    process_video(video, destination, fake_detect)
+
+    assert main([str(video.parent), str(tmp_path / "out")]) == 0
+    assert "1 videos found, 1 already processed" in capsys.readouterr().err
+
+
+def test_process_video_writes_recording(tmp_path, video):
+    from virtual_landmark.recording import RecordingReader
+
+    destination = tmp_path / "out" / "clip.vlm"
+    assert process_video(video, destination, fake_detect, Skeleton) == 6
+
+    reader = RecordingReader(destination)
+    assert reader.landmarks.shape == (6, 34, 4)
+    assert reader.names[33] == "MIDDLE_HIP"
+    assert reader.metadata == {"video": str(video)}
@@ -13,12 +13,14 @@
 # limitations under the License.
 
 import numpy as np
+import pytest
 from mediapipe.framework.formats.landmark_pb2 import NormalizedLandmark
 
+from virtual_landmark import calculus, vectorized
 from virtual_landmark.calculus import (
     middle, projection, centroid, mirror,
     weighted_average, extend, normalize,
-    interpolate, bisector, rotate
+    interpolate, bisector, rotate, angle
 )
 
 def lm(x, y, z):
@@ -31,10 +33,19 @@ def test_projection():
     result = projection(lm(0, 0, 0), lm(1, 0, 0), lm(0.5, 1, 0))
     assert np.allclose(result, (0.5, 0, 0))
 
+def test_projection_onto_degenerate_line():
+    assert projection(lm(1, 2, 3), lm(1, 2, 3), lm(5, 5, 5)) == (1.0, 2.0, 3.0)
+    batch = projection(np.ones((2, 3)), np.ones((2, 3)), np.zeros((2, 3)))
+    assert np.array_equal(batch, np.ones((2, 3)))
+
 def test_centroid():
     result = centroid(lm(0, 0, 0), lm(2, 2, 2), lm(1, 1, 1))
     assert result == (1.0, 1.0, 1.0)
 
+def test_centroid_requires_points():
+    with pytest.raises(ValueError, match="at least one point"):
+        centroid()
+
 def test_mirror():
     result = mirror(lm(0.2, 0.5, 0.5), lm(0.5, 0.5, 0.5))
     assert result == (0.7999999970197678, 0.5, 0.5)
@@ -78,4 +89,62 @@ def test_rotate_identity():
 
 def test_rotate_quarter_turn():
     result = rotate(lm(1, 0, 0), lm(0, 0, 0), lm(0, 0, 1), angle=np.pi / 2)
-    assert np.allclose(result, [0, 1, 0], atol=1e-6)
\ No newline at end of file
+    assert np.allclose(result, [0, 1, 0], atol=1e-6)
+
+def test_functions_accept_array_rows():
+    a = np.array([0.0, 0.0, 0.0, 1.0], dtype=np.float32)
+    b = np.array([2.0, 2.0, 2.0, 1.0], dtype=np.float32)
+    assert middle(a, b) == (1.0, 1.0, 1.0)
+    assert mirror(a, b) == (4.0, 0.0, 0.0)
+    assert np.allclose(normalize(a, b), np.ones(3) / np.sqrt(3))
+
+
+def test_functions_accept_tuples():
+    assert middle((0, 0, 0), middle(lm(2, 2, 2), lm(2, 2, 2))) == (1.0, 1.0, 1.0)
+
+
+def test_angle():
+    assert angle(lm(1, 0, 0), lm(0, 0, 0), lm(0, 1, 0)) == pytest.approx(np.pi / 2)
+    assert angle(lm(1, 0, 0), lm(0, 0, 0), lm(-1, 0, 0)) == pytest.approx(np.pi)
+    assert angle(lm(1, 0, 0), lm(0, 0, 0), lm(1, 0, 0)) == pytest.approx(0.0)
+
+def test_angle_in_image_plane():
+    assert angle(lm(1, 0, 0), lm(0, 0, 0), lm(1, 0, 1)) == pytest.approx(np.pi / 4)
+    assert angle(lm(1, 0, 0), lm(0, 0, 0), lm(1, 0, 1), dims=2) == pytest.approx(0.0)
+
+
+@pytest.mark.parametrize(
+    "name, extra",
+    [
+        ("middle", ()), ("projection", ()), ("centroid", ()), ("mirror", ()),
+        ("weighted_average", (0.3, 0.7)), ("extend", (0.5,)), ("normalize", ()),
+        ("interpolate", (0.25,)), ("bisector", ()), ("rotate", (0.7,)), ("angle", ()),
+    ],
+)
+def test_single_points_match_batches(name, extra):
+    fn = getattr(calculus, name)
+    rows = np.random.default_rng(0).random((5, 3, 4))
+    arity = 2 if name in ("middle", "mirror", "weighted_average", "extend", "normalize", "interpolate") else 3
+
+    batch = fn(*[rows[:, i] for i in range(arity)], *extra)
+    for t in range(len(rows)):
+        points = [rows[t, i] for i in range(arity)]
+        messages = [lm(*p[:3]) for p in points]
+        assert np.allclose(fn(*points, *extra), batch[t])
+        assert np.allclose(fn(*messages, *extra), batch[t])
+        assert np.allclose(fn(*[tuple(p) for p in points], *extra), batch[t])
+
+
+def test_single_points_do_not_go_through_numpy(monkeypatch):
+    def batch_only(*args, **kwargs):
+        raise AssertionError("single points should use the scalar path")
+
+    for name in ("middle", "projection", "centroid", "rotate", "angle"):
+        monkeypatch.setattr(vectorized, name, batch_only)
+
+    a, b, c = lm(0, 0, 0), np.array([1.0, 0.0, 0.0, 1.0]), (0.0, 1.0, 0.0)
+    assert middle(a, b) == (0.5, 0.0, 0.0)
+    assert projection(a, b, c) == (0.0, 0.0, 0.0)
+    assert centroid(a, b, c) == pytest.approx((1 / 3, 1 / 3, 0.0))
+    assert rotate(b, a, lm(0, 0, 1), np.pi / 2) == pytest.approx((0.0, 1.0, 0.0), abs=1e-12)
+    assert angle(b, a, c) == pytest.approx(np.pi / 2)
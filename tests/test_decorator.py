@@ -13,7 +13,7 @@
 # limitations under the License.
 
 import pytest
-from virtual_landmark import landmark
+from virtual_landmark import angle, landmark
 
 
 def test_landmark_decorator_assigns_attributes():
@@ -95,4 +95,66 @@ def test_decorator_raises_on_invalid_connection_type():
     with pytest.raises(ValueError, match="Invalid connection value"):
         @landmark("BAD_CONNECTION", connection=[123])
         def f():
-            return (0.0, 0.0, 0.0)
\ No newline at end of file
+            return (0.0, 0.0, 0.0)
+
+
+def test_decorator_infers_inputs_by_default():
+    @landmark("INFERRED")
+    def f():
+        return (0.0, 0.0, 0.0)
+
+    assert f._landmark_inputs is None
+
+
+def test_decorator_accepts_declared_inputs():
+    class FakeEnum:
+        def __init__(self, name):
+            self.name = name
+
+    @landmark("DECLARED", inputs=["NECK", FakeEnum("NOSE")])
+    def f():
+        return (0.0, 0.0, 0.0)
+
+    assert f._landmark_inputs == ["NECK", "NOSE"]
+
+
+def test_decorator_raises_on_invalid_input_type():
+    with pytest.raises(ValueError, match="Invalid input value"):
+        landmark("BAD_INPUT", inputs=[1.5])
+
+
+def test_angle_decorator_validates_arguments():
+    with pytest.raises(ValueError, match="valid identifier"):
+        angle("bad name", "LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST")
+    with pytest.raises(ValueError, match="dims"):
+        angle("ELBOW", "LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST", dims=4)
+    with pytest.raises(ValueError, match="Invalid landmark value"):
+        angle("ELBOW", "LEFT_SHOULDER", 13, "LEFT_WRIST")
+    with pytest.raises(TypeError, match="VirtualLandmark subclasses"):
+        angle("ELBOW", "LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST")(object)
+
+
+def test_decorator_normalizes_visibility_rules():
+    class FakeEnum:
+        def __init__(self, name):
+            self.name = name
+
+    @landmark("WEIGHTED", visibility={"NOSE": 2, FakeEnum("NECK"): 1})
+    def f():
+        return (0.0, 0.0, 0.0)
+
+    @landmark("DEFAULT")
+    def g():
+        return (0.0, 0.0, 0.0)
+
+    assert f._landmark_visibility == (("NOSE", 2.0), ("NECK", 1.0))
+    assert g._landmark_visibility == "min"
+
+
+def test_decorator_raises_on_invalid_visibility():
+    with pytest.raises(ValueError, match="visibility must be"):
+        landmark("BAD_RULE", visibility="max")
+    with pytest.raises(ValueError, match="non-negative"):
+        landmark("BAD_WEIGHT", visibility={"NOSE": -1})
+    with pytest.raises(ValueError, match="all be zero"):
+        landmark("ZERO_WEIGHTS", visibility={"NOSE": 0})
@@ -13,9 +13,12 @@
 # limitations under the License.
 
 from unittest.mock import MagicMock
+import numpy as np
+import pytest
 import mediapipe as mp
 from mediapipe.framework.formats import landmark_pb2
-from virtual_landmark import Connections, get_extended_pose_landmarks_style
+from virtual_landmark import Connections, LandmarkRenderer, get_extended_pose_landmarks_style
+from virtual_landmark import VirtualLandmark, landmark, calculus as calc
 
 class DummyVirtualLandmark:
     def __init__(self):
@@ -65,10 +68,196 @@ def test_connections_class_properties():
     assert all(len(pair) == 2 for pair in conn.ALL_CONNECTIONS)
 
 
+def test_pose_connections_match_mediapipe():
+    from virtual_landmark.drawing_utils.connections import POSE_CONNECTIONS
+
+    assert POSE_CONNECTIONS == sorted(mp.solutions.pose.POSE_CONNECTIONS)
+
+
 def test_get_extended_pose_landmarks_style():
     dummy = DummyVirtualLandmark()
     style = get_extended_pose_landmarks_style(dummy)
 
     assert isinstance(style, dict)
     assert 33 in style and 34 in style
-    assert all(hasattr(v, 'color') for v in style.values())
\ No newline at end of file
+    assert all(hasattr(v, 'color') for v in style.values())
+
+
+def test_get_extended_pose_landmarks_style_with_numpy_storage(fake_landmarks):
+    class Custom(VirtualLandmark):
+        @landmark("CENTER")
+        def center(self):
+            return (0.5, 0.5, 0.0)
+
+    style = get_extended_pose_landmarks_style(Custom(fake_landmarks, storage="numpy"))
+    assert 33 in style
+
+
+def test_connections_are_cached_per_class(fake_landmarks):
+    class Custom(VirtualLandmark):
+        @landmark("CENTER", connection=["NOSE", "LEFT_HIP"])
+        def center(self):
+            return (0.5, 0.5, 0.0)
+
+    first = Connections(Custom(fake_landmarks))
+    second = Connections(Custom(fake_landmarks, storage="numpy"))
+
+    assert first.CUSTOM_CONNECTION == [(33, 23), (33, 0)]
+    assert first._all_connections is second._all_connections
+    assert len(first.ALL_CONNECTIONS) == len(first.POSE_CONNECTIONS) + 2
+
+    # The returned lists are copies: modifying one does not affect the others
+    first.CUSTOM_CONNECTION.append((0, 1))
+    first.ALL_CONNECTIONS.clear()
+    first.POSE_CONNECTIONS.clear()
+    assert second.CUSTOM_CONNECTION == [(33, 23), (33, 0)]
+    assert len(second.ALL_CONNECTIONS) == len(second.POSE_CONNECTIONS) + 2 == 37
+
+
+def test_connections_include_the_ones_added_to_an_instance(fake_landmarks):
+    class Custom(VirtualLandmark):
+        @landmark("CENTER", connection=["NOSE"])
+        def center(self):
+            return (0.5, 0.5, 0.0)
+
+    extended = Custom(fake_landmarks)
+    extended._add_connection("CENTER", ["LEFT_HIP"])
+
+    assert Connections(extended).CUSTOM_CONNECTION == [(33, 23), (33, 0)]
+    assert Connections(Custom(fake_landmarks)).CUSTOM_CONNECTION == [(33, 0)]
+
+
+def test_extended_style_colors_by_position(fake_landmark, fake_landmarks):
+    class Custom(VirtualLandmark):
+        @landmark("A_RIGHT")
+        def a(self):
+            return (0.1, 0.5, 0.0)
+
+        @landmark("B_CENTER")
+        def b(self):
+            return (0.5, 0.5, 0.0)
+
+        @landmark("C_LEFT")
+        def c(self):
+            return (0.9, 0.5, 0.0)
+
+    first = get_extended_pose_landmarks_style(Custom(fake_landmarks))
+    second = get_extended_pose_landmarks_style(Custom(fake_landmarks, storage="numpy"))
+
+    assert first == second
+    assert first is not second
+    assert first[33] == first[12]  # right shoulder style
+    assert first[34] == first[0]   # nose style
+    assert first[35] == first[11]  # left shoulder style
+    assert 36 not in get_extended_pose_landmarks_style(DummyVirtualLandmark())
+
+
+def test_extended_style_returns_new_specs(fake_landmarks):
+    class Custom(VirtualLandmark):
+        @landmark("A_RIGHT")
+        def a(self):
+            return (0.1, 0.5, 0.0)
+
+    first = get_extended_pose_landmarks_style(Custom(fake_landmarks))
+    assert first[33] is not first[12]
+    expected = (first[0].color, first[12].color)
+
+    first[0].color = first[33].color = (1, 2, 3)
+    first[12].thickness = 99
+
+    second = get_extended_pose_landmarks_style(Custom(fake_landmarks))
+    assert (second[0].color, second[33].color) == expected
+    assert second[12].thickness != 99
+
+
+class DummyLandmark(VirtualLandmark):
+    @landmark("NECK", connection=["NOSE", "LEFT_SHOULDER", "RIGHT_SHOULDER"])
+    def neck(self):
+        return calc.middle(self[11], self[12])
+
+    @landmark("LEFT_POINT", connection=["NECK"])
+    def left_point(self):
+        return calc.interpolate(self[0], (0.9, 0.5, 0.0), 0.8)
+
+    @landmark("RIGHT_POINT")
+    def right_point(self):
+        return calc.interpolate(self[0], (0.1, 0.5, 0.0), 0.8)
+
+
+def _messages(frame):
+    return [
+        landmark_pb2.NormalizedLandmark(x=x, y=y, z=z, visibility=v)
+        for x, y, z, v in frame.tolist()
+    ]
+
+
+def _mediapipe_render(pose, shape):
+    from mediapipe.python.solutions import drawing_utils as mp_drawing
+
+    image = np.zeros(shape, dtype=np.uint8)
+    mp_drawing.draw_landmarks(
+        image,
+        pose.as_landmark_list(),
+        Connections(pose).ALL_CONNECTIONS,
+        get_extended_pose_landmarks_style(pose),
+        mp_drawing.DrawingSpec(color=(255, 255, 255), thickness=2),
+    )
+    return image
+
+
+@pytest.mark.parametrize("storage", ["protobuf", "numpy"])
+def test_renderer_matches_mediapipe(storage):
+    rng = np.random.default_rng(1)
+    frame = rng.random((33, 4)).astype(np.float32)
+    frame[3, 0] = 1.5  # outside the image
+    frame[7, 3] = 0.1  # not visible
+    pose = DummyLandmark(frame if storage == "numpy" else _messages(frame), storage=storage)
+
+    image = np.zeros((240, 320, 3), dtype=np.uint8)
+    spec = mp.solutions.drawing_utils.DrawingSpec(color=(255, 255, 255), thickness=2)
+    result = LandmarkRenderer(spec).draw(image, pose)
+
+    assert result is image
+    assert np.array_equal(image, _mediapipe_render(pose, image.shape))
+
+
+def test_renderer_draws_several_people():
+    from virtual_landmark.multi_pose import MultiPose
+
+    poses = np.random.default_rng(2).random((3, 33, 4)).astype(np.float32)
+    people = MultiPose(DummyLandmark, poses)
+
+    batched = LandmarkRenderer().draw(np.zeros((120, 160, 3), np.uint8), people)
+    expected = np.zeros((120, 160, 3), np.uint8)
+    for p in range(3):
+        LandmarkRenderer().draw(expected, DummyLandmark(poses[p], storage="numpy"))
+
+    renderer = LandmarkRenderer(draw_landmarks=False)
+    lines_only = renderer.draw(np.zeros((120, 160, 3), np.uint8), people.as_array(), people.connections.ALL_CONNECTIONS)
+    assert lines_only.any() and not np.array_equal(lines_only, batched)
+    # Connections of all people are drawn before the landmarks
+    assert np.count_nonzero(batched) == pytest.approx(np.count_nonzero(expected), rel=0.05)
+
+
+def test_renderer_caches_connections_per_class_only():
+    frame = np.random.default_rng(3).random((33, 4)).astype(np.float32)
+    image = np.zeros((60, 80, 3), np.uint8)
+    renderer = LandmarkRenderer()
+
+    for _ in range(3):
+        pose = DummyLandmark(frame, storage="numpy")
+        renderer.draw(image, pose)
+        renderer.draw(image, pose.as_array(), Connections(pose).ALL_CONNECTIONS)  # a new list
+        renderer.draw(image, frame)
+
+    assert list(renderer._class_edges.keys()) == [DummyLandmark]
+
+
+def test_renderer_validates_input():
+    renderer = LandmarkRenderer()
+    with pytest.raises(ValueError, match="three channel"):
+        renderer.draw(np.zeros((10, 10), np.uint8), np.zeros((33, 4)))
+    with pytest.raises(ValueError, match="out of range"):
+        renderer.draw(np.zeros((10, 10, 3), np.uint8), np.full((5, 4), 0.5))
+    with pytest.raises(ValueError, match="shape"):
+        renderer.draw(np.zeros((10, 10, 3), np.uint8), np.zeros(4))
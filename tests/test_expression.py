@@ -0,0 +1,313 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from virtual_landmark import VirtualLandmark, landmark
+from virtual_landmark import calculus as calc
+from virtual_landmark.expression import (
+    Expression,
+    centroid,
+    extend,
+    interpolate,
+    middle,
+    mirror,
+    projection,
+    ref,
+    weighted_average,
+)
+from virtual_landmark.profiling import LandmarkProfiler
+
+
+class MethodSkeleton(VirtualLandmark):
+    @landmark("MIDDLE_SHOULDER")
+    def middle_shoulder(self):
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.LEFT_SHOULDER], self[vl.RIGHT_SHOULDER])
+
+    @landmark("MIDDLE_HIP")
+    def middle_hip(self):
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.LEFT_HIP], self[vl.RIGHT_HIP])
+
+    @landmark("THORAX")
+    def thorax(self):
+        vl = self.virtual_landmark
+        return calc.interpolate(self[vl.MIDDLE_SHOULDER], self[vl.MIDDLE_HIP], 0.3)
+
+    @landmark("HEAD_TOP")
+    def head_top(self):
+        vl = self.virtual_landmark
+        return calc.extend(self[vl.THORAX], self[vl.NOSE], 0.5)
+
+    @landmark("CENTER")
+    def center(self):
+        vl = self.virtual_landmark
+        return calc.centroid(self[vl.THORAX], self[vl.MIDDLE_HIP], self[vl.NOSE])
+
+    @landmark("MIRRORED_WRIST")
+    def mirrored_wrist(self):
+        vl = self.virtual_landmark
+        return calc.mirror(self[vl.LEFT_WRIST], self[vl.MIDDLE_HIP])
+
+    @landmark("PELVIS")
+    def pelvis(self):
+        vl = self.virtual_landmark
+        return calc.weighted_average(self[vl.MIDDLE_HIP], self[vl.THORAX], 0.8, 0.2)
+
+    @landmark("KNEE_ON_THIGH")
+    def knee_on_thigh(self):
+        vl = self.virtual_landmark
+        return calc.projection(self[vl.MIDDLE_HIP], self[vl.LEFT_KNEE], self[vl.LEFT_SHOULDER])
+
+
+class ExpressionSkeleton(VirtualLandmark):
+    middle_shoulder = landmark("MIDDLE_SHOULDER", expr=middle("LEFT_SHOULDER", "RIGHT_SHOULDER"))
+    middle_hip = landmark("MIDDLE_HIP", expr=middle("LEFT_HIP", "RIGHT_HIP"))
+    thorax = landmark("THORAX", expr=interpolate("MIDDLE_SHOULDER", "MIDDLE_HIP", 0.3))
+    head_top = landmark("HEAD_TOP", expr=extend("THORAX", "NOSE", 0.5))
+    center = landmark("CENTER", expr=centroid("THORAX", "MIDDLE_HIP", "NOSE"))
+    mirrored_wrist = landmark("MIRRORED_WRIST", expr=mirror("LEFT_WRIST", "MIDDLE_HIP"))
+    pelvis = landmark("PELVIS", expr=weighted_average("MIDDLE_HIP", "THORAX", 0.8, 0.2))
+    knee_on_thigh = landmark(
+        "KNEE_ON_THIGH", expr=projection("MIDDLE_HIP", "LEFT_KNEE", "LEFT_SHOULDER")
+    )
+
+
+def _by_name(obj):
+    array = obj.as_array()
+    return {name: array[..., obj.virtual_landmark[name], :] for name in obj.landmark_plan().names}
+
+
+@pytest.mark.parametrize("storage", ["protobuf", "numpy"])
+@pytest.mark.parametrize("lazy", [False, True])
+def test_expressions_match_methods(storage, lazy):
+    frame = np.random.default_rng(0).random((33, 4)).astype(np.float32)
+    landmarks = frame
+    if storage == "protobuf":
+        landmarks = MethodSkeleton(frame, storage="numpy").as_landmark_list().landmark[:33]
+
+    expected = _by_name(MethodSkeleton(landmarks, storage=storage))
+    result = _by_name(ExpressionSkeleton(landmarks, storage=storage, lazy=lazy))
+    for name, point in expected.items():
+        assert result[name] == pytest.approx(point, abs=1e-6), name
+
+
+def test_expressions_over_clips_and_world_landmarks():
+    rng = np.random.default_rng(1)
+    clip = rng.random((20, 33, 4)).astype(np.float32)
+
+    expected = _by_name(MethodSkeleton(clip, storage="numpy"))
+    result = _by_name(ExpressionSkeleton(clip, storage="numpy"))
+    for name, points in expected.items():
+        assert np.allclose(result[name], points, atol=1e-6), name
+
+    obj = ExpressionSkeleton(clip[0], storage="numpy", world_landmarks=clip[1])
+    world = _by_name(MethodSkeleton(clip[1], storage="numpy"))
+    for name, point in world.items():
+        assert obj.as_world_array()[obj.virtual_landmark[name]] == pytest.approx(point, abs=1e-6)
+
+
+def test_class_compiles_one_program_with_shared_projections():
+    programs = ExpressionSkeleton._expression_programs
+    assert len(programs) == 1
+    assert set(programs[0].names) == set(ExpressionSkeleton.landmark_plan().names)
+
+    class Shared(VirtualLandmark):
+        a = landmark("A", expr=projection("LEFT_HIP", "LEFT_KNEE", "NOSE"))
+        b = landmark("B", expr=middle(projection("LEFT_HIP", "LEFT_KNEE", "NOSE"), "NOSE"))
+        c = landmark("C", expr=projection("A", "B", "LEFT_WRIST"))
+
+    (program,) = Shared._expression_programs
+    assert "projections=2" in repr(program)
+
+    obj = Shared(np.random.default_rng(2).random((33, 4)).astype(np.float32), storage="numpy")
+    vl = obj.virtual_landmark
+    expected = calc.projection(obj[vl.A], obj[vl.B], obj[vl.LEFT_WRIST])
+    assert obj[vl.C][:3] == pytest.approx(expected, abs=1e-6)
+
+
+def test_expression_inputs_are_inlined():
+    specs = {s.name: s for s in ExpressionSkeleton.landmark_plan()}
+
+    assert specs["THORAX"].inputs == ("LEFT_SHOULDER", "RIGHT_SHOULDER", "LEFT_HIP", "RIGHT_HIP")
+    assert specs["THORAX"].depends == ()
+    assert ExpressionSkeleton.landmark_plan().levels[0] == ExpressionSkeleton.landmark_plan().specs
+
+
+def test_expressions_mix_with_methods():
+    class Mixed(VirtualLandmark):
+        neck = landmark("NECK", expr=middle("LEFT_SHOULDER", "RIGHT_SHOULDER"))
+
+        @landmark("HEAD")
+        def head(self):
+            vl = self.virtual_landmark
+            return calc.extend(self[vl.NECK], self[vl.NOSE])
+
+        chin = landmark("CHIN", expr=interpolate("HEAD", "NECK", 0.5))
+
+    levels = [[s.name for s in level] for level in Mixed.landmark_plan().levels]
+    assert levels == [["NECK"], ["HEAD"], ["CHIN"]]
+
+    frame = np.random.default_rng(3).random((33, 4)).astype(np.float32)
+    obj = Mixed(frame, storage="numpy")
+    vl = obj.virtual_landmark
+    assert obj[vl.CHIN][:3] == pytest.approx(calc.middle(obj[vl.HEAD], obj[vl.NECK]), abs=1e-6)
+
+
+def test_hidden_sources_only_affect_their_landmarks():
+    class Hidden(VirtualLandmark):
+        visibility_threshold = 0.5
+
+        @landmark("HIDDEN", inputs=["LEFT_WRIST"])
+        def hidden(self):
+            return (0.0, 0.0, 0.0)
+
+        near = landmark("NEAR", expr=middle("HIDDEN", "NOSE"))
+        far = landmark("FAR", expr=middle("LEFT_HIP", "NOSE"))
+
+    frame = np.random.default_rng(4).random((33, 4)).astype(np.float32)
+    frame[:, 3] = 1.0
+    frame[15, 3] = 0.1
+
+    obj = Hidden(frame, storage="numpy")
+    vl = obj.virtual_landmark
+    assert np.isnan(obj[vl.HIDDEN][:3]).all()
+    assert np.isnan(obj[vl.NEAR][:3]).all()
+    assert obj[vl.FAR][:3] == pytest.approx((frame[23, :3] + frame[0, :3]) / 2)
+
+
+def test_profiler_records_programs():
+    frame = np.random.default_rng(5).random((33, 4)).astype(np.float32)
+    with LandmarkProfiler(ExpressionSkeleton) as profiler:
+        ExpressionSkeleton(frame, storage="numpy")
+
+    assert [s.name for s in profiler.stats()] == ["<expressions:0>"]
+
+
+def test_expression_builders_validate_arguments():
+    assert ref("NOSE").names() == ("NOSE",)
+    assert middle("NOSE", centroid("LEFT_HIP", "NOSE")).names() == ("NOSE", "LEFT_HIP")
+
+    with pytest.raises(ValueError, match="at least one point"):
+        centroid()
+    with pytest.raises(ValueError, match="alpha must be a number"):
+        interpolate("NOSE", "NECK", "half")
+    with pytest.raises(ValueError, match="add up to zero"):
+        weighted_average("NOSE", "NECK", 1, -1)
+    with pytest.raises(ValueError, match="Invalid landmark name"):
+        middle("NOSE", "not a name")
+    with pytest.raises(ValueError, match="Invalid expression value"):
+        middle("NOSE", 3)
+    with pytest.raises(TypeError, match="abstract"):
+        Expression()
+
+
+def test_landmark_validates_expressions():
+    with pytest.raises(ValueError, match="must be an expression"):
+        landmark("NECK", expr="NOSE")
+    with pytest.raises(ValueError, match="inputs cannot be combined"):
+        landmark("NECK", expr=ref("NOSE"), inputs=["NOSE"])
+
+    with pytest.raises(ValueError, match="Cyclic"):
+        class Cycle(VirtualLandmark):
+            a = landmark("A", expr=middle("B", "NOSE"))
+            b = landmark("B", expr=middle("A", "NOSE"))
+
+    with pytest.raises(ValueError, match="unknown landmark"):
+        class Unknown(VirtualLandmark):
+            a = landmark("A", expr=middle("TAIL", "NOSE"))
+
+
+class AffineSkeleton(VirtualLandmark):
+    @landmark("MIDDLE_HIP", affine=True)
+    def middle_hip(self):
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.LEFT_HIP], self[vl.RIGHT_HIP])
+
+    @landmark("THORAX", affine=True)
+    def thorax(self):
+        return calc.interpolate(self[11], self[self.virtual_landmark.MIDDLE_HIP], 0.3)
+
+    @landmark("LIFTED_WRIST", affine=True)
+    def lifted_wrist(self):
+        vl = self.virtual_landmark
+        return np.asarray(calc.mirror(self[vl.LEFT_WRIST], self[vl.THORAX])) + (0.0, -0.1, 0.0)
+
+    @landmark("KNEE_ON_THIGH")
+    def knee_on_thigh(self):
+        vl = self.virtual_landmark
+        return calc.projection(self[vl.THORAX], self[vl.LEFT_KNEE], self[vl.LEFT_SHOULDER])
+
+
+def test_affine_methods_are_folded():
+    specs = {s.name: s for s in AffineSkeleton.landmark_plan()}
+
+    # Inputs are the landmarks the probe found, even for integer indices
+    assert specs["THORAX"].expr.names() == ("LEFT_SHOULDER", "MIDDLE_HIP")
+    assert specs["THORAX"].inputs == ("LEFT_SHOULDER", "LEFT_HIP", "RIGHT_HIP")
+    assert specs["LIFTED_WRIST"].expr.offset == pytest.approx((0.0, -0.1, 0.0))
+    assert specs["KNEE_ON_THIGH"].expr is None
+
+    (program, method_level) = AffineSkeleton._expression_programs
+    assert set(program.names) == {"MIDDLE_HIP", "THORAX", "LIFTED_WRIST"}
+    assert method_level is None
+
+
+@pytest.mark.parametrize("lazy", [False, True])
+def test_affine_methods_match_their_methods(lazy):
+    clip = np.random.default_rng(6).random((5, 33, 4)).astype(np.float32)
+    obj = AffineSkeleton(clip, storage="numpy", lazy=lazy)
+    vl = obj.virtual_landmark
+
+    for spec in AffineSkeleton.landmark_plan():
+        assert np.allclose(obj[vl[spec.name]][..., :3], spec.method(obj), atol=1e-6), spec.name
+
+
+def test_constant_affine_landmark():
+    class Origin(VirtualLandmark):
+        @landmark("ORIGIN", affine=True, visibility=None)
+        def origin(self):
+            return np.broadcast_to((0.5, 0.5, 0.0), np.shape(self[0])[:-1] + (3,))
+
+    assert Origin.landmark_plan().specs[0].inputs == ()
+    obj = Origin(np.random.default_rng(7).random((33, 4)).astype(np.float32), storage="numpy")
+    assert obj[obj.virtual_landmark.ORIGIN] == pytest.approx((0.5, 0.5, 0.0, 1.0))
+
+
+def test_non_affine_methods_are_rejected():
+    with pytest.raises(ValueError, match="not an affine combination"):
+        class Projected(VirtualLandmark):
+            @landmark("P", affine=True)
+            def p(self):
+                vl = self.virtual_landmark
+                return calc.projection(self[vl.LEFT_HIP], self[vl.LEFT_KNEE], self[vl.NOSE])
+
+    with pytest.raises(ValueError, match="not an affine combination"):
+        class Rotated(VirtualLandmark):
+            @landmark("R", affine=True)
+            def r(self):
+                vl = self.virtual_landmark
+                return calc.rotate(self[vl.NOSE], self[vl.LEFT_HIP], self[vl.RIGHT_HIP], 0.5)
+
+    with pytest.raises(ValueError, match="cannot be evaluated on stacked landmarks"):
+        class Scalar(VirtualLandmark):
+            @landmark("S", affine=True)
+            def s(self):
+                nose = self[self.virtual_landmark.NOSE]
+                return (float(nose[0]), 0.0, 0.0)
+
+    with pytest.raises(ValueError, match="affine cannot be combined"):
+        landmark("NECK", expr=ref("NOSE"), affine=True)
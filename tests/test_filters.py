@@ -0,0 +1,136 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from virtual_landmark import VirtualLandmark, landmark, calculus as calc
+from virtual_landmark.filters import ExponentialFilter, KalmanFilter, OneEuroFilter, TemporalFilter
+from virtual_landmark.pipeline import Pipeline
+
+FILTERS = [
+    lambda: ExponentialFilter(alpha=0.3),
+    lambda: OneEuroFilter(min_cutoff=0.5, beta=0.1),
+    lambda: KalmanFilter(process_noise=1.0, measurement_noise=1e-2),
+]
+
+
+class Neck(VirtualLandmark):
+    @landmark("NECK")
+    def neck(self):
+        return calc.middle(
+            self[self.virtual_landmark.LEFT_SHOULDER],
+            self[self.virtual_landmark.RIGHT_SHOULDER],
+        )
+
+
+def noisy_frames(n=200, shape=(33, 4), seed=0):
+    rng = np.random.default_rng(seed)
+    frames = np.full((n,) + shape, 0.5, dtype=np.float32)
+    frames[..., :3] += rng.normal(0, 0.02, size=frames[..., :3].shape)
+    return frames
+
+
+@pytest.mark.parametrize("make", FILTERS)
+def test_filters_reduce_jitter(make):
+    smooth = make()
+    frames = noisy_frames()
+    out = np.stack([smooth(frame) for frame in frames])
+
+    assert out.shape == frames.shape
+    assert out.dtype == np.float32
+    assert np.array_equal(out[0], frames[0])
+    assert np.array_equal(out[..., 3], frames[..., 3])
+    assert out[50:, :, :3].std() < 0.5 * frames[50:, :, :3].std()
+
+
+@pytest.mark.parametrize("make", FILTERS)
+def test_filters_follow_constant_input(make):
+    smooth = make()
+    frame = np.random.rand(2, 33, 4).astype(np.float32)
+    for t in range(50):
+        out = smooth(frame, timestamp=t / 30)
+    assert np.allclose(out, frame, atol=1e-5)
+
+
+@pytest.mark.parametrize("make", FILTERS)
+def test_filters_restart_after_missing_values(make):
+    smooth = make()
+    smooth(np.zeros((33, 4)))
+
+    missing = np.zeros((33, 4))
+    missing[5] = np.nan
+    assert np.isnan(smooth(missing)[5, :3]).all()
+
+    recovered = np.zeros((33, 4))
+    recovered[5, :3] = 1.0
+    out = smooth(recovered)
+    assert np.allclose(out[5, :3], 1.0)
+    assert np.isfinite(out).all()
+
+
+def test_filters_reset_when_shape_changes():
+    smooth = ExponentialFilter(alpha=0.5)
+    smooth(np.zeros((33, 4)))
+    out = smooth(np.ones((2, 33, 4)))
+    assert np.allclose(out, 1.0)
+
+
+def test_filters_accept_landmark_instances(fake_landmarks):
+    smooth = OneEuroFilter()
+    pose = Neck(fake_landmarks, storage="numpy")
+    assert np.allclose(smooth(pose), pose.as_array())
+    assert np.allclose(smooth(fake_landmarks), pose.as_array()[:33])
+
+
+def test_filters_before_and_after_virtual_landmarks(fake_landmarks):
+    pose = Neck(fake_landmarks, storage="numpy")
+    smooth_raw = ExponentialFilter(alpha=0.5)
+    smooth_all = ExponentialFilter(alpha=0.5)
+
+    for offset in (0.0, 0.2):
+        frame = pose.as_array()[:33] + offset
+        pose.update(smooth_raw(frame))
+        points = smooth_all(pose.as_array())
+
+    # Each filter keeps its state: the raw landmarks move halfway towards the
+    # new frame, and the smoothed complete array half of that again
+    assert pose.as_array()[:33, :3] == pytest.approx(frame[:, :3] - 0.1, abs=1e-6)
+    assert points.shape == (34, 4)
+    assert points[:33, :3] == pytest.approx(frame[:, :3] - 0.15, abs=1e-6)
+
+
+def test_filters_run_as_pipeline_stages():
+    frames = noisy_frames(20)
+    expected = [ExponentialFilter(alpha=0.2)(f) for f in frames[:1]]
+
+    with Pipeline(frames, [ExponentialFilter(alpha=0.2)]) as pipeline:
+        out = list(pipeline)
+    assert len(out) == 20
+    assert np.array_equal(out[0], expected[0])
+
+
+def test_filters_validate_parameters():
+    with pytest.raises(ValueError, match="alpha"):
+        ExponentialFilter(alpha=0)
+    with pytest.raises(ValueError, match="Cutoff"):
+        OneEuroFilter(min_cutoff=0)
+    with pytest.raises(ValueError, match="beta"):
+        OneEuroFilter(beta=-1)
+    with pytest.raises(ValueError, match="Noise"):
+        KalmanFilter(measurement_noise=0)
+    with pytest.raises(ValueError, match="freq"):
+        KalmanFilter(freq=0)
+    with pytest.raises(TypeError, match="abstract"):
+        TemporalFilter()
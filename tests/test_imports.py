@@ -0,0 +1,75 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import subprocess
+import sys
+import textwrap
+
+SRC = os.path.abspath(os.path.join(os.path.dirname(__file__), "../src"))
+
+# Runs in a fresh interpreter where importing MediaPipe or OpenCV fails
+SCRIPT = textwrap.dedent(
+    """
+    import sys
+    sys.modules["mediapipe"] = None
+    sys.modules["cv2"] = None
+
+    import numpy as np
+    import virtual_landmark
+    from virtual_landmark import VirtualLandmark, calculus as calc, landmark
+    from virtual_landmark import aio, batch, detector, expression, filters, multi_pose
+    from virtual_landmark import pipeline, pose_pool, profiling, recording
+    from virtual_landmark.drawing_utils import Connections
+
+    class Skeleton(VirtualLandmark):
+        @landmark("NECK", connection=["LEFT_SHOULDER", "RIGHT_SHOULDER"])
+        def neck(self):
+            vl = self.virtual_landmark
+            return calc.middle(self[vl.LEFT_SHOULDER], self[vl.RIGHT_SHOULDER])
+
+        head = landmark("HEAD", expr=expression.extend("NECK", "NOSE"))
+
+    clip = np.random.default_rng(0).random((10, 33, 4)).astype(np.float32)
+    assert Skeleton.evaluate_clip(clip).shape == (10, 35, 4)
+
+    pose = Skeleton(clip[0], storage="numpy")
+    assert len(Connections(pose).ALL_CONNECTIONS) == 35 + 2
+    assert len(multi_pose.MultiPose(Skeleton, clip[:3])) == 3
+
+    try:
+        virtual_landmark.LandmarkRenderer
+    except ImportError:
+        pass
+    else:
+        raise AssertionError("the renderer should need OpenCV")
+
+    loaded = [m for m, module in sys.modules.items() if module is not None]
+    print(sorted(m for m in loaded if m.split(".")[0] in ("mediapipe", "cv2")))
+    """
+)
+
+
+def test_core_imports_without_mediapipe(tmp_path):
+    # A file, not `-c`: inferring the inputs of the landmarks needs their source
+    script = tmp_path / "script.py"
+    script.write_text(SCRIPT)
+
+    env = dict(os.environ, PYTHONPATH=SRC + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    result = subprocess.run(
+        [sys.executable, str(script)], env=env, capture_output=True, text=True, timeout=60
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "[]"
@@ -0,0 +1,92 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from virtual_landmark import VirtualLandmark, angle, landmark, calculus as calc
+from virtual_landmark.multi_pose import MultiPose, poses_to_array
+
+
+@angle("LEFT_ELBOW", "LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST")
+class Skeleton(VirtualLandmark):
+    @landmark("NECK", connection=["NOSE"])
+    def neck(self):
+        return calc.middle(
+            self[self.virtual_landmark.LEFT_SHOULDER],
+            self[self.virtual_landmark.RIGHT_SHOULDER],
+        )
+
+
+def test_matches_single_person_evaluation():
+    poses = np.random.rand(4, 33, 4).astype(np.float32)
+    people = MultiPose(Skeleton, poses)
+
+    assert len(people) == 4
+    assert people.as_array().shape == (4, 34, 4)
+    for p in range(4):
+        single = Skeleton(poses[p], storage="numpy")
+        assert np.allclose(people[p], single.as_array())
+        assert np.allclose(people.angles()[p], single.angles())
+
+
+def test_accepts_tasks_landmark_lists(fake_landmarks):
+    tasks_pose = [SimpleNamespace(x=lm.x, y=lm.y, z=lm.z, visibility=None) for lm in fake_landmarks]
+    array = poses_to_array([fake_landmarks, tasks_pose])
+
+    assert array.shape == (2, 33, 4)
+    assert np.array_equal(array[1, :, 3], np.ones(33))
+
+    with pytest.raises(ValueError, match="same number"):
+        poses_to_array([fake_landmarks, fake_landmarks[:10]])
+
+
+def test_update_reuses_or_reallocates():
+    people = MultiPose(Skeleton, np.zeros((2, 33, 4)))
+    batched = people.landmarks
+
+    people.update(np.ones((2, 33, 4)))
+    assert people.landmarks is batched
+    assert np.allclose(people[1, 33, :3], 1.0)
+
+    people.update(np.ones((3, 33, 4)))
+    assert len(people) == 3
+
+    people.update([])
+    assert len(people) == 0
+    assert people.as_landmark_lists() == []
+
+
+def test_drawing_data_per_person():
+    poses = np.random.rand(3, 33, 4).astype(np.float32)
+    people = MultiPose(Skeleton, poses)
+
+    lists = people.as_landmark_lists()
+    assert len(lists) == 3
+    assert len(lists[2].landmark) == 34
+    assert lists[2].landmark[33].x == pytest.approx(people[2, 33, 0])
+    assert people.as_landmark_lists() is lists
+
+    styles = people.styles()
+    assert len(styles) == 3 and 33 in styles[0]
+    assert (33, 0) in people.connections.ALL_CONNECTIONS
+
+
+def test_rejects_other_classes():
+    with pytest.raises(TypeError, match="VirtualLandmark subclass"):
+        MultiPose(dict, np.zeros((1, 33, 4)))
+    with pytest.raises(ValueError, match="expected 33 landmarks"):
+        MultiPose(Skeleton, np.zeros((1, 10, 4)))
@@ -0,0 +1,181 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import threading
+import time
+
+import pytest
+
+from virtual_landmark.pipeline import Pipeline, Stage
+
+
+def jittery(fn):
+    def wrapper(item):
+        time.sleep(random.random() * 0.002)
+        return fn(item)
+    return wrapper
+
+
+def test_pipeline_preserves_order_with_several_workers():
+    pipeline = Pipeline(
+        range(200),
+        [Stage(jittery(lambda x: x * 2), workers=4), jittery(lambda x: x + 1)],
+    )
+    assert list(pipeline) == [x * 2 + 1 for x in range(200)]
+
+
+def test_pipeline_creates_one_callable_per_worker():
+    created = []
+    closed = []
+
+    class Worker:
+        def __init__(self):
+            created.append(threading.current_thread().name)
+
+        def __call__(self, item):
+            return item
+
+        def close(self):
+            closed.append(self)
+
+    result = list(Pipeline(range(20), [Stage(factory=Worker, workers=3, name="pose")]))
+
+    assert result == list(range(20))
+    assert sorted(created) == ["pose-0", "pose-1", "pose-2"]
+    assert len(closed) == 3
+
+
+def test_pipeline_drop_newest_discards_items_when_full():
+    release = threading.Event()
+
+    def slow(item):
+        release.wait()
+        return item
+
+    def source():
+        yield from range(10)
+        release.set()
+
+    pipeline = Pipeline(source(), [slow], maxsize=1, policy="drop_newest")
+    result = list(pipeline)
+
+    assert result[0] == 0
+    assert pipeline.dropped == 10 - len(result)
+    assert pipeline.dropped > 0
+
+
+def test_pipeline_drop_oldest_keeps_latest_items():
+    release = threading.Event()
+
+    def slow(item):
+        release.wait()
+        return item
+
+    def source():
+        yield from range(10)
+        release.set()
+
+    pipeline = Pipeline(source(), [slow], maxsize=1, policy="drop_oldest")
+    result = list(pipeline)
+
+    assert result[-1] == 9
+    assert result == sorted(result)
+    assert pipeline.dropped == 10 - len(result)
+
+
+@pytest.mark.parametrize("policy", ["block", "drop_newest"])
+def test_pipeline_stalled_worker_bounds_items_in_flight(policy):
+    release = threading.Event()
+    read = []
+
+    def source():
+        for item in range(300):
+            read.append(item)
+            yield item
+
+    def work(item):
+        if item == 0:
+            release.wait(5)
+        return item
+
+    def unstall():
+        time.sleep(0.3)
+        in_flight.append(len(read) - pipeline.dropped)
+        release.set()
+
+    in_flight = []
+    pipeline = Pipeline(source(), [Stage(work, workers=2)], maxsize=2, policy=policy)
+    threading.Thread(target=unstall).start()
+    result = list(pipeline)
+
+    # 4 items in the stage (2 workers + maxsize), 2 queued and 1 being put
+    assert in_flight[0] <= 7
+    assert result[:1] == [0] and result == sorted(result)
+    if policy == "block":
+        assert result == list(range(300))
+    else:
+        assert pipeline.dropped == 300 - len(result) > 0
+
+
+def test_pipeline_propagates_stage_errors():
+    def fail(item):
+        if item == 5:
+            raise RuntimeError("boom")
+        return item
+
+    with pytest.raises(RuntimeError, match="boom"):
+        list(Pipeline(range(100), [Stage(fail, workers=2)]))
+
+
+def test_pipeline_propagates_source_errors():
+    def source():
+        yield 1
+        raise IOError("camera lost")
+
+    with pytest.raises(IOError, match="camera lost"):
+        list(Pipeline(source(), [lambda x: x]))
+
+
+def test_pipeline_can_be_stopped_early():
+    def endless():
+        while True:
+            yield 1
+
+    with Pipeline(endless(), [lambda x: x]) as pipeline:
+        for count, _ in enumerate(pipeline):
+            if count == 10:
+                break
+
+    assert all(not thread.is_alive() for thread in pipeline._threads)
+
+
+def test_pipeline_runs_only_once():
+    pipeline = Pipeline(range(3), [lambda x: x])
+    assert list(pipeline) == [0, 1, 2]
+    with pytest.raises(RuntimeError, match="only be run once"):
+        list(pipeline)
+
+
+def test_pipeline_validation():
+    with pytest.raises(ValueError, match="policy"):
+        Pipeline([], [lambda x: x], policy="skip")
+    with pytest.raises(ValueError, match="at least one stage"):
+        Pipeline([], [])
+    with pytest.raises(ValueError, match="maxsize"):
+        Pipeline([], [lambda x: x], maxsize=0)
+    with pytest.raises(ValueError, match="Exactly one"):
+        Stage()
+    with pytest.raises(ValueError, match="workers"):
+        Stage(lambda x: x, workers=0)
@@ -0,0 +1,178 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+from virtual_landmark.detector import PoseDetector
+from virtual_landmark.pose_pool import PosePool
+
+
+class FakePose:
+    def __init__(self, static_image_mode=False, model_complexity=1, enable_segmentation=False):
+        self.model_complexity = model_complexity
+        self.resets = 0
+        self.closed = False
+
+    def process(self, image):
+        return SimpleNamespace(pose_landmarks=None)
+
+    def reset(self):
+        self.resets += 1
+
+    def close(self):
+        self.closed = True
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_released_instances_are_reset_and_reused():
+    pool = PosePool(FakePose)
+
+    with pool.pose() as first:
+        assert pool.leased == 1
+    with pool.pose(model_complexity=1) as second:  # same configuration once defaults apply
+        pass
+
+    assert second is first
+    assert first.resets == 2
+    assert pool.created == 1
+    assert (pool.idle, pool.leased) == (1, 0)
+
+
+def test_configurations_are_pooled_separately():
+    pool = PosePool(FakePose)
+    assert pool.prewarm(2, model_complexity=2) == 2
+    assert pool.prewarm(2, model_complexity=2) == 0
+
+    heavy = pool.acquire(model_complexity=2)
+    light = pool.acquire()
+
+    assert heavy.model_complexity == 2
+    assert light.model_complexity == 1
+    assert pool.created == 3
+
+    with pytest.raises(TypeError):
+        pool.acquire(model_path="pose.task")
+
+
+def test_idle_instances_are_bounded_and_evicted():
+    clock = Clock()
+    pool = PosePool(FakePose, max_idle=2, idle_timeout=10.0, clock=clock)
+    poses = [pool.acquire() for _ in range(3)]
+    for pose in poses:
+        pool.release(pose)
+
+    assert pool.idle == 2
+    assert poses[2].closed  # over max_idle
+
+    clock.now = 5.0
+    pool.release(pool.acquire())  # refreshes one instance
+    clock.now = 12.0
+    assert pool.evict() == 1
+    assert pool.idle == 1
+
+    clock.now = 30.0
+    pool.acquire()  # evicts the last idle one, then creates a new instance
+    assert pool.idle == 0
+    assert pool.created == 4
+
+
+def test_close_closes_idle_and_returned_instances():
+    pool = PosePool(FakePose)
+    idle, leased = pool.acquire(), pool.acquire()
+    pool.release(idle)
+
+    pool.close()
+    assert idle.closed and not leased.closed
+    pool.release(leased)
+    assert leased.closed
+
+    with pytest.raises(RuntimeError, match="closed"):
+        pool.acquire()
+    with pytest.raises(RuntimeError, match="closed"):
+        pool.prewarm()
+
+
+def test_release_rejects_foreign_instances():
+    pool = PosePool(FakePose)
+    pose = pool.acquire()
+    pool.release(pose)
+
+    with pytest.raises(ValueError, match="not checked out"):
+        pool.release(pose)
+    with pytest.raises(ValueError, match="not checked out"):
+        pool.release(FakePose())
+
+
+def test_pool_is_thread_safe():
+    pool = PosePool(FakePose, max_idle=8)
+
+    def session():
+        for _ in range(200):
+            with pool.pose():
+                pass
+
+    threads = [threading.Thread(target=session) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert pool.leased == 0
+    assert pool.idle == pool.created <= 8
+
+
+def test_pose_detector_checks_out_from_the_pool():
+    pool = PosePool(FakePose)
+    detector = PoseDetector(model_complexity=2, pool=pool)
+
+    assert detector(np.zeros((4, 4, 3), dtype=np.uint8)) is None
+    assert pool.leased == 1
+
+    pose = detector._pose
+    detector.close()
+    detector.close()  # no effect
+    assert (pool.idle, pool.leased) == (1, 0)
+    assert pool.acquire(model_complexity=2) is pose
+
+
+def test_instances_failing_to_reset_are_closed():
+    class Broken(FakePose):
+        def reset(self):
+            raise RuntimeError("graph crashed")
+
+    pool = PosePool(Broken)
+    pose = pool.acquire()
+    with pytest.raises(RuntimeError, match="graph crashed"):
+        pool.release(pose)
+
+    assert pose.closed
+    assert (pool.idle, pool.leased) == (0, 0)
+
+
+def test_invalid_arguments():
+    with pytest.raises(ValueError, match="max_idle"):
+        PosePool(FakePose, max_idle=-1)
+    with pytest.raises(ValueError, match="idle_timeout"):
+        PosePool(FakePose, idle_timeout=0)
@@ -0,0 +1,125 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import json
+
+import numpy as np
+import pytest
+
+from virtual_landmark import VirtualLandmark, landmark, calculus as calc
+from virtual_landmark.profiling import LandmarkProfiler
+
+
+class Profiled(VirtualLandmark):
+    @landmark("NECK")
+    def neck(self):
+        return calc.middle(
+            self[self.virtual_landmark.LEFT_SHOULDER],
+            self[self.virtual_landmark.RIGHT_SHOULDER],
+        )
+
+    @landmark("HEAD", inputs=["NECK"])
+    def head(self):
+        big = np.zeros(100_000)
+        return calc.extend(self[self.virtual_landmark.NECK], self[0], big[0] + 1.0)
+
+
+def test_profiler_aggregates_calls(fake_landmarks):
+    with LandmarkProfiler(Profiled) as profiler:
+        pose = Profiled(fake_landmarks)
+        pose.update(fake_landmarks)
+        pose.update(fake_landmarks)
+
+    assert Profiled._profiler is None
+    assert profiler.frames == 3
+
+    stats = {s.name: s for s in profiler.stats()}
+    assert set(stats) == {"NECK", "HEAD"}
+    assert stats["NECK"].calls == 3
+    assert stats["NECK"].owner == "Profiled"
+    assert 0 < stats["NECK"].min <= stats["NECK"].mean <= stats["NECK"].max
+    assert stats["HEAD"].peak_bytes == 0
+
+    report = profiler.report()
+    assert "3 frames" in report and "Profiled.HEAD" in report
+
+    Profiled(fake_landmarks)
+    assert profiler.frames == 3
+
+
+def test_profiler_measures_memory_and_lazy_calls(fake_landmarks):
+    with LandmarkProfiler(memory=True) as profiler:
+        pose = Profiled(fake_landmarks, storage="numpy", lazy=True)
+        pose[pose.virtual_landmark.HEAD]
+
+    stats = {s.name: s for s in profiler.stats()}
+    assert stats["HEAD"].calls == 1 and stats["NECK"].calls == 1
+    assert stats["HEAD"].peak_bytes >= 800_000
+    assert VirtualLandmark._profiler is None
+
+
+def test_nested_calls_keep_the_peak_of_the_outer_call(fake_landmarks):
+    class Nested(VirtualLandmark):
+        @landmark("NECK")
+        def neck(self):
+            return calc.middle(
+                self[self.virtual_landmark.LEFT_SHOULDER],
+                self[self.virtual_landmark.RIGHT_SHOULDER],
+            )
+
+        # Without a visibility rule, NECK is only computed when HEAD reads it
+        @landmark("HEAD", inputs=["NECK"], visibility=None)
+        def head(self):
+            offset = np.zeros(100_000).sum()  # freed before NECK is computed
+            return calc.extend(self[self.virtual_landmark.NECK], self[0], offset + 1.0)
+
+    with LandmarkProfiler(Nested, memory=True) as profiler:
+        pose = Nested(fake_landmarks, storage="numpy", lazy=True)
+        pose[pose.virtual_landmark.HEAD]
+
+    stats = {s.name: s for s in profiler.stats()}
+    assert stats["NECK"].calls == 1
+    assert stats["HEAD"].peak_bytes >= 800_000
+    assert stats["NECK"].peak_bytes < 800_000
+
+
+def test_chrome_trace_export(tmp_path, fake_landmarks):
+    profiler = LandmarkProfiler(Profiled, max_events=4)
+    with profiler:
+        for _ in range(3):
+            Profiled(fake_landmarks)
+
+    path = tmp_path / "trace.json"
+    profiler.save_chrome_trace(path)
+    events = json.loads(path.read_text())["traceEvents"]
+
+    assert len(events) == 4
+    assert {e["name"] for e in events} == {"NECK", "HEAD", "frame"}
+    assert all(e["ph"] == "X" and e["dur"] >= 0 for e in events)
+
+    data = profiler.to_dict()
+    assert data["frames"] == 3
+    assert data["landmarks"][0]["calls"] == 3
+
+    profiler.reset()
+    assert profiler.stats() == [] and profiler.frames == 0
+
+
+def test_profiler_rejects_invalid_use():
+    with pytest.raises(TypeError):
+        LandmarkProfiler(dict)
+
+    with LandmarkProfiler(Profiled):
+        with pytest.raises(RuntimeError, match="already has a profiler"):
+            LandmarkProfiler(Profiled).attach()
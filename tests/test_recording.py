@@ -0,0 +1,103 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from virtual_landmark import VirtualLandmark, landmark, calculus as calc
+from virtual_landmark.recording import RecordingReader, RecordingWriter
+
+
+class Skeleton(VirtualLandmark):
+    @landmark("NECK", connection=["NOSE"])
+    def neck(self):
+        return calc.middle(
+            self[self.virtual_landmark.LEFT_SHOULDER],
+            self[self.virtual_landmark.RIGHT_SHOULDER],
+        )
+
+
+def test_round_trip_for_class(tmp_path, fake_landmarks):
+    path = tmp_path / "session.vlm"
+    skeleton = Skeleton(fake_landmarks, storage="numpy")
+
+    with RecordingWriter.for_class(path, Skeleton, {"fps": 30}) as writer:
+        writer.append(skeleton, timestamp=0.5)
+        writer.append(skeleton.as_array(), timestamp=1.0)
+        assert len(writer) == 2
+
+    reader = RecordingReader(path)
+    assert reader.complete
+    assert len(reader) == 2
+    assert reader.metadata == {"fps": 30}
+    assert reader.names[0] == "NOSE"
+    assert reader.index("NECK") == 33
+    assert (33, 0) in reader.connections
+    assert np.array_equal(reader[1], skeleton.as_array())
+    assert np.array_equal(reader.timestamps, [0.5, 1.0])
+
+    with pytest.raises(KeyError):
+        reader.index("TAIL")
+
+
+def test_time_slice(tmp_path):
+    path = tmp_path / "clip.vlm"
+    frames = np.random.rand(10, 2, 4).astype(np.float32)
+
+    with RecordingWriter(path, ["A", "B"]) as writer:
+        writer.extend(frames[:4], timestamps=np.arange(4) * 0.1)
+        writer.extend(frames[4:], timestamps=np.arange(4, 10) * 0.1)
+
+    landmarks, timestamps = RecordingReader(path).time_slice(0.25, 0.55)
+    assert np.array_equal(landmarks, frames[3:6])
+    assert np.allclose(timestamps, [0.3, 0.4, 0.5])
+
+
+def test_unclosed_recording_is_recovered(tmp_path):
+    path = tmp_path / "crash.vlm"
+    frames = np.ones((3, 2, 4), dtype=np.float32)
+
+    writer = RecordingWriter(path, ["A", "B"])
+    writer.extend(frames, timestamps=[5.0, 6.0, 7.0])
+    writer._file.write(b"\x00" * 10)  # a frame cut short by the crash
+    writer._file.flush()
+
+    reader = RecordingReader(path)
+    assert not reader.complete
+    assert np.array_equal(reader.landmarks, frames)
+    assert np.array_equal(reader.timestamps, [5.0, 6.0, 7.0])
+    writer.close()
+
+
+def test_empty_recording(tmp_path):
+    path = tmp_path / "empty.vlm"
+    RecordingWriter(path, ["A"]).close()
+
+    reader = RecordingReader(path)
+    assert reader.landmarks.shape == (0, 1, 4)
+    assert len(reader.timestamps) == 0
+
+
+def test_invalid_input(tmp_path):
+    path = tmp_path / "bad.vlm"
+    with RecordingWriter(path, ["A", "B"]) as writer:
+        with pytest.raises(ValueError, match="shape"):
+            writer.append(np.zeros((3, 4)))
+        with pytest.raises(ValueError, match="one value per frame"):
+            writer.extend(np.zeros((2, 2, 4)), timestamps=[0.0])
+
+    other = tmp_path / "other.vlm"
+    other.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError, match="not a landmark recording"):
+        RecordingReader(other)
@@ -0,0 +1,93 @@
+# Copyright 2024 cvpose
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# You may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import numpy as np
+import pytest
+
+from virtual_landmark import calculus, vectorized
+
+
+@pytest.fixture
+def points():
+    rng = np.random.default_rng(0)
+    return rng.random((4, 5, 3)), rng.random((4, 5, 3)), rng.random((4, 5, 3))
+
+
+def per_row(fn, *arrays, **kwargs):
+    rows = zip(*[a.reshape(-1, 3) for a in arrays])
+    return np.array([fn(*row, **kwargs) for row in rows]).reshape(arrays[0].shape)
+
+
+@pytest.mark.parametrize("name, arity, kwargs", [
+    ("middle", 2, {}),
+    ("projection", 3, {}),
+    ("centroid", 3, {}),
+    ("mirror", 2, {}),
+    ("weighted_average", 2, {"w1": 1, "w2": 3}),
+    ("extend", 2, {"factor": 2.0}),
+    ("normalize", 2, {}),
+    ("interpolate", 2, {"alpha": 0.3}),
+    ("bisector", 3, {}),
+    ("rotate", 3, {"angle": 0.7}),
+])
+def test_batch_matches_calculus(points, name, arity, kwargs):
+    arrays = points[:arity]
+    result = getattr(vectorized, name)(*arrays, **kwargs)
+
+    assert result.shape == (4, 5, 3)
+    assert np.allclose(result, per_row(getattr(calculus, name), *arrays, **kwargs))
+
+
+def test_batch_broadcasts_and_ignores_visibility():
+    a = np.zeros((10, 33, 4))
+    b = np.array([2.0, 2.0, 2.0, 0.1])
+
+    result = vectorized.middle(a, b)
+    assert result.shape == (10, 33, 3)
+    assert np.all(result == 1.0)
+
+
+def test_batch_accepts_array_parameters():
+    a = np.zeros((3, 3))
+    b = np.ones((3, 3))
+
+    result = vectorized.interpolate(a, b, alpha=np.array([0.0, 0.5, 1.0]))
+    assert np.allclose(result[:, 0], [0.0, 0.5, 1.0])
+
+
+def test_batch_handles_degenerate_vectors():
+    a = np.zeros((2, 3))
+    b = np.array([[0.0, 0.0, 0.0], [0.0, 2.0, 0.0]])
+
+    assert np.allclose(vectorized.normalize(a, b), [[0, 0, 0], [0, 1, 0]])
+    assert np.allclose(vectorized.projection(a, a, b), a)
+
+
+def test_calculus_returns_arrays_for_batches():
+    a = np.zeros((7, 4), dtype=np.float32)
+    b = np.ones((7, 4), dtype=np.float32)
+
+    result = calculus.middle(a, b)
+    assert isinstance(result, np.ndarray)
+    assert result.shape == (7, 3)
+
+
+def test_angle_broadcasts_over_batches_and_dims():
+    pivot = np.zeros((2, 3))
+    a = np.array([[1.0, 0.0, 0.0], [1.0, 0.0, 0.0]])
+    b = np.array([[1.0, 0.0, 1.0], [1.0, 0.0, 1.0]])
+
+    assert np.allclose(vectorized.angle(a, pivot, b), [np.pi / 4, np.pi / 4])
+    assert np.allclose(vectorized.angle(a, pivot, b, dims=np.array([3, 2])), [np.pi / 4, 0.0])
+    assert vectorized.angle(a, pivot, pivot).tolist() == [0.0, 0.0]
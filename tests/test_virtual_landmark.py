@@ -12,8 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import pytest
+import numpy as np
+
 from virtual_landmark import VirtualLandmark
-from virtual_landmark import landmark
+from virtual_landmark import angle, landmark
+from virtual_landmark import calculus as calc
+from virtual_landmark.plan import infer_inputs
 
 import mediapipe as mp 
 
@@ -40,4 +45,539 @@ def test_custom_landmark_registers(fake_landmarks):
     assert center_point.x == 0.5
     assert center_point.y == 0.5
     assert center_point.z == 0.0
-     
\ No newline at end of file
+     
+
+def test_plan_is_compiled_once_per_class(fake_landmarks):
+    plan = DummyCustom.landmark_plan()
+    assert plan.names == ("CENTER", "NECK")
+
+    first = DummyCustom(fake_landmarks)
+    second = DummyCustom(fake_landmarks)
+    assert first.landmark_plan() is plan
+    assert second.landmark_plan() is plan
+
+
+def test_plan_registers_connections(fake_landmarks):
+    obj = DummyCustom(fake_landmarks)
+    assert ("CENTER", "NECK") in obj._connections
+    assert ("CENTER", "RIGHT_SHOULDER") in obj._connections
+
+
+def test_plan_includes_inherited_landmarks(fake_landmarks):
+    class Extended(DummyCustom):
+        @landmark("HEAD")
+        def head(self):
+            return (0.5, 0.9, 0.0)
+
+    assert Extended.landmark_plan().names == ("CENTER", "HEAD", "NECK")
+    assert DummyCustom.landmark_plan().names == ("CENTER", "NECK")
+
+    obj = Extended(fake_landmarks)
+    assert obj[obj.virtual_landmark.HEAD].y == pytest.approx(0.9)
+
+
+def test_plan_rejects_duplicate_names():
+    with pytest.raises(ValueError, match="defined more than once"):
+        class Duplicated(VirtualLandmark):
+            @landmark("NECK")
+            def a(self):
+                return (0.0, 0.0, 0.0)
+
+            @landmark("NECK")
+            def b(self):
+                return (0.0, 0.0, 0.0)
+
+
+class DependentCustom(VirtualLandmark):
+    @landmark("A_NECK", connection=["B_MIDDLE_SHOULDER", "NOSE"])
+    def a_neck(self):
+        return calc.middle(
+            self[self.virtual_landmark.NOSE],
+            self[self.virtual_landmark.B_MIDDLE_SHOULDER],
+        )
+
+    @landmark("B_MIDDLE_SHOULDER", connection=["A_NECK"])
+    def b_middle_shoulder(self):
+        return calc.middle(
+            self[self.virtual_landmark.LEFT_SHOULDER],
+            self[self.virtual_landmark.RIGHT_SHOULDER],
+        )
+
+    @landmark("C_HEAD", inputs=["A_NECK"])
+    def c_head(self):
+        vl = self.virtual_landmark
+        return calc.extend(self[vl["B_MIDDLE_SHOULDER"]], self[vl["A_NECK"]])
+
+
+def test_plan_sorts_landmarks_by_dependency(fake_landmarks):
+    plan = DependentCustom.landmark_plan()
+
+    assert plan.names == ("B_MIDDLE_SHOULDER", "A_NECK", "C_HEAD")
+    assert [[s.name for s in level] for level in plan.levels] == [
+        ["B_MIDDLE_SHOULDER"], ["A_NECK"], ["C_HEAD"]
+    ]
+
+    obj = DependentCustom(fake_landmarks)
+    vl = obj.virtual_landmark
+    assert vl.B_MIDDLE_SHOULDER == 33
+    assert obj[vl.A_NECK].x == pytest.approx((0.0 + 1.15) / 2)
+
+
+def test_plan_infers_inputs_from_method_body():
+    specs = {s.name: s for s in DependentCustom.landmark_plan()}
+
+    assert specs["A_NECK"].depends == ("B_MIDDLE_SHOULDER",)
+    assert "NOSE" in specs["A_NECK"].inputs
+    assert specs["B_MIDDLE_SHOULDER"].depends == ()
+    assert specs["C_HEAD"].inputs == ("A_NECK",)
+
+
+def test_plan_only_infers_explicit_landmark_reads():
+    def read(self):
+        vl = self.virtual_landmark
+        scale = calc.middle((0.0, 0.0, 0.0), (2.0, 0.0, 0.0))[0]
+        return calc.extend(self[vl.NECK], self[self.virtual_landmark["NOSE"]], scale + self[0][0])
+
+    assert infer_inputs(read) == ("NECK", "NOSE")
+
+
+def _computed_index(self):
+    idx = self.virtual_landmark.NECK
+    return self[idx]
+
+
+def _getattr_on_registry(self):
+    vl = self.virtual_landmark
+    return self[getattr(vl, "NECK")]
+
+
+def _virtual_index(self):
+    return self[40]
+
+
+def _other_attribute(self):
+    return self[self.index]
+
+
+@pytest.mark.parametrize(
+    "method", [_computed_index, _getattr_on_registry, _virtual_index, _other_attribute]
+)
+def test_plan_rejects_reads_it_cannot_infer(method):
+    with pytest.raises(ValueError, match="Cannot infer the inputs"):
+        infer_inputs(method)
+
+
+def test_plan_rejects_landmarks_read_through_helpers():
+    with pytest.raises(ValueError, match=r"Cannot infer the inputs of .*neck.*inputs=\[\.\.\.\]"):
+        class Helper(VirtualLandmark):
+            def shoulders(self):
+                vl = self.virtual_landmark
+                return self[vl.LEFT_SHOULDER], self[vl.RIGHT_SHOULDER]
+
+            @landmark("NECK")
+            def neck(self):
+                return calc.middle(*self.shoulders())
+
+    class Declared(VirtualLandmark):
+        def shoulders(self):
+            vl = self.virtual_landmark
+            return self[vl.LEFT_SHOULDER], self[vl.RIGHT_SHOULDER]
+
+        @landmark("NECK", inputs=["LEFT_SHOULDER", "RIGHT_SHOULDER"])
+        def neck(self):
+            return calc.middle(*self.shoulders())
+
+    assert Declared.landmark_plan().specs[0].inputs == ("LEFT_SHOULDER", "RIGHT_SHOULDER")
+
+
+def test_plan_groups_independent_landmarks():
+    assert [len(level) for level in DummyCustom.landmark_plan().levels] == [2]
+
+
+def test_plan_rejects_cycles():
+    with pytest.raises(ValueError, match="Cyclic landmark dependencies"):
+        class Cyclic(VirtualLandmark):
+            @landmark("FIRST", inputs=["SECOND"])
+            def first(self):
+                return (0.0, 0.0, 0.0)
+
+            @landmark("SECOND")
+            def second(self):
+                return self[self.virtual_landmark.FIRST]
+
+
+def test_numpy_storage_matches_protobuf_storage(fake_landmarks):
+    protobuf = DependentCustom(fake_landmarks)
+    array = DependentCustom(fake_landmarks, storage="numpy")
+
+    assert len(array) == len(protobuf) == 36
+    assert array._array.shape == (36, 4)
+    assert np.allclose(array.as_array(), protobuf.as_array())
+
+    landmark_list = array.as_landmark_list()
+    assert landmark_list.landmark[34].x == pytest.approx(protobuf[34].x)
+
+
+def test_evaluate_clip_matches_per_frame_evaluation(fake_landmarks):
+    rng = np.random.default_rng(0)
+    clip = rng.random((5, 33, 4)).astype(np.float32)
+
+    result = DependentCustom.evaluate_clip(clip)
+    assert result.shape == (5, 36, 4)
+    assert np.array_equal(result[:, :33], clip)
+
+    for t in range(5):
+        frame = DependentCustom(clip[t], storage="numpy")
+        assert np.allclose(result[t], frame.as_array(), atol=1e-6)
+
+
+def test_evaluate_clip_broadcasts_constant_points():
+    result = DummyCustom.evaluate_clip(np.zeros((3, 33, 3)))
+    assert np.allclose(result[:, 33], (0.5, 0.5, 0.0, 1.0))
+
+
+def test_evaluate_clip_rejects_single_frames():
+    with pytest.raises(ValueError, match="shape"):
+        DummyCustom.evaluate_clip(np.zeros((33, 4)))
+
+
+@pytest.mark.parametrize("storage", ["protobuf", "numpy"])
+def test_update_reuses_instance(fake_landmarks, fake_landmark, storage):
+    obj = DependentCustom(fake_landmarks, storage=storage)
+    buffer = obj._array if storage == "numpy" else obj._landmark_list
+    first = obj[obj.virtual_landmark.C_HEAD]
+
+    shifted = [fake_landmark(lm.x + 1, lm.y, lm.z) for lm in fake_landmarks]
+    assert obj.update(shifted) is obj
+
+    expected = DependentCustom(shifted, storage=storage)
+    assert len(obj) == 36
+    assert np.allclose(obj.as_array(), expected.as_array())
+    assert (obj._array if storage == "numpy" else obj._landmark_list) is buffer
+    if storage == "protobuf":
+        assert obj[obj.virtual_landmark.C_HEAD] is first
+
+
+def test_update_accepts_arrays_and_resyncs_landmark_list(fake_landmarks):
+    obj = DependentCustom(fake_landmarks, storage="numpy")
+    landmark_list = obj.as_landmark_list()
+
+    obj.update(np.zeros((33, 3)))
+    assert obj.as_landmark_list() is landmark_list
+    assert landmark_list.landmark[11].x == 0.0
+    assert landmark_list.landmark[11].visibility == 1.0
+
+
+def test_update_rejects_different_sizes(fake_landmarks):
+    with pytest.raises(ValueError, match="expected 33 landmarks"):
+        DependentCustom(fake_landmarks).update(fake_landmarks[:10])
+    with pytest.raises(ValueError, match="expected 33 landmarks"):
+        DependentCustom(fake_landmarks, storage="numpy").update(np.zeros((10, 4)))
+
+
+def test_update_rejects_arrays_of_another_shape():
+    obj = DependentCustom(np.zeros((33, 4)), storage="numpy")
+    with pytest.raises(ValueError, match=r"\(\.\.\., N, 3\) or \(\.\.\., N, 4\)"):
+        obj.update(np.zeros((33, 5)))
+    with pytest.raises(ValueError, match=r"\(\.\.\., N, 3\) or \(\.\.\., N, 4\)"):
+        obj.update(np.zeros(33))
+
+    clip = DependentCustom(np.zeros((5, 33, 4)), storage="numpy")
+    with pytest.raises(ValueError, match="landmark sets of shape"):
+        clip.update(np.ones((33, 4)))
+    with pytest.raises(ValueError, match="landmark sets of shape"):
+        obj.update(np.ones((1, 33, 4)))
+    assert not clip.as_array()[:, :33].any()
+
+
+def test_registry_is_shared_and_frozen(fake_landmarks):
+    first = DependentCustom(fake_landmarks)
+    second = DependentCustom(fake_landmarks, storage="numpy")
+
+    assert first.virtual_landmark is second.virtual_landmark
+    assert first.virtual_landmark.frozen
+    assert first.virtual_landmark.C_HEAD == 35
+    assert first.virtual_landmark[35] == "C_HEAD"
+    assert "A_NECK" not in DummyCustom(fake_landmarks).virtual_landmark
+
+    with pytest.raises(TypeError, match="frozen"):
+        first.virtual_landmark.add("OTHER", 40)
+
+
+def test_registry_rejects_builtin_names():
+    with pytest.raises(ValueError, match="already defined"):
+        class Shadowing(VirtualLandmark):
+            @landmark("NOSE")
+            def nose(self):
+                return (0.0, 0.0, 0.0)
+
+
+def test_virtual_landmark_requires_pose_landmarks(fake_landmarks):
+    with pytest.raises(ValueError, match="expected 33 landmarks"):
+        DummyCustom(fake_landmarks[:3])
+    with pytest.raises(ValueError, match="expected 33 landmarks, got 34"):
+        DummyCustom(np.zeros((34, 4)), storage="numpy")
+
+
+class CountingCustom(DependentCustom):
+    calls = []
+
+    @landmark("D_UNUSED")
+    def d_unused(self):
+        CountingCustom.calls.append("D_UNUSED")
+        return (0.0, 0.0, 0.0)
+
+    @landmark("E_THORAX", inputs=["A_NECK"])
+    def e_thorax(self):
+        CountingCustom.calls.append("E_THORAX")
+        return calc.middle(self[self.virtual_landmark.A_NECK], self[0])
+
+
+@pytest.mark.parametrize("storage", ["protobuf", "numpy"])
+def test_lazy_evaluates_on_first_access(fake_landmarks, storage):
+    CountingCustom.calls.clear()
+    obj = CountingCustom(fake_landmarks, storage=storage, lazy=True)
+    assert obj.lazy
+    assert CountingCustom.calls == []
+
+    thorax = obj[obj.virtual_landmark.E_THORAX]
+    obj[obj.virtual_landmark.E_THORAX]
+    assert CountingCustom.calls == ["E_THORAX"]
+
+    eager = CountingCustom(fake_landmarks, storage=storage)
+    assert calc.middle(thorax, thorax) == pytest.approx(
+        calc.middle(eager[eager.virtual_landmark.E_THORAX], eager[eager.virtual_landmark.E_THORAX])
+    )
+    assert np.allclose(obj.as_array(), eager.as_array())
+    assert CountingCustom.calls.count("D_UNUSED") == 2
+
+
+def test_lazy_update_marks_landmarks_pending(fake_landmarks, fake_landmark):
+    obj = CountingCustom(fake_landmarks, lazy=True)
+    obj[-1]
+    CountingCustom.calls.clear()
+
+    shifted = [fake_landmark(lm.x + 1, lm.y, lm.z) for lm in fake_landmarks]
+    obj.update(shifted)
+    assert CountingCustom.calls == []
+
+    expected = CountingCustom(shifted)
+    neck = obj.virtual_landmark.A_NECK
+    assert obj[neck].x == pytest.approx(expected[neck].x)
+    assert len(list(obj)) == len(expected)
+
+
+@angle("RIGHT_ELBOW", "RIGHT_SHOULDER", "RIGHT_ELBOW", "RIGHT_WRIST")
+@angle("NECK_TILT", "NOSE", "A_NECK", "C_HEAD", dims=2)
+class AngledCustom(DependentCustom):
+    pass
+
+
+@angle("LEFT_KNEE", "LEFT_HIP", "LEFT_KNEE", "LEFT_ANKLE")
+class AngledChild(AngledCustom):
+    @landmark("AA_FIRST")
+    def aa_first(self):
+        return (0.0, 0.0, 0.0)
+
+
+def test_angles_match_calculus(fake_landmarks):
+    obj = AngledCustom(fake_landmarks)
+    vl = obj.virtual_landmark
+
+    assert AngledCustom.angle_plan().names == ("RIGHT_ELBOW", "NECK_TILT")
+    expected = [
+        calc.angle(obj[vl.RIGHT_SHOULDER], obj[vl.RIGHT_ELBOW], obj[vl.RIGHT_WRIST]),
+        calc.angle(obj[vl.NOSE], obj[vl.A_NECK], obj[vl.C_HEAD], dims=2),
+    ]
+    assert np.allclose(obj.angles(), expected)
+    assert np.allclose(obj.angles(degrees=True), np.degrees(expected))
+
+
+def test_angles_are_inherited_and_reindexed(fake_landmarks):
+    assert AngledChild.angle_plan().names == ("RIGHT_ELBOW", "NECK_TILT", "LEFT_KNEE")
+    assert AngledChild.angle_plan().index[1, 1] == AngledChild._registry.A_NECK
+    assert AngledChild._registry.A_NECK != AngledCustom._registry.A_NECK
+    assert VirtualLandmark.angle_plan().names == ()
+
+    obj = AngledChild(fake_landmarks, storage="numpy")
+    assert obj.angles()[:2] == pytest.approx(AngledCustom(fake_landmarks).angles())
+
+
+def test_compute_angles_over_clips(fake_landmarks):
+    frames = np.random.rand(5, 33, 4).astype(np.float32)
+    clip = AngledCustom.evaluate_clip(frames)
+
+    result = AngledCustom.compute_angles(clip)
+    assert result.shape == (5, 2)
+    single = AngledCustom(frames[2], storage="numpy").angles()
+    assert np.allclose(result[2], single, atol=1e-5)
+
+
+def test_angle_rejects_unknown_landmarks():
+    with pytest.raises(ValueError, match="unknown landmarks"):
+        @angle("TAIL", "NOSE", "TAIL_BASE", "LEFT_HIP")
+        class Unknown(VirtualLandmark):
+            pass
+
+    with pytest.raises(ValueError, match="unique"):
+        @angle("ELBOW", "LEFT_SHOULDER", "LEFT_ELBOW", "LEFT_WRIST")
+        @angle("ELBOW", "RIGHT_SHOULDER", "RIGHT_ELBOW", "RIGHT_WRIST")
+        class Repeated(VirtualLandmark):
+            pass
+
+
+class VisibleCustom(VirtualLandmark):
+    calls = []
+
+    @landmark("A_SHOULDERS")
+    def a_shoulders(self):
+        VisibleCustom.calls.append("A_SHOULDERS")
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.LEFT_SHOULDER], self[vl.RIGHT_SHOULDER])
+
+    @landmark("B_PRODUCT", visibility="product", inputs=["LEFT_SHOULDER", "RIGHT_SHOULDER"])
+    def b_product(self):
+        return (0.0, 0.0, 0.0)
+
+    @landmark("C_MEAN", visibility="mean", inputs=["LEFT_SHOULDER", "RIGHT_SHOULDER"])
+    def c_mean(self):
+        return (0.0, 0.0, 0.0)
+
+    @landmark("D_WEIGHTED", visibility={"NOSE": 3, "RIGHT_SHOULDER": 1})
+    def d_weighted(self):
+        return (0.0, 0.0, 0.0)
+
+    @landmark("E_HEAD")
+    def e_head(self):
+        VisibleCustom.calls.append("E_HEAD")
+        vl = self.virtual_landmark
+        return calc.middle(self[vl.A_SHOULDERS], self[vl.NOSE])
+
+    @landmark("F_CONSTANT", visibility=None, inputs=["LEFT_SHOULDER"])
+    def f_constant(self):
+        return (0.0, 0.0, 0.0)
+
+
+def _with_visibility(landmarks, values):
+    landmarks = [type(lm)(x=lm.x, y=lm.y, z=lm.z, visibility=lm.visibility) for lm in landmarks]
+    for idx, value in values.items():
+        landmarks[idx].visibility = value
+    return landmarks
+
+
+@pytest.mark.parametrize("storage", ["protobuf", "numpy"])
+@pytest.mark.parametrize("lazy", [False, True])
+def test_visibility_propagates_from_inputs(fake_landmarks, storage, lazy):
+    landmarks = _with_visibility(fake_landmarks, {0: 0.9, 11: 0.5, 12: 0.8})
+    obj = VisibleCustom(landmarks, storage=storage, lazy=lazy)
+    visibility = dict(zip(obj.virtual_landmark.keys(), obj.as_array()[:, 3]))
+
+    assert visibility["A_SHOULDERS"] == pytest.approx(0.5)
+    assert visibility["B_PRODUCT"] == pytest.approx(0.4)
+    assert visibility["C_MEAN"] == pytest.approx(0.65)
+    assert visibility["D_WEIGHTED"] == pytest.approx((3 * 0.9 + 0.8) / 4)
+    assert visibility["E_HEAD"] == pytest.approx(0.5)
+    assert visibility["F_CONSTANT"] == 1.0
+
+
+def test_visibility_is_updated_with_the_frame(fake_landmarks):
+    obj = VisibleCustom(fake_landmarks, storage="numpy")
+    assert obj[obj.virtual_landmark.E_HEAD][3] == 1.0
+
+    obj.update(_with_visibility(fake_landmarks, {11: 0.3}))
+    assert obj[obj.virtual_landmark.E_HEAD][3] == pytest.approx(0.3)
+
+
+@pytest.mark.parametrize("storage", ["protobuf", "numpy"])
+def test_visibility_threshold_skips_hidden_landmarks(fake_landmarks, storage):
+    VisibleCustom.calls.clear()
+    landmarks = _with_visibility(fake_landmarks, {11: 0.2})
+
+    obj = VisibleCustom(landmarks, storage=storage)
+    obj.visibility_threshold = 0.5
+    obj.update(landmarks)
+
+    array = obj.as_array()
+    vl = obj.virtual_landmark
+    assert VisibleCustom.calls == ["A_SHOULDERS", "E_HEAD"]
+    assert np.isnan(array[vl.A_SHOULDERS, :3]).all()
+    assert np.isnan(array[vl.E_HEAD, :3]).all()
+    assert array[vl.A_SHOULDERS, 3] == pytest.approx(0.2)
+    assert not np.isnan(array[vl.D_WEIGHTED]).any()
+
+
+def test_visibility_threshold_masks_hidden_sets():
+    frames = np.random.rand(4, 33, 4).astype(np.float32)
+    frames[..., 3] = 1.0
+    frames[1, 11, 3] = 0.1
+
+    class Thresholded(VisibleCustom):
+        visibility_threshold = 0.5
+
+    clip = Thresholded.evaluate_clip(frames)
+    reference = VisibleCustom.evaluate_clip(frames)
+    head = Thresholded._registry.E_HEAD
+
+    assert np.isnan(clip[1, head, :3]).all()
+    assert np.allclose(np.delete(clip, 1, axis=0), np.delete(reference, 1, axis=0))
+    assert clip[1, head, 3] == pytest.approx(0.1)
+
+
+def test_visibility_rejects_unknown_weighted_landmarks():
+    with pytest.raises(ValueError, match="unknown landmarks"):
+        class Unknown(VirtualLandmark):
+            @landmark("TAIL", visibility={"TAIL_BASE": 1})
+            def tail(self):
+                return (0.0, 0.0, 0.0)
+
+
+def _world(fake_landmark, landmarks, scale=2.0):
+    return [fake_landmark(lm.x * scale - 1, lm.y * scale, lm.z * scale) for lm in landmarks]
+
+
+def test_world_landmarks_are_computed_in_the_same_pass(fake_landmarks, fake_landmark):
+    world = _world(fake_landmark, fake_landmarks)
+    obj = AngledCustom(fake_landmarks, storage="numpy", world_landmarks=world)
+
+    assert obj.has_world
+    assert obj[obj.virtual_landmark.A_NECK].shape == (2, 4)
+    assert np.allclose(obj.as_array(), AngledCustom(fake_landmarks, storage="numpy").as_array())
+    assert np.allclose(obj.as_world_array(), AngledCustom(world, storage="numpy").as_array())
+    assert np.allclose(obj.angles(world=True), AngledCustom(world).angles())
+
+
+def test_world_landmark_list(fake_landmarks, fake_landmark):
+    world = _world(fake_landmark, fake_landmarks)
+    obj = DependentCustom(fake_landmarks, storage="numpy", world_landmarks=world)
+
+    world_list = obj.as_world_landmark_list()
+    assert type(world_list).__name__ == "LandmarkList"
+    assert len(world_list.landmark) == len(obj)
+    assert world_list.landmark[0].x == pytest.approx(-1.0)
+    assert obj.as_landmark_list().landmark[0].x == pytest.approx(0.0)
+
+    obj.update(fake_landmarks, world_landmarks=_world(fake_landmark, fake_landmarks, scale=3.0))
+    assert obj.as_world_landmark_list() is world_list
+    neck = obj.virtual_landmark.A_NECK
+    expected = DependentCustom(_world(fake_landmark, fake_landmarks, scale=3.0))[neck]
+    assert world_list.landmark[neck].x == pytest.approx(expected.x)
+
+
+def test_world_landmarks_validation(fake_landmarks, fake_landmark):
+    world = _world(fake_landmark, fake_landmarks)
+
+    with pytest.raises(ValueError, match="storage='numpy'"):
+        DependentCustom(fake_landmarks, world_landmarks=world)
+    with pytest.raises(ValueError, match="must match"):
+        DependentCustom(fake_landmarks, storage="numpy", world_landmarks=world[:20])
+
+    obj = DependentCustom(fake_landmarks, storage="numpy", world_landmarks=world)
+    with pytest.raises(ValueError, match="required"):
+        obj.update(fake_landmarks)
+
+    plain = DependentCustom(fake_landmarks, storage="numpy")
+    assert not plain.has_world
+    with pytest.raises(ValueError, match="no world landmarks"):
+        plain.as_world_array()
+    with pytest.raises(ValueError, match="no world landmarks"):
+        plain.update(fake_landmarks, world_landmarks=world)
@@ -86,4 +86,48 @@ def test_virtual_pose_landmark_repr():
 
     assert isinstance(result, str)
     assert result.startswith("<VirtualPoseLandmark {")
-    assert "NOSE" in result 
\ No newline at end of file
+    assert "NOSE" in result
+
+
+def test_freeze_blocks_modifications():
+    vpl = VirtualPoseLandmark()
+    vpl.add("NECK", 33)
+    assert vpl.freeze() is vpl
+    assert vpl.frozen
+
+    with pytest.raises(TypeError, match="frozen"):
+        vpl.add("THORAX", 34)
+    with pytest.raises(TypeError, match="frozen"):
+        vpl["THORAX"] = 34
+    with pytest.raises(TypeError, match="frozen"):
+        del vpl["NECK"]
+    with pytest.raises(TypeError, match="frozen"):
+        vpl.THORAX = 34
+    for method, args in [
+        ("clear", ()), ("pop", ("NECK",)), ("popitem", ()),
+        ("setdefault", ("THORAX", 34)), ("update", ({"THORAX": 34},)),
+    ]:
+        with pytest.raises(TypeError, match="frozen"):
+            getattr(vpl, method)(*args)
+
+    assert vpl.NECK == 33
+    assert vpl[33] == "NECK"
+    assert "THORAX" not in vpl
+
+
+def test_builtin_landmarks_are_loaded():
+    vpl = VirtualPoseLandmark()
+    assert len(vpl) == 33
+    assert vpl.LEFT_SHOULDER == 11
+    assert vpl[12] == "RIGHT_SHOULDER"
+    assert not vpl.frozen
+
+
+def test_builtin_landmarks_match_mediapipe():
+    import mediapipe as mp
+
+    from virtual_landmark import virtual_pose_landmark
+
+    expected = tuple((lm.name, lm.value) for lm in mp.solutions.pose.PoseLandmark)
+    assert virtual_pose_landmark.BUILTIN_LANDMARKS == expected
+    assert virtual_pose_landmark.PoseLandmark is mp.solutions.pose.PoseLandmark